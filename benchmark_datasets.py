@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Pinot Pulse Enterprise — Test Data Generator Benchmark
+Measures generate_datasets.py throughput (records/s, bytes/s) and peak RSS
+for each dataset and output format across a range of scales, and writes the
+results to a JSON file that later runs can be compared against.
+
+Each (scale, dataset, format) case runs in its own Python process so its
+peak RSS is its own. Parent keys (members for accounts/loans, accounts for
+transactions) are generated in that process first, without writing, and are
+not timed; the peak RSS includes them, as it does in a real run.
+
+Usage:
+  python3 benchmark_datasets.py                          # scales 0.1,1,10; all datasets/formats
+  python3 benchmark_datasets.py --scales 1,100 --datasets transactions
+  python3 benchmark_datasets.py --formats ndjson,parquet --compress zstd
+  python3 benchmark_datasets.py --output nightly.json --baseline last-night.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import generate_datasets as gen
+
+DEFAULT_SCALES = "0.1,1,10"
+DEFAULT_OUTPUT = "benchmark-results.json"
+DEFAULT_TOLERANCE = 0.10
+
+
+def peak_rss_bytes():
+    """Peak RSS of this process and of any worker processes it waited for."""
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return unit * max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                      resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+def parents_for(dataset, seed, counts, shards, workers, tmp, opts):
+    """The in-memory parent keys `dataset` needs, generated without writing files."""
+    if dataset == "members":
+        return None
+    def keys(name, parents=None):
+        parts = gen.shard_ranges(counts[name], shards)
+        return gen.generate_dataset(name, seed, parts, workers, parents, tmp,
+                                    gen.keys_only(opts))[2]
+
+    members = gen.member_index(keys("members"))
+    if dataset != "transactions":
+        return members
+    return gen.account_index(keys("accounts", members))
+
+
+def run_case(case):
+    """Time one dataset/format at one scale; runs in a fresh process."""
+    counts = gen.scaled_counts(case["scale"])
+    dataset, shards, workers = case["dataset"], case["shards"], case["workers"]
+    opts = gen.default_opts(formats=(case["format"],), batch_size=case["batch_size"],
+                            fast_json=case["fast_json"], compress=case["compress"],
+                            compress_level=gen.DEFAULT_COMPRESS_LEVELS.get(case["compress"]),
+                            compress_threads=max(1, (os.cpu_count() or 1) // workers))
+    with tempfile.TemporaryDirectory(dir=case["tmp_dir"]) as tmp:
+        parents = parents_for(dataset, case["seed"], counts, shards, workers, tmp, opts)
+        baseline_rss = peak_rss_bytes()
+        if dataset == "transactions":
+            parts = gen.transaction_slices(case["seed"], counts[dataset], shards)
+        else:
+            parts = gen.shard_ranges(counts[dataset], shards)
+        start = time.perf_counter()
+        rows, _, _, checksums = gen.generate_dataset(dataset, case["seed"], parts, workers,
+                                                     parents, tmp, opts)
+        seconds = time.perf_counter() - start
+    size = sum(c["bytes"] for c in checksums.values())
+    return {"records": rows, "bytes": size, "seconds": seconds,
+            "files": sorted(checksums), "baseline_rss_bytes": baseline_rss,
+            "peak_rss_bytes": peak_rss_bytes()}
+
+
+def measure(case, repeat):
+    """Best-of-`repeat` timing (and worst peak RSS) of a case, each in a subprocess."""
+    runs = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--run-case",
+                               json.dumps(case)], capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip() or proc.stdout.strip())
+        runs.append(json.loads(proc.stdout.splitlines()[-1]))
+    best = min(runs, key=lambda r: r["seconds"])
+    seconds = max(best["seconds"], 1e-9)
+    return {
+        "scale": case["scale"], "dataset": case["dataset"], "format": case["format"],
+        "files": best["files"], "records": best["records"], "bytes": best["bytes"],
+        "seconds": round(best["seconds"], 4),
+        "records_per_s": round(best["records"] / seconds, 1),
+        "bytes_per_s": round(best["bytes"] / seconds, 1),
+        "baseline_rss_bytes": max(r["baseline_rss_bytes"] for r in runs),
+        "peak_rss_bytes": max(r["peak_rss_bytes"] for r in runs),
+        "runs": [round(r["seconds"], 4) for r in runs],
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def case_key(result):
+    return (result["scale"], result["dataset"], result["format"])
+
+
+def compare(results, baseline_path, tolerance):
+    """Print records/s changes against a previous results file; return the regressions."""
+    with open(baseline_path) as f:
+        baseline = {case_key(r): r for r in json.load(f)["results"]}
+    print()
+    print(f"═══ Against {baseline_path} ═══")
+    regressions = []
+    for r in results:
+        old = baseline.get(case_key(r))
+        if not old:
+            print(f"  ⚠ {r['dataset']:<12} {r['format']:<8} {r['scale']:>6g}x  (not in baseline)")
+            continue
+        change = r["records_per_s"] / old["records_per_s"] - 1
+        rss = r["peak_rss_bytes"] / max(old["peak_rss_bytes"], 1) - 1
+        slower = change < -tolerance
+        if slower:
+            regressions.append(r)
+        print(f"  {'✗' if slower else '✓'} {r['dataset']:<12} {r['format']:<8} {r['scale']:>6g}x"
+              f"  records/s {change:+7.1%}  peak RSS {rss:+7.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Pinot Pulse test data generator")
+    parser.add_argument("--scales", default=DEFAULT_SCALES,
+                        help="Comma-separated --scale factors or profiles "
+                             f"(default: {DEFAULT_SCALES})")
+    parser.add_argument("--datasets", default=",".join(gen.DATASET_KEYS),
+                        help="Comma-separated datasets (default: all four)")
+    parser.add_argument("--formats", default=None,
+                        help="Comma-separated formats (default: text formats, plus "
+                             "parquet/arrow when pyarrow is installed)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=gen.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--fast-json", action="store_true")
+    parser.add_argument("--compress", choices=["none", *gen.COMPRESSION_SUFFIXES], default="none")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Runs per case; the fastest is reported")
+    parser.add_argument("--tmp-dir", default=None,
+                        help="Where cases write their files (default: system temp dir)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT,
+                        help=f"Results JSON file (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--baseline", default=None,
+                        help="Previous results JSON to compare records/s against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="With --baseline, exit 1 if any case is this much slower "
+                             f"(default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case))))
+        return
+
+    try:
+        scales = [gen.parse_scale(s.strip()) for s in args.scales.split(",") if s.strip()]
+    except argparse.ArgumentTypeError as e:
+        parser.error(f"--scales: {e}")
+    datasets = [d.strip() for d in args.datasets.split(",") if d.strip()]
+    unknown = [d for d in datasets if d not in gen.DATASET_KEYS]
+    if unknown:
+        parser.error(f"unknown --datasets: {', '.join(unknown)}")
+    if args.formats:
+        formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    else:
+        formats = list(gen.TEXT_FORMATS)
+        try:
+            import pyarrow  # noqa: F401
+            formats += gen.COLUMNAR_FORMATS
+        except ImportError:
+            print("  ⚠ pyarrow not installed — skipping parquet/arrow (pip install pyarrow)")
+    unknown = [f for f in formats if f not in gen.TEXT_FORMATS + gen.COLUMNAR_FORMATS]
+    if unknown:
+        parser.error(f"unknown --formats: {', '.join(unknown)}")
+    compress = None if args.compress == "none" else args.compress
+    if args.fast_json and gen.orjson is None:
+        print("ERROR: orjson not installed (needed for --fast-json).")
+        print("Run: pip install orjson")
+        sys.exit(1)
+    if compress == "zstd" and gen.zstandard is None:
+        print("ERROR: zstandard not installed (needed for --compress zstd).")
+        print("Run: pip install zstandard")
+        sys.exit(1)
+
+    print("═══ Pinot Pulse Enterprise — Generator Benchmark ═══")
+    print(f"Scales: {', '.join(f'{s:g}x' for s in scales)}  (shards: {args.shards}, "
+          f"workers: {args.workers}, repeat: {args.repeat})")
+    print()
+
+    results = []
+    for scale in scales:
+        for dataset in datasets:
+            for fmt in formats:
+                # Formats a dataset is never written in are not cases
+                if not gen.outputs(dataset, gen.default_opts(formats=(fmt,))):
+                    continue
+                case = {"scale": scale, "dataset": dataset, "format": fmt, "seed": args.seed,
+                        "shards": args.shards, "workers": args.workers,
+                        "batch_size": args.batch_size, "fast_json": args.fast_json,
+                        "compress": compress, "tmp_dir": args.tmp_dir}
+                try:
+                    r = measure(case, args.repeat)
+                except RuntimeError as e:
+                    print(f"  ✗ {dataset:<12} {fmt:<8} {scale:>6g}x  {e}")
+                    sys.exit(1)
+                results.append(r)
+                print(f"  ✓ {dataset:<12} {fmt:<8} {scale:>6g}x {r['records']:>11,} rec"
+                      f" {r['records_per_s']:>12,.0f} rec/s {r['bytes_per_s'] / 1e6:>8.1f} MB/s"
+                      f"  peak RSS {r['peak_rss_bytes'] / 2**20:,.0f} MiB")
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": gen.np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {"seed": args.seed, "shards": args.shards, "workers": args.workers,
+                   "batch_size": args.batch_size, "fast_json": args.fast_json,
+                   "compress": compress, "repeat": args.repeat},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print()
+    print(f"  Results: {os.path.abspath(args.output)}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        if regressions:
+            print(f"  ✗ {len(regressions)} case(s) more than {args.tolerance:.0%} slower")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,46 @@ Generates 4 datasets matching canonical schemas:
   3. transactions JSONL  → Apache Kafka (real-time streaming)
   4. loans.json         → PostgreSQL analytics.loans (regulatory reporting)
 
+Every dataset is generated column-at-a-time with NumPy: each field is drawn
+as a whole array and records are only materialized when they are written.
+Timestamps are epoch milliseconds computed with integer arithmetic.
+
 Organization: Midwest Community Credit Union (MWCU)
   org_id = "a1b2c3d4-e5f6-7890-abcd-ef1234567890"
 """
+import argparse
 import csv
+import gzip
+import hashlib
+import heapq
+import io
 import json
-import random
-import uuid
+import math
+import operator
 import os
+import shutil
+import sys
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
+try:
+    import numpy as np
+except ImportError:
+    print("ERROR: numpy not installed. Run: pip install numpy")
+    sys.exit(1)
+
+try:
+    import orjson  # optional: faster JSON encoding with --fast-json
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard  # optional: --compress zstd
+except ImportError:
+    zstandard = None
+
 # ═══ Constants ═══
 ORG_ID = "a1b2c3d4-e5f6-7890-abcd-ef1234567890"
 ORG_NAME = "Midwest Community Credit Union"
@@ -29,6 +59,8 @@ NUM_MEMBERS = 500
 NUM_ACCOUNTS = 800
 NUM_LOANS = 350
 NUM_TRANSACTIONS = 5000
+# --scale multiplies every record count; profiles are named factors
+SCALE_PROFILES = {"small": 1, "medium": 100, "large": 10_000, "xl": 100_000}
 BASE_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
 NOW = datetime(2026, 2, 20, 12, 0, 0, tzinfo=timezone.utc)
 
@@ -62,6 +94,12 @@ CITIES_TX = [
 ]
 SEGMENTS = ["platinum","gold","silver","bronze","new"]
 SEGMENT_WEIGHTS = [0.05, 0.15, 0.35, 0.30, 0.15]
+# Credit scores and income vary by segment
+CREDIT_SCORE_RANGES = {"platinum":(760,850),"gold":(700,780),"silver":(640,720),
+                       "bronze":(580,660),"new":(620,750)}
+INCOME_RANGES = {"platinum":(120000,350000),"gold":(80000,160000),
+                 "silver":(45000,100000),"bronze":(28000,55000),
+                 "new":(30000,80000)}
 STATUSES = ["active","active","active","active","active","active",
             "active","active","inactive","pending"]
 EMPLOYMENT = ["employed","employed","employed","self_employed","retired","student"]
@@ -83,6 +121,20 @@ TXN_TYPES = [
     "ach_credit","ach_debit","card_purchase","card_refund",
     "atm_withdrawal","atm_deposit","loan_payment","dividend",
 ]
+# Amount range and sign by transaction type
+TXN_AMOUNTS = {
+    "deposit": (25, 15000, 1), "ach_credit": (25, 15000, 1), "atm_deposit": (25, 15000, 1),
+    "withdrawal": (20, 5000, -1), "atm_withdrawal": (20, 5000, -1), "ach_debit": (20, 5000, -1),
+    "card_purchase": (2.50, 2500, -1), "payment": (2.50, 2500, -1),
+    "card_refund": (5, 500, 1),
+    "loan_payment": (100, 3500, -1),
+    "interest": (0.01, 250, 1),
+    "dividend": (0.50, 500, 1),
+    "fee": (5, 35, -1),
+    "transfer": (-5000, 5000, 1),
+}
+TXN_STATUSES = ["completed", "pending", "failed"]
+TXN_STATUS_WEIGHTS = [0.85, 0.10, 0.05]
 CHANNELS = ["branch","online","mobile","atm","phone","ach","pos","internal"]
 MERCHANTS = [
     ("HEB Grocery","Grocery"),("Walmart","Retail"),("Amazon","E-Commerce"),
@@ -106,6 +158,21 @@ LOAN_TYPES = [
     ("student", "Student Loan", "Education", "STUD"),
     ("commercial", "Commercial Loan", "Small Business", "COMM"),
 ]
+# Amount range, rate range and term choices (months) by loan type
+_AUTO_PRICING = ((10000, 65000), (3.9, 8.9), (36, 48, 60, 72, 84))
+_MORTGAGE_PRICING = ((80000, 500000), (3.5, 7.5), (180, 240, 360))
+LOAN_PRICING = {
+    "auto_new": _AUTO_PRICING,
+    "auto_used": _AUTO_PRICING,
+    "first_mortgage_fixed": _MORTGAGE_PRICING,
+    "first_mortgage_arm": _MORTGAGE_PRICING,
+    "home_equity": _MORTGAGE_PRICING,
+    "heloc": ((20000, 250000), (6.0, 10.5), (120, 180, 240)),
+    "personal": ((2000, 30000), (7.0, 18.0), (24, 36, 48, 60)),
+    "credit_card": ((1000, 25000), (12.99, 24.99), (0,)),  # revolving
+    "student": ((5000, 80000), (4.5, 9.0), (120, 180, 240)),
+    "commercial": ((25000, 500000), (5.5, 12.0), (60, 84, 120, 180)),
+}
 LOAN_STATUSES = ["current", "current", "current", "current", "current",
                  "current", "delinquent_30", "delinquent_60", "paid_off", "charged_off"]
 DELINQUENCY_MAP = {
@@ -123,419 +190,2533 @@ COLLATERAL_TYPES = {
 def ts_millis(dt):
     return int(dt.timestamp() * 1000)
 
-def rand_date(start, end):
-    delta = end - start
-    return start + timedelta(seconds=random.randint(0, int(delta.total_seconds())))
+SECOND_MS = 1000
+DAY_MS = 86_400_000
+NOW_MS = ts_millis(NOW)
+BASE_MS = ts_millis(BASE_DATE)
+
+
+# ═══════════════════════════════════════════════════════════════
+# COLUMN HELPERS — whole-array draws shared by all datasets
+# ═══════════════════════════════════════════════════════════════
+def rand_millis(rng, start, end, n):
+    """Uniform whole-second epoch millis in [start, end] (scalars or arrays)."""
+    span = np.maximum(np.asarray(end) - start, 0) // SECOND_MS
+    return start + rng.integers(0, span + 1, n) * SECOND_MS
+
+def uniform2(rng, low, high, n):
+    return np.round(rng.uniform(low, high, n), 2)
+
+def pick(rng, values, n):
+    return np.asarray(values)[rng.integers(0, len(values), n)]
+
+def choose(rng, k, n, skew=0):
+    """n indexes into range(k): uniform, or Zipf-skewed with exponent `skew`.
+
+    Rank r gets weight ~1/(r+1)**skew (continuous Pareto inverse CDF, so any k
+    costs the same). Ranks are scattered over positions by a fixed bijection,
+    so the hottest keys are not simply the first rows of the first shard.
+    """
+    if not skew:
+        return rng.integers(0, k, n)
+    u = rng.random(n)
+    if skew == 1:
+        rank = np.expm1(u * np.log(k + 1))
+    else:
+        a = 1.0 - skew
+        rank = (u * ((k + 1.0) ** a - 1.0) + 1.0) ** (1.0 / a) - 1.0
+    rank = np.minimum(rank.astype(np.int64), k - 1)
+    step = 2654435761 % k or 1
+    while math.gcd(step, k) != 1:
+        step += 1
+    return (rank * step + 12345) % k
+
+def numbered(prefix, nums, width=0):
+    digits = nums.astype(np.int64).astype("U")
+    if width:
+        digits = np.char.zfill(digits, width)
+    return np.char.add(prefix, digits)
+
+def ascii_str(values):
+    """An ASCII bytes (S) array as str (U), each byte widened to its code point:
+    the same strings as astype(str), without decoding them one by one."""
+    values = np.ascontiguousarray(values)
+    return values.view(np.uint8).astype(np.uint32).view(f"U{values.dtype.itemsize}")
+
+_HEX = np.frombuffer(b"0123456789abcdef", np.uint8)
+# Output column of each hex digit in "xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx"
+_UUID_HEX_COLS = np.array([i for i in range(36) if i not in (8, 13, 18, 23)])
+
+def uuid4s(rng, n):
+    """n random (version 4) UUID strings from the seeded rng, formatted as whole arrays.
+
+    Same strings as str(uuid.UUID(bytes=..., version=4)) over the same 16-byte
+    blocks, without building a UUID object per row.
+    """
+    raw = np.frombuffer(rng.bytes(16 * n), np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = raw[:, 6] & 0x0F | 0x40  # version 4
+    raw[:, 8] = raw[:, 8] & 0x3F | 0x80  # RFC 4122 variant
+    text = np.full((n, 36), ord("-"), np.uint8)
+    text[:, _UUID_HEX_COLS[0::2]] = _HEX[raw >> 4]
+    text[:, _UUID_HEX_COLS[1::2]] = _HEX[raw & 0x0F]
+    return ascii_str(text.view("S36").ravel())
+
+def nullable(values, mask):
+    """Object column holding `values` where `mask` is set and None elsewhere."""
+    out = np.asarray(values).astype(object)
+    out[~mask] = None
+    return out
+
+def concat(batches):
+    return {name: np.concatenate([b[name] for b in batches]) for name in batches[0]}
+
+def take(batch, idx):
+    return {name: col[idx] for name, col in batch.items()}
+
+def batch_len(batch):
+    return len(next(iter(batch.values())))
+
+def scaled_counts(scale):
+    return {
+        "members": max(1, round(NUM_MEMBERS * scale)),
+        "accounts": max(1, round(NUM_ACCOUNTS * scale)),
+        "loans": max(1, round(NUM_LOANS * scale)),
+        "transactions": max(1, round(NUM_TRANSACTIONS * scale)),
+    }
+
+def parse_scale(value):
+    if value in SCALE_PROFILES:
+        return float(SCALE_PROFILES[value])
+    try:
+        scale = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected a number or one of {', '.join(SCALE_PROFILES)}")
+    if scale <= 0:
+        raise argparse.ArgumentTypeError("scale must be positive")
+    return scale
+
+def iter_rows(batch):
+    return zip(*(col.tolist() for col in batch.values()))
+
+def iter_records(batch):
+    names = list(batch)
+    for row in iter_rows(batch):
+        yield dict(zip(names, row))
+
+# Printable ASCII except '"' and backslash: strings json.dumps writes as-is in quotes
+_JSON_PLAIN = bytes(c for c in range(0x20, 0x7f) if c not in b'"\\')
+
+def json_column(col):
+    """(%-placeholder, values) that render each value of a column as json.dumps does."""
+    if col.dtype.kind in "iu":
+        return "%d", col.tolist()
+    if col.dtype.kind == "f" and np.isfinite(col).all():
+        return "%r", col.tolist()
+    if col.dtype.kind == "b":
+        return "%s", np.where(col, "true", "false").tolist()
+    values = col.tolist()
+    if col.dtype.kind == "U" and not "".join(values).encode().translate(None, _JSON_PLAIN):
+        return '"%s"', values
+    return "%s", [json.dumps(v) for v in values]
+
+def compact_json_lines(batch):
+    """json.dumps(record).encode() of every record in a batch.
+
+    Values are rendered column by column and each row fills a single
+    %-template, instead of building a dict and running the encoder per record.
+    """
+    template, columns = [], []
+    for name, col in batch.items():
+        placeholder, values = json_column(col)
+        template.append(json.dumps(name).replace("%", "%%") + ": " + placeholder)
+        columns.append(values)
+    template = "{" + ", ".join(template) + "}"
+    return [(template % row).encode() for row in zip(*columns)]
+
 
 # ═══════════════════════════════════════════════════════════════
 # DATASET 1: MEMBERS (CSV for S3)
 # ═══════════════════════════════════════════════════════════════
-def generate_members():
-    members = []
-    for i in range(NUM_MEMBERS):
-        city, state, zip_ = random.choice(CITIES_TX)
-        seg = random.choices(SEGMENTS, SEGMENT_WEIGHTS)[0]
-        join_date = rand_date(BASE_DATE - timedelta(days=3650), NOW - timedelta(days=30))
-
-        # Credit scores vary by segment
-        cs_ranges = {"platinum":(760,850),"gold":(700,780),"silver":(640,720),
-                     "bronze":(580,660),"new":(620,750)}
-        cs_min, cs_max = cs_ranges[seg]
-
-        # Income varies by segment
-        inc_ranges = {"platinum":(120000,350000),"gold":(80000,160000),
-                      "silver":(45000,100000),"bronze":(28000,55000),
-                      "new":(30000,80000)}
-        inc_min, inc_max = inc_ranges[seg]
-
-        dep = round(random.uniform(500, 500000 if seg=="platinum" else 50000), 2)
-        loans = round(random.uniform(0, 400000 if seg in ("platinum","gold") else 50000), 2)
-
-        m = {
-            "member_id": str(uuid.uuid4()),
-            "organization_id": ORG_ID,
-            "branch_id": random.choice(BRANCH_IDS),
-            "member_number": f"M{10000+i:06d}",
-            "first_name": random.choice(FIRST_NAMES),
-            "last_name": random.choice(LAST_NAMES),
-            "email": f"member{10000+i}@example.com",
-            "membership_status": random.choice(STATUSES),
-            "segment": seg,
-            "employment_status": random.choice(EMPLOYMENT),
-            "city": city,
-            "state": state,
-            "postal_code": zip_,
-            "credit_score": random.randint(cs_min, cs_max),
-            "risk_score": round(random.uniform(0, 45 if seg in ("platinum","gold") else 80), 2),
-            "total_deposits": dep,
-            "total_loans": loans,
-            "total_relationship_value": round(dep + loans, 2),
-            "annual_income": round(random.uniform(inc_min, inc_max), 2),
-            "membership_date": ts_millis(join_date),
-            "created_at": ts_millis(join_date + timedelta(seconds=random.randint(0, 3600))),
-        }
-        members.append(m)
-    return members
+_CS_RANGES = np.array([CREDIT_SCORE_RANGES[s] for s in SEGMENTS])
+_INC_RANGES = np.array([INCOME_RANGES[s] for s in SEGMENTS], dtype=float)
+_DEP_MAX = np.array([500000 if s == "platinum" else 50000 for s in SEGMENTS], dtype=float)
+_LOAN_MAX = np.array([400000 if s in ("platinum","gold") else 50000 for s in SEGMENTS], dtype=float)
+_RISK_MAX = np.array([45 if s in ("platinum","gold") else 80 for s in SEGMENTS], dtype=float)
+
+def generate_members(rng, n=NUM_MEMBERS, start=0, skew=None):
+    skew = skew or {}
+    seq = np.arange(start, start + n)
+    city = rng.integers(0, len(CITIES_TX), n)
+    cities = np.array(CITIES_TX)
+    seg = rng.choice(len(SEGMENTS), n, p=SEGMENT_WEIGHTS)
+    join = rand_millis(rng, BASE_MS - 3650 * DAY_MS, NOW_MS - 30 * DAY_MS, n)
+
+    dep = np.round(rng.uniform(500, _DEP_MAX[seg]), 2)
+    loans = np.round(rng.uniform(0, _LOAN_MAX[seg]), 2)
+
+    return {
+        "member_id": uuid4s(rng, n),
+        "organization_id": np.full(n, ORG_ID),
+        "branch_id": np.asarray(BRANCH_IDS)[choose(rng, len(BRANCH_IDS), n, skew.get("branches"))],
+        "member_number": numbered("M", 10000 + seq, 6),
+        "first_name": pick(rng, FIRST_NAMES, n),
+        "last_name": pick(rng, LAST_NAMES, n),
+        "email": np.char.add(numbered("member", 10000 + seq), "@example.com"),
+        "membership_status": pick(rng, STATUSES, n),
+        "segment": np.array(SEGMENTS)[seg],
+        "employment_status": pick(rng, EMPLOYMENT, n),
+        "city": cities[city, 0],
+        "state": cities[city, 1],
+        "postal_code": cities[city, 2],
+        "credit_score": rng.integers(_CS_RANGES[seg, 0], _CS_RANGES[seg, 1] + 1),
+        "risk_score": np.round(rng.uniform(0, _RISK_MAX[seg]), 2),
+        "total_deposits": dep,
+        "total_loans": loans,
+        "total_relationship_value": np.round(dep + loans, 2),
+        "annual_income": np.round(rng.uniform(_INC_RANGES[seg, 0], _INC_RANGES[seg, 1]), 2),
+        "membership_date": join,
+        "created_at": join + rng.integers(0, 3601, n) * SECOND_MS,
+    }
+
+
+def member_index(members):
+    """Positional parent keys for accounts and loans (row i ↔ member i).
+
+    `members` is either a full batch or the PARENT_KEYS columns kept after streaming.
+    """
+    return {
+        "active": np.flatnonzero(members["membership_status"] == "active"),
+        "member_id": members["member_id"],
+        "branch_id": members["branch_id"],
+        "membership_date": members["membership_date"],
+        "credit_score": members["credit_score"],
+        "annual_income": members["annual_income"],
+    }
 
 
 # ═══════════════════════════════════════════════════════════════
 # DATASET 2: ACCOUNTS (JSON for BigQuery)
 # ═══════════════════════════════════════════════════════════════
-def generate_accounts(members):
-    accounts = []
-    member_ids = [m["member_id"] for m in members if m["membership_status"] == "active"]
+_ACCT_TYPES = np.array([t for t, _ in ACCOUNT_TYPES_DEPOSIT + ACCOUNT_TYPES_LOAN])
+_ACCT_CATS = np.array([c for _, c in ACCOUNT_TYPES_DEPOSIT + ACCOUNT_TYPES_LOAN])
+_ACCT_MORTGAGE = np.char.find(_ACCT_TYPES, "mortgage") >= 0
 
-    for i in range(NUM_ACCOUNTS):
-        mid = random.choice(member_ids)
-        member = next(m for m in members if m["member_id"] == mid)
+def generate_accounts(rng, members, n=NUM_ACCOUNTS, start=0, skew=None, window=None,
+                      balance=None):
+    skew = skew or {}
+    seq = np.arange(start, start + n)
+    midx = members["active"][choose(rng, len(members["active"]), n, skew.get("members"))]
 
-        # 60% deposit, 40% loan/credit
-        if random.random() < 0.60:
-            atype, acat = random.choice(ACCOUNT_TYPES_DEPOSIT)
-            bal = round(random.uniform(100, 250000), 2)
-            avail = round(bal * random.uniform(0.85, 1.0), 2)
-            rate = round(random.uniform(0.01, 5.25), 4)
-        else:
-            atype, acat = random.choice(ACCOUNT_TYPES_LOAN)
-            bal = round(random.uniform(1000, 450000 if "mortgage" in atype else 50000), 2)
-            avail = round(random.uniform(0, bal * 0.3), 2) if acat == "credit" else 0.0
-            rate = round(random.uniform(3.5, 24.99 if acat == "credit" else 7.5), 4)
-
-        opened = rand_date(
-            datetime.fromtimestamp(member["membership_date"]/1000, tz=timezone.utc),
-            NOW - timedelta(days=7)
-        )
-        last_act = rand_date(opened, NOW)
-
-        a = {
-            "account_id": str(uuid.uuid4()),
-            "organization_id": ORG_ID,
-            "member_id": mid,
-            "branch_id": member["branch_id"],
-            "account_number": f"{'S' if acat=='deposit' else 'L'}{20000+i:08d}",
-            "account_type": atype,
-            "account_category": acat,
-            "status": random.choice(ACCT_STATUSES),
-            "is_primary": i < NUM_MEMBERS,  # First account per member is primary
-            "current_balance": bal,
-            "available_balance": avail,
-            "interest_rate": rate,
-            "ytd_interest": round(bal * rate / 100 * random.uniform(0.1, 0.8), 2),
-            "opened_date": ts_millis(opened),
-            "last_activity_date": ts_millis(last_act),
-        }
-        accounts.append(a)
-    return accounts
+    # 60% deposit, 40% loan/credit
+    is_dep = rng.random(n) < 0.60
+    code = np.where(is_dep,
+                    rng.integers(0, len(ACCOUNT_TYPES_DEPOSIT), n),
+                    len(ACCOUNT_TYPES_DEPOSIT) + rng.integers(0, len(ACCOUNT_TYPES_LOAN), n))
+    atype, acat = _ACCT_TYPES[code], _ACCT_CATS[code]
+    is_credit = acat == "credit"
+
+    bal = np.where(is_dep, uniform2(rng, 100, 250000, n),
+                   np.round(rng.uniform(1000, np.where(_ACCT_MORTGAGE[code], 450000, 50000)), 2))
+    if balance is not None:
+        # --ledger closing balances; available balance and YTD interest follow them
+        bal = balance
+    avail = np.where(is_dep, np.round(bal * rng.uniform(0.85, 1.0, n), 2),
+                     np.where(is_credit, np.round(bal * 0.3 * rng.random(n), 2), 0.0))
+    rate = np.where(is_dep, np.round(rng.uniform(0.01, 5.25, n), 4),
+                    np.round(rng.uniform(3.5, np.where(is_credit, 24.99, 7.5)), 4))
+
+    if window is None:
+        opened = rand_millis(rng, members["membership_date"][midx], NOW_MS - 7 * DAY_MS, n)
+        last_act = rand_millis(rng, opened, NOW_MS, n)
+    else:
+        # --delta: newly opened inside the cycle's window
+        opened = rand_millis(rng, window[0], window[1], n)
+        last_act = rand_millis(rng, opened, window[1], n)
+
+    return {
+        "account_id": uuid4s(rng, n),
+        "organization_id": np.full(n, ORG_ID),
+        "member_id": ascii_str(members["member_id"][midx]),
+        "branch_id": ascii_str(members["branch_id"][midx]),
+        "account_number": numbered(np.where(is_dep, "S", "L"), 20000 + seq, 8),
+        "account_type": atype,
+        "account_category": acat,
+        "status": pick(rng, ACCT_STATUSES, n),
+        "is_primary": seq < len(members["member_id"]),  # First account per member is primary
+        "current_balance": bal,
+        "available_balance": avail,
+        "interest_rate": rate,
+        "ytd_interest": np.round(bal * rate / 100 * rng.uniform(0.1, 0.8, n), 2),
+        "opened_date": opened,
+        "last_activity_date": last_act,
+    }
 
 
 # ═══════════════════════════════════════════════════════════════
 # DATASET 3: LOANS (JSON for PostgreSQL analytics.loans)
 # ═══════════════════════════════════════════════════════════════
-def generate_loans(members):
-    loans = []
-    active_members = [m for m in members if m["membership_status"] == "active"]
-
-    for i in range(NUM_LOANS):
-        member = random.choice(active_members)
-        mid = member["member_id"]
-
-        ltype, product_name, subtype, product_code = random.choice(LOAN_TYPES)
-        status = random.choice(LOAN_STATUSES)
-        dpd, delinquency_status = DELINQUENCY_MAP.get(status, (0, None))
-
-        # Amount ranges by type
-        if "mortgage" in ltype or ltype == "home_equity":
-            original = round(random.uniform(80000, 500000), 2)
-            rate = round(random.uniform(3.5, 7.5), 4)
-            term = random.choice([180, 240, 360])
-        elif "auto" in ltype:
-            original = round(random.uniform(10000, 65000), 2)
-            rate = round(random.uniform(3.9, 8.9), 4)
-            term = random.choice([36, 48, 60, 72, 84])
-        elif ltype == "heloc":
-            original = round(random.uniform(20000, 250000), 2)
-            rate = round(random.uniform(6.0, 10.5), 4)
-            term = random.choice([120, 180, 240])
-        elif ltype == "credit_card":
-            original = round(random.uniform(1000, 25000), 2)
-            rate = round(random.uniform(12.99, 24.99), 4)
-            term = 0  # revolving
-        elif ltype == "student":
-            original = round(random.uniform(5000, 80000), 2)
-            rate = round(random.uniform(4.5, 9.0), 4)
-            term = random.choice([120, 180, 240])
-        elif ltype == "commercial":
-            original = round(random.uniform(25000, 500000), 2)
-            rate = round(random.uniform(5.5, 12.0), 4)
-            term = random.choice([60, 84, 120, 180])
+_LOAN_COLS = np.array(LOAN_TYPES).T  # ltype, product_name, subtype, product_code
+_LOAN_AMT = np.array([LOAN_PRICING[t][0] for t in _LOAN_COLS[0]], dtype=float)
+_LOAN_RATE = np.array([LOAN_PRICING[t][1] for t in _LOAN_COLS[0]], dtype=float)
+_LOAN_TERM_N = np.array([len(LOAN_PRICING[t][2]) for t in _LOAN_COLS[0]])
+_LOAN_TERMS = np.array([LOAN_PRICING[t][2] + (0,) * (_LOAN_TERM_N.max() - len(LOAN_PRICING[t][2]))
+                        for t in _LOAN_COLS[0]])
+_LOAN_COLLATERAL = np.array([COLLATERAL_TYPES.get(t, "") for t in _LOAN_COLS[0]])
+_LOAN_FIXED = np.array(["fixed" in t or t in ("auto_new", "auto_used", "personal", "student")
+                        for t in _LOAN_COLS[0]])
+_LOAN_STATUSES = np.array(LOAN_STATUSES)
+_LOAN_DPD = np.array([DELINQUENCY_MAP[s][0] for s in LOAN_STATUSES])
+_LOAN_DELINQUENCY = np.array([DELINQUENCY_MAP[s][1] or "" for s in LOAN_STATUSES])
+
+def generate_loans(rng, members, n=NUM_LOANS, start=0, skew=None):
+    skew = skew or {}
+    seq = np.arange(start, start + n)
+    midx = members["active"][choose(rng, len(members["active"]), n, skew.get("members"))]
+
+    lt = rng.integers(0, len(LOAN_TYPES), n)
+    st = rng.integers(0, len(LOAN_STATUSES), n)
+    status = _LOAN_STATUSES[st]
+    paid_off = status == "paid_off"
+
+    # Amount ranges by type
+    original = np.round(rng.uniform(_LOAN_AMT[lt, 0], _LOAN_AMT[lt, 1]), 2)
+    rate = np.round(rng.uniform(_LOAN_RATE[lt, 0], _LOAN_RATE[lt, 1]), 4)
+    term = _LOAN_TERMS[lt, (rng.random(n) * _LOAN_TERM_N[lt]).astype(np.int64)]
+    amortizing = term > 0
+
+    origination = rand_millis(rng, members["membership_date"][midx], NOW_MS - 60 * DAY_MS, n)
+    elapsed_months = np.maximum(1, (NOW_MS - origination) // DAY_MS // 30)
+    remaining = np.where(amortizing, np.maximum(0, term - elapsed_months), 0)
+
+    # Current balance decays from original
+    paydown = np.maximum(0.05, 1.0 - elapsed_months / np.maximum(term, 1))
+    current = np.where(amortizing,
+                       np.round(original * paydown * rng.uniform(0.85, 1.05, n), 2),
+                       np.round(original * rng.uniform(0.1, 0.95, n), 2))
+    current = np.where(paid_off, 0.0, current)
+
+    monthly_payment = np.where(amortizing,
+                               np.round(original / np.maximum(term, 12) * (1 + rate / 1200), 2),
+                               np.round(current * 0.02, 2))
+    apr = np.round(rate + rng.uniform(0.1, 0.5, n), 4)
+
+    # Collateral
+    coll_type = _LOAN_COLLATERAL[lt]
+    has_coll = coll_type != ""
+    coll_value = np.round(original * rng.uniform(1.0, 1.5, n), 2)
+    ltv = np.round(original / coll_value * 100, 2)
+
+    maturity = origination + term * 30 * DAY_MS
+    last_payment = np.where(paid_off, origination + elapsed_months * 30 * DAY_MS,
+                            rand_millis(rng, NOW_MS - 60 * DAY_MS, NOW_MS, n))
+    open_loan = ~paid_off & (status != "charged_off")
+
+    income = members["annual_income"][midx]
+    dti = np.round(monthly_payment / (income / 12) * 100, 2)
+    delinquency = _LOAN_DELINQUENCY[st]
+
+    return {
+        "loan_id": uuid4s(rng, n),
+        "organization_id": np.full(n, ORG_ID),
+        "member_id": ascii_str(members["member_id"][midx]),
+        "branch_id": ascii_str(members["branch_id"][midx]),
+        "loan_number": numbered("LN", 30000 + seq, 8),
+        "loan_type": _LOAN_COLS[0][lt],
+        "loan_subtype": _LOAN_COLS[2][lt],
+        "product_code": _LOAN_COLS[3][lt],
+        "product_name": _LOAN_COLS[1][lt],
+        "status": status,
+        "original_amount": original,
+        "current_balance": current,
+        "monthly_payment": monthly_payment,
+        "interest_rate": rate,
+        "rate_type": np.where(_LOAN_FIXED[lt], "fixed", "variable"),
+        "apr": apr,
+        "term_months": term,
+        "remaining_months": remaining,
+        "origination_date": origination,
+        "maturity_date": nullable(maturity, amortizing),
+        "next_payment_date": nullable(last_payment + 30 * DAY_MS, open_loan),
+        "last_payment_date": last_payment,
+        "days_past_due": _LOAN_DPD[st],
+        "delinquency_status": nullable(delinquency, delinquency != ""),
+        "collateral_type": nullable(coll_type, has_coll),
+        "collateral_value": nullable(coll_value, has_coll),
+        "ltv_ratio": nullable(ltv, has_coll),
+        "credit_score_at_origination": members["credit_score"][midx],
+        "dti_ratio": nullable(dti, income > 0),
+        "created_at": origination + rng.integers(0, 3601, n) * SECOND_MS,
+    }
+
+
+def account_index(accounts):
+    """Positional parent keys for transactions (row i ↔ account i)."""
+    return {
+        "active": np.flatnonzero(accounts["status"] == "active"),
+        "account_id": accounts["account_id"],
+        "member_id": accounts["member_id"],
+        "branch_id": accounts["branch_id"],
+        "current_balance": accounts["current_balance"],
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# DATASET 4: TRANSACTIONS (JSONL for Kafka)
+# ═══════════════════════════════════════════════════════════════
+_TXN_TYPES = np.array(TXN_TYPES)
+_TXN_AMT = np.array([TXN_AMOUNTS[t] for t in TXN_TYPES], dtype=float)
+_TXN_CREDIT = np.isin(_TXN_TYPES, ["deposit", "ach_credit"])
+_TXN_CARD = np.isin(_TXN_TYPES, ["card_purchase", "card_refund"])
+_CHANNELS = np.array(CHANNELS)
+_TXN_STATUSES = np.array(TXN_STATUSES)
+_MERCHANTS = np.array(MERCHANTS)
+# Merchant names ("" = no merchant) and their sort order, for the key report
+_MERCHANT_NAMES = np.array([""] + [m[0] for m in MERCHANTS])
+_MERCHANT_ORDER = np.argsort(_MERCHANT_NAMES, kind="stable")
+_TXN_DESCRIPTIONS = np.array([[f"{t.replace('_',' ').title()} via {c}" for c in CHANNELS]
+                              for t in TXN_TYPES])
+
+TXN_WINDOW = (NOW_MS - 90 * DAY_MS, NOW_MS)
+
+def generate_transactions(rng, accounts, n=NUM_TRANSACTIONS, window=TXN_WINDOW, profile=None,
+                          skew=None, ledger=None):
+    skew = skew or {}
+    aidx = accounts["active"][choose(rng, len(accounts["active"]), n, skew.get("accounts"))]
+
+    tt = rng.integers(0, len(TXN_TYPES), n)
+    ch = rng.integers(0, len(CHANNELS), n)
+
+    # Amount ranges by type
+    amt = np.round(rng.uniform(_TXN_AMT[tt, 0], _TXN_AMT[tt, 1]), 2) * _TXN_AMT[tt, 2]
+    amt = np.where(amt == 0, 10.00, amt)
+    bal_after = np.round(accounts["current_balance"][aidx] + amt, 2)
+
+    # 2% suspicious transactions
+    susp = rng.random(n) < 0.02
+    risk = np.where(susp, uniform2(rng, 80, 99, n), uniform2(rng, 0, 15, n))
+    amt = np.where(susp & _TXN_CREDIT[tt], uniform2(rng, 9000, 50000, n), amt)
+
+    # Merchant for card/pos transactions
+    has_merchant = _TXN_CARD[tt] | (_CHANNELS[ch] == "pos")
+    midx = choose(rng, len(MERCHANTS), n, skew.get("merchants"))
+
+    txn_ids = uuid4s(rng, n)
+    status = rng.choice(len(TXN_STATUSES), n, p=TXN_STATUS_WEIGHTS)
+    ts = (profile_millis(rng, window, n, profile) if profile
+          else rand_millis(rng, window[0], window[1], n))
+
+    # Sort by timestamp for realistic streaming order; the per-row draws are
+    # reordered before the string columns are gathered from them
+    order = np.argsort(ts, kind="stable")
+    aidx, tt, ch, amt, bal_after, risk, has_merchant, midx, status = (
+        a[order] for a in (aidx, tt, ch, amt, bal_after, risk, has_merchant, midx, status))
+    txns = {
+        "transaction_id": txn_ids[order],
+        "organization_id": np.full(n, ORG_ID),
+        "member_id": ascii_str(accounts["member_id"][aidx]),
+        "account_id": ascii_str(accounts["account_id"][aidx]),
+        "branch_id": ascii_str(accounts["branch_id"][aidx]),
+        "transaction_type": _TXN_TYPES[tt],
+        "channel": _CHANNELS[ch],
+        "status": _TXN_STATUSES[status],
+        "description": _TXN_DESCRIPTIONS[tt, ch],
+        "merchant_name": np.where(has_merchant, _MERCHANTS[midx, 0], ""),
+        "merchant_category": np.where(has_merchant, _MERCHANTS[midx, 1], ""),
+        "amount": amt,
+        "balance_after": bal_after,
+        "risk_score": risk,
+        "is_suspicious": risk >= 80.0,
+        "timestamp": ts[order],
+    }
+    if ledger is not None:
+        txns["balance_after"] = ledger.post(aidx, txns["amount"], txns["status"])
+    return txns
+
+
+# ═══════════════════════════════════════════════════════════════
+# LOAD PROFILES — transaction intensity over time (--profile)
+# ═══════════════════════════════════════════════════════════════
+# Relative weights; hours and weekdays are local time (Central, no DST)
+_HOURLY = [0.15, 0.10, 0.08, 0.08, 0.10, 0.20, 0.45, 0.80, 1.10, 1.20, 1.30, 1.60,
+           2.00, 1.70, 1.30, 1.20, 1.40, 1.80, 1.90, 1.60, 1.20, 0.90, 0.60, 0.30]
+_WEEKLY = [1.00, 0.95, 0.95, 1.00, 1.30, 1.20, 0.70]  # Monday first
+LOAD_PROFILES = {
+    "flat": {},
+    "diurnal": {"utc_offset_hours": -6, "hourly": _HOURLY, "weekly": _WEEKLY},
+    "payroll": {"utc_offset_hours": -6, "hourly": _HOURLY, "weekly": _WEEKLY,
+                "paydays": {"days": [1, 15], "multiplier": 2.5},
+                "month_end": {"days": 2, "multiplier": 1.8}},
+    "flash": {"utc_offset_hours": -6, "hourly": _HOURLY, "weekly": _WEEKLY,
+              "paydays": {"days": [1, 15], "multiplier": 2.5},
+              "month_end": {"days": 2, "multiplier": 1.8},
+              "flash": {"per_day": 0.2, "minutes": 15, "multiplier": 12}},
+}
+PROFILE_BUCKET_MS = 60 * SECOND_MS
+PROFILE_KEY = 6  # seeds flash-crowd placement apart from the DATASET_KEYS streams
+
+def parse_profile(value):
+    """--profile: a LOAD_PROFILES name or a JSON file with the same keys."""
+    if value in LOAD_PROFILES:
+        return dict(LOAD_PROFILES[value], name=value)
+    try:
+        with open(value) as f:
+            spec = json.load(f)
+    except (OSError, ValueError) as e:
+        raise argparse.ArgumentTypeError(
+            f"expected one of {', '.join(LOAD_PROFILES)} or a JSON profile file ({e})")
+    return dict(spec, name=os.path.splitext(os.path.basename(value))[0])
+
+def resolve_profile(spec, window, rng):
+    """The profile with its flash crowds placed as absolute [start, end, multiplier] events."""
+    profile = {k: v for k, v in spec.items() if k not in ("name", "flash")}
+    flash = spec.get("flash")
+    if flash:
+        k = rng.poisson(flash["per_day"] * (window[1] - window[0]) / DAY_MS)
+        starts = np.sort(rand_millis(rng, window[0], window[1], k))
+        profile["flash_events"] = [[int(t), int(t) + flash["minutes"] * 60 * SECOND_MS,
+                                    flash["multiplier"]] for t in starts]
+    return profile
+
+def profile_weights(profile, t):
+    """Relative intensity at epoch millis t."""
+    w = np.ones(len(t))
+    local = t + round(profile.get("utc_offset_hours", 0) * 3600) * SECOND_MS
+    days = local // DAY_MS
+    if "hourly" in profile:
+        w *= np.asarray(profile["hourly"])[local // 3_600_000 % 24]
+    if "weekly" in profile:
+        w *= np.asarray(profile["weekly"])[(days + 3) % 7]  # 1970-01-01 was a Thursday
+    if "paydays" in profile or "month_end" in profile:
+        date = days.astype("datetime64[D]")
+        month = date.astype("datetime64[M]")
+        day = (date - month.astype("datetime64[D]")).astype(np.int64) + 1
+        if "paydays" in profile:
+            w *= np.where(np.isin(day, profile["paydays"]["days"]),
+                          profile["paydays"]["multiplier"], 1.0)
+        if "month_end" in profile:
+            month_days = ((month + 1).astype("datetime64[D]")
+                          - month.astype("datetime64[D]")).astype(np.int64)
+            w *= np.where(day > month_days - profile["month_end"]["days"],
+                          profile["month_end"]["multiplier"], 1.0)
+    for start, end, multiplier in profile.get("flash_events", ()):
+        w[(t >= start) & (t < end)] *= multiplier
+    return w
+
+def profile_cdf(profile, window):
+    """Breakpoints (epoch millis) and cumulative intensity over [start, end + 1s).
+
+    Intensity is constant within each minute of an absolute minute grid, so
+    any slicing of a window sees the same curve.
+    """
+    start, stop = window[0], window[1] + SECOND_MS
+    grid = np.arange(start // PROFILE_BUCKET_MS * PROFILE_BUCKET_MS, stop + PROFILE_BUCKET_MS,
+                     PROFILE_BUCKET_MS)
+    edges = np.clip(grid, start, stop)
+    mass = profile_weights(profile, grid[:-1]) * np.diff(edges)
+    return edges, np.concatenate([[0.0], np.cumsum(mass)])
+
+def profile_millis(rng, window, n, profile):
+    """Whole-second epoch millis in [start, end], drawn by inverse CDF of the profile."""
+    edges, cum = profile_cdf(profile, window)
+    t = np.interp(rng.random(n) * cum[-1], cum, edges).astype(np.int64)
+    return np.minimum(window[0] + (t - window[0]) // SECOND_MS * SECOND_MS, window[1])
+
+
+# ═══════════════════════════════════════════════════════════════
+# KEY SKEW — hot keys (--skew) and how they land on Kafka partitions
+# ═══════════════════════════════════════════════════════════════
+# Selections that --skew can bias, and what is drawn in each
+SKEW_KEYS = {
+    "accounts": "account behind each transaction",
+    "members": "member owning each account and loan",
+    "merchants": "merchant of each card/POS transaction",
+    "branches": "home branch of each member",
+}
+# Transaction fields a Kafka producer might key on
+PARTITION_KEYS = ("transaction_id", "account_id", "member_id")
+DEFAULT_REPORT_PARTITIONS = 3  # load_kafka.py --partitions default
+HOTTEST_KEYS = 5
+
+def parse_skew(value):
+    """--skew: one Zipf exponent for every key, or key=exponent pairs."""
+    try:
+        if "=" not in value:
+            return {key: float(value) for key in SKEW_KEYS}
+        skew = {}
+        for item in value.split(","):
+            key, _, exponent = item.partition("=")
+            if key.strip() not in SKEW_KEYS:
+                raise ValueError(f"unknown key '{key.strip()}'")
+            skew[key.strip()] = float(exponent)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(
+            f"expected an exponent or {'/'.join(SKEW_KEYS)}=exponent pairs ({e})")
+    if any(v < 0 for v in skew.values()):
+        raise argparse.ArgumentTypeError("skew exponents must be >= 0")
+    return {key: v for key, v in skew.items() if v}
+
+def _murmur2_fixed(data):
+    """murmur2 of each row of an (n, length) uint8 array."""
+    m = np.uint32(0x5bd1e995)
+    n, length = data.shape
+    h = np.full(n, 0x9747b28c ^ length, np.uint32)
+    blocks = length // 4
+    words = np.ascontiguousarray(data[:, :blocks * 4]).view("<u4")
+    for i in range(blocks):
+        k = words[:, i] * m
+        k ^= k >> np.uint32(24)
+        k *= m
+        h *= m
+        h ^= k
+    tail = data[:, blocks * 4:].astype(np.uint32)
+    rem = length % 4
+    if rem == 3:
+        h ^= tail[:, 2] << np.uint32(16)
+    if rem >= 2:
+        h ^= tail[:, 1] << np.uint32(8)
+    if rem >= 1:
+        h ^= tail[:, 0]
+        h *= m
+    h ^= h >> np.uint32(13)
+    h *= m
+    h ^= h >> np.uint32(15)
+    return h
+
+def murmur2(keys):
+    """Kafka's murmur2 (the default partitioner's hash) of each key, vectorized."""
+    keys = np.asarray(keys, dtype="S")
+    lengths = np.char.str_len(keys)
+    out = np.empty(len(keys), np.uint32)
+    with np.errstate(over="ignore"):
+        for length in np.unique(lengths):
+            idx = np.flatnonzero(lengths == length)
+            data = keys[idx].view(np.uint8).reshape(len(idx), keys.itemsize)[:, :length]
+            out[idx] = _murmur2_fixed(data)
+    return out
+
+def kafka_partition(keys, partitions):
+    """Partition the Kafka default partitioner picks for each (non-null) key."""
+    return (murmur2(keys) & 0x7fffffff) % partitions
+
+def key_traffic(batch, ids, order, partitions):
+    """Per-batch transaction counts per account (account ids `ids`, sorted by
+    `order`), per merchant and per Kafka partition of each PARTITION_KEYS field;
+    shards add them up."""
+    aidx = order[np.searchsorted(ids, batch["account_id"].astype("S"), sorter=order)]
+    merchant = np.searchsorted(_MERCHANT_NAMES, batch["merchant_name"], sorter=_MERCHANT_ORDER)
+    traffic = {"per_account": np.bincount(aidx, minlength=len(ids)),
+               "per_merchant": np.bincount(_MERCHANT_ORDER[merchant], minlength=len(_MERCHANT_NAMES))}
+    for key in PARTITION_KEYS:
+        traffic[f"partitions_{key}"] = np.bincount(kafka_partition(batch[key], partitions),
+                                                   minlength=partitions)
+    return traffic
+
+def key_summary(names, counts):
+    """Concentration of traffic over one kind of key."""
+    order = np.argsort(counts, kind="stable")[::-1]
+    total = max(int(counts.sum()), 1)
+    top = max(1, len(counts) // 100)
+    return {
+        "keys": len(counts),
+        "keys_with_traffic": int(np.count_nonzero(counts)),
+        "top_1pct_share": round(float(counts[order[:top]].sum()) / total, 4),
+        "top_10_share": round(float(counts[order[:10]].sum()) / total, 4),
+        "max_over_mean": round(float(counts.max()) / (total / len(counts)), 2),
+        "hottest": [[str(names[i]), int(counts[i])] for i in order[:HOTTEST_KEYS]],
+    }
+
+def key_report(traffic, accounts, n_members):
+    """Per-key and per-partition distribution of the transaction stream."""
+    per_account = traffic["per_account"]
+    members, member_idx = np.unique(accounts["member_id"], return_inverse=True)
+    branches, branch_idx = np.unique(accounts["branch_id"], return_inverse=True)
+    # Members with no account never see a transaction but still count as keys
+    per_member = np.zeros(max(n_members, len(members)), np.int64)
+    per_member[:len(members)] = np.bincount(member_idx, per_account, len(members))
+    report = {
+        "accounts": key_summary(accounts["account_id"].astype(str), per_account),
+        "members": key_summary(np.concatenate([members.astype(str),
+                                               np.full(len(per_member) - len(members), "")]),
+                               per_member),
+        "branches": key_summary(branches.astype(str),
+                                np.bincount(branch_idx, per_account, len(branches))),
+        # Transactions without a merchant are left out
+        "merchants": key_summary(_MERCHANT_NAMES[1:], traffic["per_merchant"][1:]),
+        "partitions": {},
+    }
+    for key in PARTITION_KEYS:
+        counts = traffic[f"partitions_{key}"]
+        report["partitions"][key] = {
+            "records": counts.tolist(),
+            "max_over_mean": round(float(counts.max()) / max(counts.mean(), 1), 2),
+        }
+    return report
+
+def print_key_report(report):
+    print("═══ Key Distribution ═══")
+    print(f"  {'Key':<10} {'keys':>9} {'w/ traffic':>11} {'top 1%':>7} {'top 10':>7} {'max/mean':>9}")
+    for name in SKEW_KEYS:
+        r = report[name]
+        print(f"  {name:<10} {r['keys']:>9,} {r['keys_with_traffic']:>11,} "
+              f"{r['top_1pct_share']:>7.1%} {r['top_10_share']:>7.1%} {r['max_over_mean']:>9.1f}")
+    for name in SKEW_KEYS:
+        hottest = ", ".join(f"{k} ({c:,})" for k, c in report[name]["hottest"][:3])
+        print(f"  Hottest {name + ':':<10} {hottest}")
+    partitions = len(report["partitions"][PARTITION_KEYS[0]]["records"])
+    print(f"  Kafka partitions ({partitions}, murmur2) by message key:")
+    for key, r in report["partitions"].items():
+        print(f"    {key + ':':<16} {' / '.join(f'{c:,}' for c in r['records'])}"
+              f"  (max/mean {r['max_over_mean']:.2f})")
+    print()
+
+
+# ═══════════════════════════════════════════════════════════════
+# SHARDING — per-shard seeds derived from one master seed
+# ═══════════════════════════════════════════════════════════════
+DATASET_KEYS = {"members": 1, "accounts": 2, "loans": 3, "transactions": 4}
+
+def dataset_key(dataset):
+    """Seed stream of a dataset; schema-driven tables get one from their name."""
+    return DATASET_KEYS.get(dataset) or 1000 + zlib.crc32(dataset.encode())
+
+def shard_rng(seed, dataset, shard):
+    return np.random.default_rng(
+        np.random.SeedSequence(seed, spawn_key=(dataset_key(dataset), shard)))
+
+# Rows of a shard are drawn RNG_BLOCK at a time, each block from its own
+# stream, and regrouped into --batch-size batches, so the batch size never
+# changes a value.
+RNG_BLOCK = 10_000
+BLOCK_STREAM = 8
+
+def block_rng(seed, dataset, shard, block, stream=BLOCK_STREAM):
+    return np.random.default_rng(np.random.SeedSequence(
+        seed, spawn_key=(dataset_key(dataset), shard, stream, block)))
+
+def shard_ranges(n, shards):
+    """Contiguous (start, count) row ranges; a shard's rows never depend on the worker count."""
+    bounds = [n * k // shards for k in range(shards + 1)]
+    return [(bounds[k], bounds[k + 1] - bounds[k]) for k in range(shards)]
+
+def split_window(rng, window, n, pieces, profile=None):
+    """Split a [start, end] millis window into consecutive (window, count) slices.
+
+    Counts are multinomial in the slice lengths (or, with a load profile, in
+    the profile's intensity over each slice), which is exactly how n
+    timestamps over the whole window would fall, so drawing each slice's
+    timestamps independently and emitting slices in order yields a globally
+    sorted sample without ever sorting more than one slice.
+    """
+    start, end = window
+    seconds = (end - start) // SECOND_MS + 1
+    pieces = max(1, min(pieces, seconds))
+    edges = [seconds * k // pieces for k in range(pieces + 1)]
+    if profile:
+        xp, cum = profile_cdf(profile, window)
+        mass = np.interp(start + np.array(edges) * SECOND_MS, xp, cum)
+        counts = rng.multinomial(n, np.diff(mass) / mass[-1])
+    else:
+        counts = rng.multinomial(n, np.diff(edges) / seconds)
+    return [((start + edges[k] * SECOND_MS, start + (edges[k + 1] - 1) * SECOND_MS), int(c))
+            for k, c in enumerate(counts)]
+
+def transaction_slices(seed, n, shards, window=TXN_WINDOW, profile=None):
+    """Time-sliced shards: concatenating them in order is sorted by timestamp."""
+    plan = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(DATASET_KEYS["transactions"],)))
+    return split_window(plan, window, n, shards, profile)
+
+_PARENTS = None
+
+def _set_parents(parents):
+    global _PARENTS
+    _PARENTS = parents
+
+def run_shards(fn, tasks, workers, parents=None):
+    """Run shard tasks and return their results in shard order."""
+    if workers <= 1 or len(tasks) <= 1:
+        _set_parents(parents)
+        return [fn(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)),
+                             initializer=_set_parents, initargs=(parents,)) as pool:
+        return list(pool.map(fn, tasks))
+
+
+# ═══════════════════════════════════════════════════════════════
+# PINOT SCHEMAS — column types for columnar output
+# ═══════════════════════════════════════════════════════════════
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "scripts", "pinot-configs", "schemas")
+PINOT_ARROW_TYPES = {
+    "STRING": "string", "INT": "int32", "LONG": "int64", "FLOAT": "float32",
+    "DOUBLE": "double", "BOOLEAN": "bool", "TIMESTAMP": "timestamp[ms]", "BYTES": "binary",
+}
+PINOT_FIELD_KINDS = {"dimensionFieldSpecs": "dimension", "metricFieldSpecs": "metric",
+                     "dateTimeFieldSpecs": "datetime"}
+_SCHEMA_CACHE = {}
+
+def schema_path(dataset):
+    return os.path.join(SCHEMA_DIR, f"{dataset}-schema.json")
+
+def has_pinot_schema(dataset):
+    return os.path.exists(schema_path(dataset))
+
+def load_pinot_fields(dataset):
+    """[(name, dataType, kind)] in schema order; kind is dimension, metric or datetime."""
+    if dataset not in _SCHEMA_CACHE:
+        with open(schema_path(dataset)) as f:
+            spec = json.load(f)
+        _SCHEMA_CACHE[dataset] = [(field["name"], field["dataType"], kind)
+                                  for key, kind in PINOT_FIELD_KINDS.items()
+                                  for field in spec.get(key, [])]
+    return _SCHEMA_CACHE[dataset]
+
+def load_pinot_schema(dataset):
+    """Column name → Pinot dataType from scripts/pinot-configs/schemas/<dataset>-schema.json."""
+    return {name: data_type for name, data_type, _ in load_pinot_fields(dataset)}
+
+def arrow_schema(dataset, columns):
+    import pyarrow as pa
+    types = load_pinot_schema(dataset)
+    missing = [c for c in columns if c not in types]
+    if missing:
+        raise ValueError(f"{dataset}: columns missing from the Pinot schema: {', '.join(missing)}")
+    return pa.schema([(c, pa.type_for_alias(PINOT_ARROW_TYPES[types[c]])) for c in columns])
+
+
+# ═══════════════════════════════════════════════════════════════
+# SCHEMA-DRIVEN COLUMNS — Pinot schema + per-column distributions
+# ═══════════════════════════════════════════════════════════════
+# Generator specs: scripts/pinot-configs/generators/<table>.json
+#   {"rows": 1000, "parent": "accounts",
+#    "columns": {"<column>": {"dist": "<DISTRIBUTIONS name>", ...params, "null_rate": 0.1}}}
+# A table with a Pinot schema and a spec but no hand-written generator is
+# generated entirely from them (--tables). Columns a hand-written generator
+# does not produce are filled the same way, so a schema change alone adds them.
+SPEC_DIR = os.path.join(os.path.dirname(SCHEMA_DIR), "generators")
+SCHEMA_STREAM = 7  # seeds schema-only columns of built-in datasets apart from their other fields
+# numpy dtype each Pinot dataType is generated as (columnar output casts further)
+PINOT_NUMPY_TYPES = {"STRING": str, "INT": np.int64, "LONG": np.int64, "FLOAT": np.float64,
+                     "DOUBLE": np.float64, "BOOLEAN": bool, "TIMESTAMP": np.int64}
+# Used for columns without a spec, by dataType (datetime fields are timestamps)
+DEFAULT_DISTRIBUTIONS = {
+    "STRING": {"dist": "uuid"},
+    "INT": {"dist": "uniform", "low": 0, "high": 1000},
+    "LONG": {"dist": "uniform", "low": 0, "high": 1000},
+    "FLOAT": {"dist": "uniform", "low": 0, "high": 1000, "decimals": 2},
+    "DOUBLE": {"dist": "uniform", "low": 0, "high": 1000, "decimals": 2},
+    "BOOLEAN": {"dist": "bernoulli", "p": 0.5},
+    "TIMESTAMP": {"dist": "timestamp"},
+}
+DISTRIBUTIONS = {}
+
+def distribution(name):
+    """Register fn(rng, n, spec, ctx) → array as the "dist": name column distribution.
+
+    ctx holds "type" (Pinot dataType), "start" (row number of the batch's first
+    row) and "parent" (the parent row of each record, when the table has one).
+    """
+    def register(fn):
+        DISTRIBUTIONS[name] = fn
+        return fn
+    return register
+
+@distribution("constant")
+def _dist_constant(rng, n, spec, ctx):
+    return np.full(n, spec["value"])
+
+@distribution("uuid")
+def _dist_uuid(rng, n, spec, ctx):
+    return uuid4s(rng, n)
+
+@distribution("sequence")
+def _dist_sequence(rng, n, spec, ctx):
+    """prefix + zero-padded row number; unique across shards of range-sharded tables."""
+    return numbered(spec.get("prefix", ""), spec.get("start", 1) + ctx["start"] + np.arange(n),
+                    spec.get("width", 0))
+
+@distribution("choice")
+def _dist_choice(rng, n, spec, ctx):
+    """One of "values", uniform, by "weights", or Zipf-skewed by "skew"."""
+    values = np.asarray(spec["values"])
+    if "weights" in spec:
+        p = np.asarray(spec["weights"], dtype=float)
+        return values[rng.choice(len(values), n, p=p / p.sum())]
+    return values[choose(rng, len(values), n, spec.get("skew"))]
+
+def _rounded(values, spec):
+    return np.round(values, spec["decimals"]) if "decimals" in spec else values
+
+@distribution("uniform")
+def _dist_uniform(rng, n, spec, ctx):
+    if ctx["type"] in ("INT", "LONG"):
+        return rng.integers(spec.get("low", 0), spec.get("high", 1000), n, endpoint=True)
+    return _rounded(rng.uniform(spec.get("low", 0), spec.get("high", 1), n), spec)
+
+@distribution("normal")
+def _dist_normal(rng, n, spec, ctx):
+    values = rng.normal(spec.get("mean", 0), spec.get("std", 1), n)
+    return _rounded(np.clip(values, spec.get("min", -np.inf), spec.get("max", np.inf)), spec)
+
+@distribution("lognormal")
+def _dist_lognormal(rng, n, spec, ctx):
+    """exp(N(mean, sigma)), i.e. median e**mean; heavy right tail for money amounts."""
+    values = rng.lognormal(spec.get("mean", 0), spec.get("sigma", 1), n)
+    return _rounded(np.clip(values, spec.get("min", 0), spec.get("max", np.inf)), spec)
+
+@distribution("bernoulli")
+def _dist_bernoulli(rng, n, spec, ctx):
+    return rng.random(n) < spec.get("p", 0.5)
+
+@distribution("timestamp")
+def _dist_timestamp(rng, n, spec, ctx):
+    """Epoch millis in the last "days" days (default 365), whole "granularity_ms"."""
+    granularity = spec.get("granularity_ms", SECOND_MS)
+    start = NOW_MS - round(spec.get("days", 365) * DAY_MS)
+    return rng.integers(start // granularity, NOW_MS // granularity, n, endpoint=True) * granularity
+
+@distribution("parent")
+def _dist_parent(rng, n, spec, ctx):
+    """A column of the table's parent row (see the spec's "parent")."""
+    parents, idx = ctx["parent"]
+    return parents[spec.get("column")][idx].astype(str)
+
+_SPEC_CACHE = {}
+
+def load_table_spec(dataset):
+    """The generator spec for a table ({} if it has none)."""
+    if dataset not in _SPEC_CACHE:
+        path = os.path.join(SPEC_DIR, f"{dataset}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                _SPEC_CACHE[dataset] = json.load(f)
         else:
-            original = round(random.uniform(2000, 30000), 2)
-            rate = round(random.uniform(7.0, 18.0), 4)
-            term = random.choice([24, 36, 48, 60])
-
-        origination = rand_date(
-            datetime.fromtimestamp(member["membership_date"] / 1000, tz=timezone.utc),
-            NOW - timedelta(days=60)
-        )
-        elapsed_months = max(1, int((NOW - origination).days / 30))
-        remaining = max(0, term - elapsed_months) if term > 0 else 0
-
-        # Current balance decays from original
-        if status == "paid_off":
-            current = 0.0
-        elif term > 0:
-            paydown_factor = max(0.05, 1.0 - (elapsed_months / term))
-            current = round(original * paydown_factor * random.uniform(0.85, 1.05), 2)
+            _SPEC_CACHE[dataset] = {}
+    return _SPEC_CACHE[dataset]
+
+def schema_tables():
+    """Tables that can be generated from a Pinot schema and generator spec alone."""
+    if not os.path.isdir(SPEC_DIR):
+        return []
+    names = (f[:-len(".json")] for f in sorted(os.listdir(SPEC_DIR)) if f.endswith(".json"))
+    return [name for name in names if name not in DATASET_KEYS and has_pinot_schema(name)]
+
+def column_spec(dataset, name, data_type, kind):
+    spec = load_table_spec(dataset).get("columns", {}).get(name)
+    if spec is None:
+        spec = DEFAULT_DISTRIBUTIONS["TIMESTAMP" if kind == "datetime" else data_type]
+    return spec
+
+def schema_columns(rng, dataset, names, n, start=0, parents=None):
+    """Arrays for the named Pinot schema columns of `dataset`, in schema order."""
+    ctx = {"start": start, "parent": None}
+    if parents is not None:
+        rows = parents.get("active")
+        if rows is None:
+            rows = np.arange(len(next(iter(parents.values()))))
+        ctx["parent"] = (parents, rows[choose(rng, len(rows), n,
+                                               load_table_spec(dataset).get("skew"))])
+    batch = {}
+    for name, data_type, kind in load_pinot_fields(dataset):
+        if name not in names:
+            continue
+        spec = column_spec(dataset, name, data_type, kind)
+        if spec["dist"] not in DISTRIBUTIONS:
+            raise ValueError(f"{dataset}.{name}: unknown distribution '{spec['dist']}' "
+                             f"(known: {', '.join(sorted(DISTRIBUTIONS))})")
+        values = DISTRIBUTIONS[spec["dist"]](rng, n, dict(spec), dict(ctx, type=data_type))
+        values = np.asarray(values).astype(PINOT_NUMPY_TYPES[data_type])
+        if spec.get("null_rate"):
+            values = nullable(values, rng.random(n) >= spec["null_rate"])
+        batch[name] = values
+    return batch
+
+def generate_table(rng, dataset, n, start=0, parents=None):
+    """One batch of a table generated entirely from its schema and spec."""
+    names = [name for name, _, _ in load_pinot_fields(dataset)]
+    return schema_columns(rng, dataset, names, n, start, parents)
+
+class SchemaExtras:
+    """Fills the schema columns a built-in generator does not produce.
+
+    They come from their own rng stream, so adding a column to a schema leaves
+    every existing value of the dataset unchanged.
+    """
+
+    def __init__(self, dataset, seed, shard, start):
+        self.dataset, self.seed, self.shard, self.row = dataset, seed, shard, start
+        self.names = None
+
+    def fill(self, batch, block):
+        """Fill one RNG_BLOCK of rows from that block's schema stream."""
+        if self.names is None:
+            self.names = [name for name, _, _ in load_pinot_fields(self.dataset)
+                          if name not in batch]
+        n = batch_len(batch)
+        if self.names:
+            rng = block_rng(self.seed, self.dataset, self.shard, block, SCHEMA_STREAM)
+            batch.update(schema_columns(rng, self.dataset, self.names, n, self.row))
+        self.row += n
+        return batch
+
+
+# ═══════════════════════════════════════════════════════════════
+# COMPRESSION — text outputs as independent gzip members / zstd frames
+# ═══════════════════════════════════════════════════════════════
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+DEFAULT_COMPRESS_LEVELS = {"gzip": 6, "zstd": 3}
+DEFAULT_COMPRESS_BLOCK_SIZE = 4 << 20
+
+def compress_block(data, codec, level):
+    """Compress one self-contained block; concatenated blocks form a valid .gz/.zst stream."""
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+class BlockWriter:
+    """Writes a file as independently compressed blocks, compressed on a thread pool.
+
+    Blocks end on line boundaries, so each one decompresses to whole records
+    and readers can decompress blocks in parallel or start from any block.
+    """
+
+    def __init__(self, path, opts, pool):
+        self.f = open(path, "wb")
+        self.codec, self.level = opts["compress"], opts["compress_level"]
+        self.block_size = opts["compress_block_size"]
+        self.max_pending = 2 * opts["compress_threads"]
+        self.pool, self.buf, self.pending = pool, bytearray(), deque()
+
+    def write(self, data):
+        self.buf += data
+        while len(self.buf) >= self.block_size:
+            cut = self.buf.rfind(b"\n", 0, self.block_size) + 1
+            self._submit(cut or self.block_size)
+
+    def _submit(self, n):
+        block = bytes(self.buf[:n])
+        del self.buf[:n]
+        self.pending.append(self.pool.submit(compress_block, block, self.codec, self.level))
+        # Write finished blocks in order, keeping a bounded number in flight
+        while len(self.pending) > self.max_pending:
+            self.f.write(self.pending.popleft().result())
+
+    def close(self):
+        if self.buf:
+            self._submit(len(self.buf))
+        while self.pending:
+            self.f.write(self.pending.popleft().result())
+        self.f.close()
+
+
+# ═══════════════════════════════════════════════════════════════
+# COLUMN STATS — running per-column accumulators (metadata.json)
+# ═══════════════════════════════════════════════════════════════
+# Exact value counts are kept while a column has at most this many distinct values
+CATEGORY_LIMIT = 128
+CATEGORY_SLOT_BITS = 16  # categories are looked up by 16 bits of their hash
+HLL_PRECISION = 14  # 16,384 registers: ~0.8% standard error on distinct counts
+_HLL_M = 1 << HLL_PRECISION
+
+def _mix64(h):
+    """splitmix64 finalizer: spreads any uint64 input over all 64 bits."""
+    h = h ^ (h >> np.uint64(30))
+    h = h * np.uint64(0xbf58476d1ce4e5b9)
+    h = h ^ (h >> np.uint64(27))
+    h = h * np.uint64(0x94d049bb133111eb)
+    return h ^ (h >> np.uint64(31))
+
+_FNV_PRIME = 0x100000001b3
+# _FNV_PRIME**(i + 1) mod 2**64: the weight of a string's i-th uint64 word
+_WORD_WEIGHTS = np.cumprod(np.full(256, _FNV_PRIME, np.uint64))
+
+def hash64(values):
+    """64-bit hash of each value of a numeric, bool or str column.
+
+    Strings are viewed as uint64 words (two UTF-32 characters each) and
+    hashed as the sum of word * prime**(position + 1), one matrix-vector
+    product for the whole column. A column's fixed width pads short values
+    with zero words, which add nothing, so a value hashes the same whatever
+    width its batch happened to get.
+    """
+    with np.errstate(over="ignore"):
+        if values.dtype.kind != "U":
+            return _mix64(values.astype(np.float64 if values.dtype.kind == "f" else np.int64)
+                          .view(np.uint64))
+        chars = np.ascontiguousarray(values).view(np.uint32).reshape(len(values), -1)
+        width = chars.shape[1]
+        weights = _WORD_WEIGHTS
+        if width // 2 + 1 > len(weights):
+            weights = np.cumprod(np.full(width // 2 + 1, _FNV_PRIME, np.uint64))
+        # Whole words in place; an odd last character is a word of its own
+        h = chars[:, :width - width % 2].view(np.uint64) @ weights[:width // 2]
+        if width % 2:
+            h += chars[:, -1].astype(np.uint64) * weights[width // 2]
+        return _mix64(h)
+
+def _bit_length(x):
+    """Bit length of each uint64 (0 for 0), exact via two uint32 halves."""
+    hi, lo = (x >> np.uint64(32)).astype(np.float64), (x & np.uint64(0xffffffff)).astype(np.float64)
+    return np.where(hi > 0, 32 + np.frexp(hi)[1], np.frexp(lo)[1])
+
+class ColumnStats:
+    """Count, nulls, min/max/sum, exact category counts (up to CATEGORY_LIMIT
+    distinct values) and a HyperLogLog distinct-count sketch for one column.
+    Updated per batch; shards merge()."""
+
+    def __init__(self):
+        self.count = self.nulls = 0
+        self.kind = self.min = self.max = self.sum = None
+        self.categories = {}  # hash → [value, count]; None once over CATEGORY_LIMIT
+        self.keys = np.empty(0, np.uint64)  # sorted category hashes
+        self.slots = None  # (shift, hash bits → index into keys), when those bits are unique
+        self.registers = np.zeros(_HLL_M, np.uint8)
+
+    def __getstate__(self):
+        # The lookup table is rebuilt on demand; don't ship it between processes
+        return dict(self.__dict__, slots=None)
+
+    def _set_keys(self):
+        self.keys = np.sort(np.fromiter(self.categories, np.uint64, len(self.categories)))
+        self.slots = None
+        mask = np.uint64((1 << CATEGORY_SLOT_BITS) - 1)
+        for shift in range(0, 64, CATEGORY_SLOT_BITS):
+            bits = ((self.keys >> np.uint64(shift)) & mask).astype(np.intp)
+            if len(np.unique(bits)) == len(bits):
+                table = np.full(1 << CATEGORY_SLOT_BITS, len(self.keys), np.uint8)
+                table[bits] = np.arange(len(self.keys))
+                self.slots = (np.uint64(shift), table)
+                return
+
+    def _lookup(self, h):
+        """Index into keys of each hash's category, and whether it is a known one."""
+        if not len(self.keys):
+            return np.zeros(len(h), np.intp), np.zeros(len(h), bool)
+        if self.slots is None:
+            # Two categories share every group of slot bits: binary search
+            pos = np.minimum(np.searchsorted(self.keys, h), len(self.keys) - 1)
         else:
-            current = round(original * random.uniform(0.1, 0.95), 2)
-
-        monthly_payment = round(original / max(term, 12) * (1 + rate / 1200), 2) if term > 0 else round(current * 0.02, 2)
-        apr = round(rate + random.uniform(0.1, 0.5), 4)
-
-        # Collateral
-        coll_type = COLLATERAL_TYPES.get(ltype)
-        coll_value = round(original * random.uniform(1.0, 1.5), 2) if coll_type else None
-        ltv = round(original / coll_value * 100, 2) if coll_value else None
-
-        maturity = origination + timedelta(days=term * 30) if term > 0 else None
-        last_payment = rand_date(NOW - timedelta(days=60), NOW) if status != "paid_off" else origination + timedelta(days=elapsed_months * 30)
-        next_payment = last_payment + timedelta(days=30) if status not in ("paid_off", "charged_off") else None
-
-        loan = {
-            "loan_id": str(uuid.uuid4()),
-            "organization_id": ORG_ID,
-            "member_id": mid,
-            "branch_id": member["branch_id"],
-            "loan_number": f"LN{30000 + i:08d}",
-            "loan_type": ltype,
-            "loan_subtype": subtype,
-            "product_code": product_code,
-            "product_name": product_name,
-            "status": status,
-            "original_amount": original,
-            "current_balance": current,
-            "monthly_payment": monthly_payment,
-            "interest_rate": rate,
-            "rate_type": "fixed" if "fixed" in ltype or ltype in ("auto_new", "auto_used", "personal", "student") else "variable",
-            "apr": apr,
-            "term_months": term,
-            "remaining_months": remaining,
-            "origination_date": ts_millis(origination),
-            "maturity_date": ts_millis(maturity) if maturity else None,
-            "next_payment_date": ts_millis(next_payment) if next_payment else None,
-            "last_payment_date": ts_millis(last_payment),
-            "days_past_due": dpd,
-            "delinquency_status": delinquency_status,
-            "collateral_type": coll_type,
-            "collateral_value": coll_value,
-            "ltv_ratio": ltv,
-            "credit_score_at_origination": member["credit_score"],
-            "dti_ratio": round(monthly_payment / (member["annual_income"] / 12) * 100, 2) if member["annual_income"] > 0 else None,
-            "created_at": ts_millis(origination + timedelta(seconds=random.randint(0, 3600))),
-        }
-        loans.append(loan)
-    return loans
+            shift, table = self.slots
+            pos = table[((h >> shift) & np.uint64((1 << CATEGORY_SLOT_BITS) - 1)).astype(np.intp)]
+            pos = np.minimum(pos, len(self.keys) - 1)
+        return pos, self.keys[pos] == h
+
+    def update(self, values):
+        if values.dtype == object:
+            present = np.not_equal(values, None)
+            self.nulls += len(values) - int(np.count_nonzero(present))
+            values = np.array(values[present].tolist())
+        if not len(values):
+            return
+        self.count += len(values)
+        self.kind = self.kind or values.dtype.kind
+        if values.dtype.kind in "iuf":
+            self._add_range(values.min().item(), values.max().item(), values.sum().item())
+
+        h = hash64(values)
+        if self.categories is not None:
+            # Known categories by table lookup; only unseen values need np.unique
+            pos, known = self._lookup(h)
+            counts = np.bincount(pos[known], minlength=len(self.keys))
+            for key, c in zip(self.keys[counts > 0].tolist(), counts[counts > 0].tolist()):
+                self.categories[key][1] += c
+            new = np.flatnonzero(~known)
+            # High-cardinality columns give themselves away in their first few values
+            if len(self.categories) + len(np.unique(h[new[:4 * CATEGORY_LIMIT]])) > CATEGORY_LIMIT:
+                keys = new
+            else:
+                keys, first, counts = np.unique(h[new], return_index=True, return_counts=True)
+            if len(self.categories) + len(keys) <= CATEGORY_LIMIT:
+                for key, i, c in zip(keys.tolist(), new[first].tolist(), counts.tolist()):
+                    self.categories[key] = [values[i].item(), c]
+                self._set_keys()
+                return
+            self._overflow()
+        self._sketch(h)
+
+    def _sketch(self, h):
+        np.maximum.at(self.registers, (h >> np.uint64(64 - HLL_PRECISION)).astype(np.intp),
+                      # Rank: leading zeros of the remaining bits, plus one
+                      np.minimum(65 - _bit_length(h << np.uint64(HLL_PRECISION)),
+                                 65 - HLL_PRECISION).astype(np.uint8))
+
+    def _overflow(self):
+        """Too many distinct values to count exactly: sketch the ones seen so far."""
+        self._sketch(np.fromiter(self.categories, np.uint64, len(self.categories)))
+        self.categories = None
+
+    def _add_range(self, lo, hi, total):
+        if self.sum is None:
+            self.min, self.max, self.sum = lo, hi, total
+        else:
+            self.min, self.max, self.sum = min(self.min, lo), max(self.max, hi), self.sum + total
+
+    def merge(self, other):
+        self.count += other.count
+        self.nulls += other.nulls
+        self.kind = self.kind or other.kind
+        if other.sum is not None:
+            self._add_range(other.min, other.max, other.sum)
+        np.maximum(self.registers, other.registers, out=self.registers)
+        if self.categories is not None and other.categories is not None:
+            for key, (value, c) in other.categories.items():
+                self.categories.setdefault(key, [value, 0])[1] += c
+            if len(self.categories) > CATEGORY_LIMIT:
+                self._overflow()
+            else:
+                self._set_keys()
+        elif self.categories is not None:
+            self._overflow()
+        elif other.categories is not None:
+            self._sketch(np.fromiter(other.categories, np.uint64, len(other.categories)))
+
+    def distinct(self):
+        """Exact while categories are kept, else the HyperLogLog estimate.
+
+        The sketch only starts when a column overflows CATEGORY_LIMIT, and is
+        then seeded with every value counted exactly so far.
+        """
+        if self.categories is not None:
+            return len(self.categories)
+        m = float(_HLL_M)
+        harmonic = np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / harmonic
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+    def summary(self):
+        out = {"count": self.count, "nulls": self.nulls, "distinct": self.distinct(),
+               "distinct_exact": self.categories is not None}
+        if self.sum is not None:
+            out.update(min=self.min, max=self.max, sum=round(self.sum, 2))
+        if self.categories is not None:
+            ordered = sorted(self.categories.values(), key=lambda e: (-e[1], str(e[0])))
+            out["categories"] = {str(value).lower() if isinstance(value, bool) else str(value): c
+                                 for value, c in ordered}
+        return out
+
+class DatasetStats:
+    """ColumnStats for every column of a dataset, fed batch by batch."""
+
+    def __init__(self):
+        self.columns = {}
+
+    def update(self, batch):
+        for name, values in batch.items():
+            self.columns.setdefault(name, ColumnStats()).update(values)
+
+    def merge_all(self, others):
+        for other in others:
+            for name, column in other.columns.items():
+                if name in self.columns:
+                    self.columns[name].merge(column)
+                else:
+                    self.columns[name] = column
+        return self
+
+    def summary(self):
+        return {name: column.summary() for name, column in self.columns.items()}
 
 
 # ═══════════════════════════════════════════════════════════════
-# DATASET 4: TRANSACTIONS (JSONL for Kafka)
+# SEGMENTS — Pinot segment-ready output (--segments)
+# ═══════════════════════════════════════════════════════════════
+# Per dataset: the table's time column (bucketed) and its sorted-index column
+# (tableIndexConfig.sortedColumn in scripts/pinot-configs/tables)
+SEGMENT_LAYOUT = {
+    "members": {"time": "created_at", "sort": "member_id"},
+    "accounts": {"time": "opened_date", "sort": "member_id"},
+    "loans": {"time": "origination_date", "sort": "member_id"},
+}
+SEGMENT_BUCKETS = {"day": "datetime64[D]", "month": "datetime64[M]", "year": "datetime64[Y]"}
+DEFAULT_SEGMENT_BUCKET = "month"
+DEFAULT_SEGMENT_SIZE = 256 << 20  # Pinot's usual 100-500 MB segment sweet spot
+SEGMENTS_DIR = "segments"
+
+def segment_partitions(batch, dataset, bucket):
+    """Partition name ("<organization_id>_<bucket>") of each row."""
+    times = batch[SEGMENT_LAYOUT[dataset]["time"]].astype("datetime64[ms]")
+    buckets = times.astype(SEGMENT_BUCKETS[bucket]).astype(str)
+    return np.char.add(np.char.add(batch["organization_id"].astype(str), "_"), buckets)
+
+class SegmentSpill:
+    """Shard side of --segments: each record's compact JSON line is appended to
+    a spill file per (organization_id, time bucket) partition, and its sort key
+    kept alongside. On close each spill is sorted on its key, so the build step
+    only merges them."""
+
+    def __init__(self, parts_dir, dataset, shard, opts):
+        self.dataset, self.bucket = dataset, opts["segments"]["bucket"]
+        self.dir = os.path.join(parts_dir, f"segments-{shard:05d}")
+        os.makedirs(self.dir, exist_ok=True)
+        self.files, self.keys = {}, {}
+
+    def write(self, batch, lines):
+        partitions = segment_partitions(batch, self.dataset, self.bucket)
+        keys = batch[SEGMENT_LAYOUT[self.dataset]["sort"]].astype("S")
+        names, inverse = np.unique(partitions, return_inverse=True)
+        for k, name in enumerate(names.tolist()):
+            rows = np.flatnonzero(inverse == k)
+            if name not in self.files:
+                self.files[name] = open(os.path.join(self.dir, f"{name}.ndjson"), "wb")
+                self.keys[name] = []
+            self.files[name].write(b"".join(lines[i] + b"\n" for i in rows.tolist()))
+            self.keys[name].append(keys[rows])
+
+    def close(self):
+        for name, f in self.files.items():
+            f.close()
+            spill = os.path.join(self.dir, name)
+            keys = np.concatenate(self.keys[name])
+            order = np.argsort(keys, kind="stable")
+            with open(spill + ".ndjson", "rb") as f:
+                lines = f.read().splitlines(keepends=True)
+            with open(spill + ".ndjson", "wb") as f:
+                f.write(b"".join([lines[i] for i in order.tolist()]))
+            np.save(spill + ".keys.npy", keys[order])
+
+# Sort keys read from a spill's key file at a time while merging
+SPILL_KEY_CHUNK = 65536
+
+def sorted_spill(spill):
+    """(sort key, line) pairs of one shard's sorted spill, read lazily."""
+    keys = np.load(spill + ".keys.npy", mmap_mode="r")
+    with open(spill + ".ndjson", "rb") as f:
+        for off in range(0, len(keys), SPILL_KEY_CHUNK):
+            yield from zip(keys[off:off + SPILL_KEY_CHUNK].tolist(), f)
+
+def _build_segment(task):
+    """Merge one partition's sorted spills (from every shard) and cut the result
+    into files. Equal keys keep shard order, as a stable sort of all rows would."""
+    parts_dir, shards, dataset, partition, out_dir, size = task
+    spills = [os.path.join(parts_dir, f"segments-{shard:05d}", partition) for shard in shards]
+    runs = [sorted_spill(spill) for spill in spills if os.path.exists(spill + ".ndjson")]
+    files, out = [], None
+    for _, line in heapq.merge(*runs, key=operator.itemgetter(0)):
+        if out is None or (out.size and out.size + len(line) > size):
+            name = f"{dataset}_{partition}_{len(files):04d}.json"
+            out = HashingFile(open(os.path.join(out_dir, name), "wb"))
+            files.append((name, out))
+        out.write(line)
+    checksums = {}
+    for name, out in files:
+        out.f.close()
+        checksums[os.path.join(SEGMENTS_DIR, dataset, name)] = out.checksum()
+    return checksums
+
+def build_segments(ds_dir, parts_dir, dataset, shards, workers, opts):
+    """datasets/segments/<dataset>/<dataset>_<org>_<bucket>_NNNN.json: one
+    partition per file set, rows sorted on the sorted-index column, files cut
+    at the target segment size. Returns {relative path: checksum}."""
+    out_dir = os.path.join(ds_dir, SEGMENTS_DIR, dataset)
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+    partitions = sorted({name[:-len(".ndjson")]
+                         for shard in shards
+                         for name in os.listdir(os.path.join(parts_dir, f"segments-{shard:05d}"))
+                         if name.endswith(".ndjson")})
+    tasks = [(parts_dir, shards, dataset, p, out_dir, opts["segments"]["size"]) for p in partitions]
+    checksums = {}
+    for result in run_shards(_build_segment, tasks, workers):
+        checksums.update(result)
+    for shard in shards:
+        shutil.rmtree(os.path.join(parts_dir, f"segments-{shard:05d}"))
+    return checksums
+
+
+# ═══════════════════════════════════════════════════════════════
+# STREAMING — shards yield batches straight into part files
 # ═══════════════════════════════════════════════════════════════
-def generate_transactions(members, accounts):
-    txns = []
-    active_accounts = [a for a in accounts if a["status"] == "active"]
-    member_map = {m["member_id"]: m for m in members}
-
-    for i in range(NUM_TRANSACTIONS):
-        acct = random.choice(active_accounts)
-        mid = acct["member_id"]
-
-        ttype = random.choice(TXN_TYPES)
-        chan = random.choice(CHANNELS)
-
-        # Amount ranges by type
-        if ttype in ("deposit","ach_credit","atm_deposit","wire_in"):
-            amt = round(random.uniform(25, 15000), 2)
-        elif ttype in ("withdrawal","atm_withdrawal","ach_debit","wire_out"):
-            amt = -round(random.uniform(20, 5000), 2)
-        elif ttype in ("card_purchase","payment"):
-            amt = -round(random.uniform(2.50, 2500), 2)
-        elif ttype == "card_refund":
-            amt = round(random.uniform(5, 500), 2)
-        elif ttype == "loan_payment":
-            amt = -round(random.uniform(100, 3500), 2)
-        elif ttype == "loan_disbursement":
-            amt = round(random.uniform(1000, 50000), 2)
-        elif ttype == "interest":
-            amt = round(random.uniform(0.01, 250), 2)
-        elif ttype == "dividend":
-            amt = round(random.uniform(0.50, 500), 2)
-        elif ttype == "fee":
-            amt = -round(random.uniform(5, 35), 2)
+DEFAULT_BATCH_SIZE = 100_000
+
+DEFAULT_ROW_GROUP_SIZE = 1_000_000
+
+# Text output files per dataset, in the order they are reported
+OUTPUTS = {
+    "members": [("members.csv", "csv"), ("members.json", "json")],
+    "accounts": [("accounts.ndjson", "ndjson"), ("accounts.json", "json")],
+    "loans": [("loans.json", "json"), ("loans.ndjson", "ndjson")],
+    "transactions": [("transactions.jsonl", "ndjson")],
+    # --delta change records
+    "account_updates": [("account_updates.ndjson", "ndjson")],
+    "loan_updates": [("loan_updates.ndjson", "ndjson")],
+}
+# Schema-driven tables (--tables) are written as <table>.ndjson
+TEXT_FORMATS = ("csv", "json", "ndjson")
+COLUMNAR_FORMATS = ("parquet", "arrow")
+
+def text_outputs(dataset):
+    return OUTPUTS.get(dataset, [(f"{dataset}.ndjson", "ndjson")])
+
+def outputs(dataset, opts):
+    """(filename, format) pairs written for a dataset under --formats and --compress."""
+    formats, suffix = opts["formats"], COMPRESSION_SUFFIXES.get(opts["compress"], "")
+    # Columnar output needs a Pinot schema, which the --delta change records lack
+    columnar = COLUMNAR_FORMATS if has_pinot_schema(dataset) else ()
+    return ([(name + suffix, fmt) for name, fmt in text_outputs(dataset) if fmt in formats]
+            + [(f"{dataset}.{fmt}", fmt) for fmt in columnar if fmt in formats])
+
+def default_opts(**overrides):
+    """Writer/generator options as main() builds them from the CLI defaults."""
+    opts = {"formats": TEXT_FORMATS, "batch_size": DEFAULT_BATCH_SIZE,
+            "row_group_size": DEFAULT_ROW_GROUP_SIZE,
+            "compact_json": False, "fast_json": False,
+            "compress": None, "compress_level": None,
+            "compress_block_size": DEFAULT_COMPRESS_BLOCK_SIZE,
+            "compress_threads": os.cpu_count() or 1,
+            "profile": {}, "skew": {}, "ledger": False, "key_partitions": 0,
+            "segments": None, "layout": "flat", "opened_window": None, "column_stats": False}
+    opts.update(overrides)
+    return opts
+
+def keys_only(opts):
+    """Options for a pass that only collects parent keys and writes nothing."""
+    return dict(opts, formats=(), segments=None, key_partitions=0, layout="flat")
+
+# Columns kept in memory after a dataset is written, for child foreign keys
+PARENT_KEYS = {
+    "members": ("member_id", "branch_id", "membership_status", "membership_date",
+                "credit_score", "annual_income"),
+    "accounts": ("account_id", "member_id", "branch_id", "status", "current_balance"),
+    # Not a parent, but --delta needs loan statuses to move them forward
+    "loans": ("loan_id", "member_id", "branch_id", "status", "current_balance"),
+}
+
+def parent_keys(batch, columns):
+    # IDs are ASCII, so bytes columns hold them at a quarter of the size
+    return {name: batch[name].astype("S") if name.endswith("_id") else batch[name]
+            for name in columns}
+
+def tally(dataset, batch):
+    """Per-batch counters behind the final summary; shards add them up."""
+    if dataset == "members":
+        return {"active": np.count_nonzero(batch["membership_status"] == "active"),
+                "total_deposits": batch["total_deposits"].sum(),
+                "total_loans": batch["total_loans"].sum()}
+    if dataset == "accounts":
+        return {"active": np.count_nonzero(batch["status"] == "active")}
+    if dataset == "loans":
+        return {"current": np.count_nonzero(batch["status"] == "current"),
+                "delinquent": np.count_nonzero(batch["days_past_due"] > 0),
+                "total_balance": batch["current_balance"].sum()}
+    if dataset == "transactions":
+        return {"suspicious": np.count_nonzero(batch["is_suspicious"])}
+    return {}
+
+def iter_blocks(dataset, seed, shard, parents, part, opts, ledger=None):
+    """(block number, rows) of a shard, RNG_BLOCK rows at a time, each from block_rng()."""
+    if dataset == "transactions":
+        # Each block owns a sub-slice of the shard's time slice, so only one
+        # block is ever sorted and the stream comes out in timestamp order
+        window, n = part
+        profile, skew = opts["profile"], opts["skew"]
+        slices = split_window(shard_rng(seed, dataset, shard), window, n, -(-n // RNG_BLOCK), profile)
+        for block, (sub_window, count) in enumerate(slices):
+            if count:
+                rng = block_rng(seed, dataset, shard, block)
+                yield block, generate_transactions(rng, parents, count, sub_window, profile,
+                                                   skew, ledger)
+        return
+    start, n = part
+    for block, off in enumerate(range(0, n, RNG_BLOCK)):
+        rng = block_rng(seed, dataset, shard, block)
+        count = min(RNG_BLOCK, n - off)
+        if dataset not in DATASET_KEYS:
+            yield block, generate_table(rng, dataset, count, start + off, parents)
+        elif dataset == "members":
+            yield block, generate_members(rng, count, start + off, opts["skew"])
+        elif dataset == "accounts":
+            balance = parents.get("ledger_balance")
+            yield block, generate_accounts(rng, parents, count, start + off, opts["skew"],
+                                           opts.get("opened_window"),
+                                           None if balance is None else
+                                           balance[start + off:start + off + count])
         else:
-            amt = round(random.uniform(-5000, 5000), 2)
-            if amt == 0: amt = 10.00
-
-        bal_after = round(acct["current_balance"] + amt, 2)
-        risk = round(random.uniform(0, 15), 2)
-
-        # 2% suspicious transactions
-        if random.random() < 0.02:
-            risk = round(random.uniform(80, 99), 2)
-            if ttype in ("deposit","ach_credit","wire_in"):
-                amt = round(random.uniform(9000, 50000), 2)
-
-        is_susp = risk >= 80.0
-
-        # Merchant for card/pos transactions
-        merch_name = ""
-        merch_cat = ""
-        if ttype in ("card_purchase","card_refund") or chan == "pos":
-            m_name, m_cat = random.choice(MERCHANTS)
-            merch_name = m_name
-            merch_cat = m_cat
-
-        txn_time = rand_date(NOW - timedelta(days=90), NOW)
-
-        t = {
-            "transaction_id": str(uuid.uuid4()),
-            "organization_id": ORG_ID,
-            "member_id": mid,
-            "account_id": acct["account_id"],
-            "branch_id": acct["branch_id"],
-            "transaction_type": ttype,
-            "channel": chan,
-            "status": random.choices(
-                ["completed","completed","completed","completed","pending","failed"],
-                [0.85, 0.0, 0.0, 0.0, 0.10, 0.05]
-            )[0],
-            "description": f"{ttype.replace('_',' ').title()} via {chan}",
-            "merchant_name": merch_name,
-            "merchant_category": merch_cat,
-            "amount": amt,
-            "balance_after": bal_after,
-            "risk_score": risk,
-            "is_suspicious": is_susp,
-            "timestamp": ts_millis(txn_time),
-        }
-        txns.append(t)
+            yield block, generate_loans(rng, parents, count, start + off, opts["skew"])
 
-    # Sort by timestamp for realistic streaming order
-    txns.sort(key=lambda x: x["timestamp"])
-    return txns
+def iter_batches(dataset, seed, shard, parents, part, opts, ledger=None, extras=None):
+    """A shard's rows in batches of opts["batch_size"] (the last one shorter)."""
+    batch_size = opts["batch_size"]
+    pending, rows = [], 0
+    for block, batch in iter_blocks(dataset, seed, shard, parents, part, opts, ledger):
+        if extras is not None:
+            extras.fill(batch, block)
+        pending.append(batch)
+        rows += batch_len(batch)
+        while rows >= batch_size:
+            merged = concat(pending) if len(pending) > 1 else pending[0]
+            yield take(merged, slice(0, batch_size))
+            rows -= batch_size
+            pending = [take(merged, slice(batch_size, None))] if rows else []
+    if pending:
+        yield concat(pending) if len(pending) > 1 else pending[0]
+
+def part_path(parts_dir, filename, shard, chunk=None):
+    if chunk is None:
+        return os.path.join(parts_dir, f"{filename}.part-{shard:05d}")
+    return os.path.join(parts_dir, f"{filename}.part-{shard:05d}-{chunk:04d}")
+
+class ColumnarPart:
+    """A shard's rows for a Parquet or Arrow output, written batch by batch to
+    an uncompressed Arrow IPC part file; assemble() cuts the row groups."""
+
+    def __init__(self, path, dataset):
+        self.path, self.dataset, self.writer = path, dataset, None
+
+    def write(self, batch):
+        import pyarrow as pa
+        schema = arrow_schema(self.dataset, list(batch))
+        record_batch = pa.record_batch(
+            [pa.array(batch[name], type=field.type) for name, field in zip(schema.names, schema)],
+            schema=schema)
+        if self.writer is None:
+            self.writer = pa.ipc.new_file(self.path, schema)
+        self.writer.write_batch(record_batch)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+def open_columnar_writer(path, fmt, schema):
+    import pyarrow as pa
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(path, schema)
+    return pa.ipc.new_file(path, schema)
+
+def write_row_group(writer, fmt, table):
+    # One contiguous chunk per group, not one per part batch it was cut from:
+    # Parquet pages and dictionary fallback, like Arrow record batches, follow
+    # the chunks, which would make the file depend on --batch-size
+    table = table.combine_chunks()
+    if fmt == "parquet":
+        writer.write_table(table, row_group_size=table.num_rows)
+    else:
+        writer.write_table(table, max_chunksize=table.num_rows)
+
+def iter_part_batches(path):
+    """Record batches of a ColumnarPart file, memory-mapped rather than read."""
+    import pyarrow as pa
+    reader = pa.ipc.open_file(pa.memory_map(path))
+    for i in range(reader.num_record_batches):
+        yield reader.get_batch(i)
+
+def assemble_columnar(final, fmt, paths, row_group_size):
+    """Write part files, in order, as one Parquet/Arrow file of row_group_size
+    row groups (the last one shorter) cut across part boundaries. At most one
+    group's worth of batches is pending, and those are mapped from the parts."""
+    import pyarrow as pa
+    writer, pending, rows = None, [], 0
+    for path in paths:
+        for batch in iter_part_batches(path):
+            if writer is None:
+                writer = open_columnar_writer(final, fmt, batch.schema)
+            pending.append(batch)
+            rows += batch.num_rows
+            while rows >= row_group_size:
+                table = pa.Table.from_batches(pending)
+                write_row_group(writer, fmt, table.slice(0, row_group_size))
+                rest = table.slice(row_group_size)
+                pending, rows = rest.to_batches(), rest.num_rows
+        os.remove(path)
+    if rows:
+        write_row_group(writer, fmt, pa.Table.from_batches(pending))
+    writer.close()
+
+class RecordEncoder:
+    """Serializes records to JSON bytes with the stdlib encoder or, if requested, orjson."""
+
+    def __init__(self, fast=False):
+        self.fast = fast
+
+    def compact_lines(self, batch):
+        if self.fast:
+            return [orjson.dumps(r) for r in iter_records(batch)]
+        return compact_json_lines(batch)
+
+    def indented(self, record):
+        """A record as an element of an indent=2 array."""
+        if self.fast:
+            text = orjson.dumps(record, option=orjson.OPT_INDENT_2)
+        else:
+            text = json.dumps(record, indent=2).encode()
+        return b"  " + text.replace(b"\n", b"\n  ")
+
+class ShardWriter:
+    """Fans each batch of one shard out to a part file per output format.
+
+    Rows are rendered column by column, and each record is JSON-encoded once
+    no matter how many of the ndjson/json outputs want it. Under --layout hive
+    the files are written per partition by a PartitionWriter instead.
+    """
+
+    def __init__(self, parts_dir, dataset, shard, opts, chunk=None, pool=None):
+        self.files, self.columnar = [], []
+        self.own_pool = pool is None and bool(opts["compress"])
+        self.pool = ThreadPoolExecutor(opts["compress_threads"]) if self.own_pool else pool
+        self.partitions = None
+        if hive_partitioned(dataset, opts):
+            self.partitions = PartitionWriter(parts_dir, dataset, shard,
+                                              dict(opts, layout="flat", segments=None), self.pool)
+        for name, fmt in (outputs(dataset, opts) if self.partitions is None else []):
+            path = part_path(parts_dir, name, shard, chunk)
+            if fmt in COLUMNAR_FORMATS:
+                self.columnar.append(ColumnarPart(path, dataset))
+            elif self.pool:
+                self.files.append((fmt, BlockWriter(path, opts, self.pool)))
+            else:
+                self.files.append((fmt, open(path, "wb")))
+        self.segments = None
+        if opts["segments"] and dataset in SEGMENT_LAYOUT:
+            self.segments = SegmentSpill(parts_dir, dataset, shard, opts)
+        self.encoder = RecordEncoder(opts["fast_json"])
+        self.compact_json = opts["compact_json"]
+        self.first = True
+
+    def write(self, batch):
+        if self.partitions is not None:
+            self.partitions.write(batch)
+        for part in self.columnar:
+            part.write(batch)
+        if not self.files and self.segments is None:
+            return
+        encoded = {}
+
+        def lines(style):
+            if style not in encoded:
+                if style == "indented":
+                    encoded[style] = [self.encoder.indented(r) for r in iter_records(batch)]
+                else:
+                    encoded[style] = self.encoder.compact_lines(batch)
+            return encoded[style]
+
+        for fmt, f in self.files:
+            if fmt == "csv":
+                text = io.StringIO(newline="")
+                csv.writer(text).writerows(iter_rows(batch))
+                f.write(text.getvalue().encode())
+            elif fmt == "json":
+                # Array elements only; the assembler adds brackets and the commas between parts
+                if not self.first:
+                    f.write(b",\n")
+                f.write(b",\n".join(lines("compact" if self.compact_json else "indented")))
+            else:
+                f.write(b"\n".join(lines("compact")) + b"\n")
+        if self.segments is not None:
+            self.segments.write(batch, lines("compact"))
+        self.first = False
+
+    def close(self):
+        if self.partitions is not None:
+            self.partitions.close()
+        if self.segments is not None:
+            self.segments.close()
+        for _, f in self.files:
+            f.close()
+        for part in self.columnar:
+            part.close()
+        if self.own_pool:
+            self.pool.shutdown()
+
+def _run_shard(task):
+    dataset, seed, shard, part, parts_dir, opts, keep = task
+    rows, totals, keys, columns = 0, {}, [], None
+    ledger = None
+    if opts.get("ledger_pass"):
+        ledger = Ledger(*opts["ledger_pass"], shard, len(_PARENTS["account_id"]))
+    extras = None
+    if dataset in DATASET_KEYS and has_pinot_schema(dataset):
+        extras = SchemaExtras(dataset, seed, shard, 0 if dataset == "transactions" else part[0])
+    out = ShardWriter(parts_dir, dataset, shard, opts)
+    # Keys-only passes (nothing written) have nothing to describe
+    stats = DatasetStats() if opts["column_stats"] and outputs(dataset, opts) else None
+    track_keys = dataset == "transactions" and opts["key_partitions"]
+    if track_keys:
+        account_order = np.argsort(_PARENTS["account_id"])
+    try:
+        for batch in iter_batches(dataset, seed, shard, _PARENTS, part, opts, ledger, extras):
+            out.write(batch)
+            if stats is not None:
+                stats.update(batch)
+            rows += batch_len(batch)
+            columns = list(batch)
+            counters = tally(dataset, batch)
+            if track_keys:
+                counters.update(key_traffic(batch, _PARENTS["account_id"], account_order,
+                                            opts["key_partitions"]))
+            for name, value in counters.items():
+                totals[name] = totals.get(name, 0) + value
+            if keep:
+                keys.append(parent_keys(batch, keep))
+    finally:
+        out.close()
+    if ledger is not None:
+        ledger.close()
+    return {"shard": shard, "rows": rows, "columns": columns, "tally": totals, "stats": stats,
+            "keys": concat(keys) if keys else None,
+            "partitions": out.partitions.chunks if out.partitions is not None else None}
+
+class HashingFile:
+    """Write-through wrapper that tracks the size and SHA-256 of what is written."""
+
+    def __init__(self, f):
+        self.f, self.sha, self.size = f, hashlib.sha256(), 0
+
+    def write(self, data):
+        self.sha.update(data)
+        self.size += len(data)
+        return self.f.write(data)
+
+    def checksum(self):
+        return {"bytes": self.size, "sha256": self.sha.hexdigest()}
+
+def file_checksum(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return {"bytes": os.path.getsize(path), "sha256": sha.hexdigest()}
+
+def assemble(ds_dir, parts_dir, dataset, results, opts, parts=None):
+    """Concatenate shard part files, in shard order, into the final dataset files.
+
+    `parts` lists the (shard, chunk) part files to take instead of one per result.
+    Returns {filename: {"bytes", "sha256"}} for the files written.
+    """
+    columns, checksums = results[0]["columns"], {}
+    if opts["compress"]:
+        def frame(data):
+            return compress_block(data, opts["compress"], opts["compress_level"])
+    else:
+        def frame(data):
+            return data
+    for filename, fmt in outputs(dataset, opts):
+        final = os.path.join(ds_dir, filename)
+        paths = [part_path(parts_dir, filename, shard, chunk)
+                 for shard, chunk in (parts or [(r["shard"], None) for r in results])]
+        if fmt in COLUMNAR_FORMATS:
+            assemble_columnar(final, fmt, paths, opts["row_group_size"])
+            checksums[filename] = file_checksum(final)
+            continue
+        with open(final, "wb") as f:
+            out = HashingFile(f)
+            if fmt == "csv":
+                header = io.StringIO()
+                csv.writer(header).writerow(columns)
+                out.write(frame(header.getvalue().encode()))
+            elif fmt == "json":
+                out.write(frame(b"["))
+            for path in paths:
+                if fmt == "json":
+                    out.write(frame(b"\n" if path is paths[0] else b",\n"))
+                with open(path, "rb") as part:
+                    shutil.copyfileobj(part, out, 1 << 20)
+                os.remove(path)
+            if fmt == "json":
+                out.write(frame(b"\n]"))
+        checksums[filename] = out.checksum()
+    return checksums
+
+def report_files(ds_dir, checksums):
+    """Print written files; those in subdirectories (segments, Hive partitions)
+    as one line per directory."""
+    dirs = {}
+    for filename, checksum in checksums.items():
+        if "/" not in filename:
+            print(f"  ✓ {os.path.join(ds_dir, filename)} ({checksum['bytes']:,} bytes)")
+            continue
+        parts = filename.split("/")[:-1]
+        entry = dirs.setdefault("/".join(p for p in parts if "=" not in p), [0, 0, set()])
+        entry[0] += 1
+        entry[1] += checksum["bytes"]
+        if "=" in parts[-1]:
+            entry[2].add("/".join(parts))
+    for name, (n, size, partitions) in dirs.items():
+        where = (f"{len(partitions):,} partition{'s' * (len(partitions) != 1)}, "
+                 if partitions else "")
+        print(f"  ✓ {os.path.join(ds_dir, name)}/ ({where}{n:,} file{'s' * (n != 1)}, {size:,} bytes)")
+
+def remove_stale_variants(ds_dir, dataset, opts):
+    """Drop every format, compression or --layout of `dataset` that this run
+    did not write (all of them for formats=()), so that loaders never pick up
+    an earlier run's files."""
+    hive = hive_partitioned(dataset, opts)
+    written = set() if hive else {name for name, _ in outputs(dataset, opts)}
+    for name, _ in text_outputs(dataset) + [(f"{dataset}.{fmt}", fmt) for fmt in COLUMNAR_FORMATS]:
+        for variant in [name] + [name + sfx for sfx in COMPRESSION_SUFFIXES.values()]:
+            path = os.path.join(ds_dir, variant)
+            if variant not in written and os.path.exists(path):
+                os.remove(path)
+    partitions = os.path.join(ds_dir, dataset)
+    if not hive and dataset in HIVE_LAYOUT and os.path.isdir(partitions):
+        shutil.rmtree(partitions)
+
+def generate_dataset(dataset, seed, parts, workers, parents, ds_dir, opts, keep=None):
+    """Generate and write one dataset.
+
+    `keep` names the columns to return (default: the dataset's PARENT_KEYS).
+    Returns (rows, summary tallies, kept columns, file checksums); the tallies
+    include "column_stats" (per-column ColumnStats summaries) when files were written
+    with opts["column_stats"].
+    """
+    keep = keep or PARENT_KEYS.get(dataset)
+    parts_dir = os.path.join(ds_dir, ".parts")
+    os.makedirs(parts_dir, exist_ok=True)
+    tasks = [(dataset, seed, k, part, parts_dir, opts, keep)
+             for k, part in enumerate(parts) if part[1]]
+    results = run_shards(_run_shard, tasks, workers, parents)
+    if hive_partitioned(dataset, opts):
+        checksums = assemble_partitions(ds_dir, parts_dir, dataset, results, workers, opts)
+    else:
+        checksums = assemble(ds_dir, parts_dir, dataset, results, opts)
+    if opts["segments"] and dataset in SEGMENT_LAYOUT:
+        checksums.update(build_segments(ds_dir, parts_dir, dataset,
+                                        [r["shard"] for r in results], workers, opts))
+    os.rmdir(parts_dir)
+    # Keys-only passes leave the files alone
+    if opts["formats"]:
+        remove_stale_variants(ds_dir, dataset, opts)
+
+    totals = {}
+    for r in results:
+        for name, value in r["tally"].items():
+            totals[name] = totals.get(name, 0) + value
+    stats = [r["stats"] for r in results if r["stats"] is not None]
+    if stats:
+        totals["column_stats"] = stats[0].merge_all(stats[1:]).summary()
+    keys = concat([r["keys"] for r in results]) if keep else None
+    return sum(r["rows"] for r in results), totals, keys, checksums
+
+def write_batch(ds_dir, dataset, batch, opts):
+    """Write an in-memory batch through the same writers as a one-shard dataset."""
+    parts_dir = os.path.join(ds_dir, ".parts")
+    os.makedirs(parts_dir, exist_ok=True)
+    out = ShardWriter(parts_dir, dataset, 0, opts)
+    try:
+        for off in range(0, batch_len(batch), opts["batch_size"]):
+            out.write(take(batch, slice(off, off + opts["batch_size"])))
+    finally:
+        out.close()
+    checksums = assemble(ds_dir, parts_dir, dataset, [{"shard": 0, "columns": list(batch)}], opts)
+    os.rmdir(parts_dir)
+    return checksums
+
+
+# ═══════════════════════════════════════════════════════════════
+# HIVE LAYOUT — <dataset>/org=<id>/date=<YYYY-MM-DD>/ partitions (--layout hive)
+# ═══════════════════════════════════════════════════════════════
+# Per dataset: the time column whose UTC day is the date= partition
+HIVE_LAYOUT = {"transactions": "timestamp", "accounts": "opened_date"}
+LAYOUTS = ("flat", "hive")
+# Per shard; a partition seen again after eviction continues in a new part chunk
+MAX_OPEN_PARTITIONS = 64
+
+def hive_partitioned(dataset, opts):
+    return opts["layout"] == "hive" and dataset in HIVE_LAYOUT and bool(opts["formats"])
+
+def hive_partitions(batch, dataset):
+    """Partition path ("org=<organization_id>/date=<YYYY-MM-DD>") of each row."""
+    days = batch[HIVE_LAYOUT[dataset]].astype("datetime64[ms]").astype("datetime64[D]").astype(str)
+    orgs = np.char.add("org=", batch["organization_id"].astype(str))
+    return np.char.add(np.char.add(orgs, "/date="), days)
+
+class PartitionWriter:
+    """Shard side of --layout hive: each batch is split by partition and every
+    slice goes through that partition's own ShardWriter.
+
+    At most MAX_OPEN_PARTITIONS writers are open at a time. `chunks` counts the
+    part chunks written per partition, which assemble() takes in order.
+    """
+
+    def __init__(self, parts_dir, dataset, shard, opts, pool):
+        self.parts_dir, self.dataset, self.shard = parts_dir, dataset, shard
+        self.opts, self.pool = opts, pool
+        self.open, self.chunks = {}, {}
+
+    def write(self, batch):
+        partitions = hive_partitions(batch, self.dataset)
+        names, inverse, counts = np.unique(partitions, return_inverse=True, return_counts=True)
+        order = np.argsort(inverse, kind="stable")
+        for name, end, n in zip(names.tolist(), np.cumsum(counts).tolist(), counts.tolist()):
+            # Reinserting keeps self.open in least-recently-written order
+            writer = self.open.pop(name, None)
+            if writer is None:
+                if len(self.open) >= MAX_OPEN_PARTITIONS:
+                    self.open.pop(next(iter(self.open))).close()
+                chunk = self.chunks.get(name, 0)
+                self.chunks[name] = chunk + 1
+                parts_dir = os.path.join(self.parts_dir, name)
+                os.makedirs(parts_dir, exist_ok=True)
+                writer = ShardWriter(parts_dir, self.dataset, self.shard, self.opts, chunk, self.pool)
+            self.open[name] = writer
+            writer.write(batch if len(names) == 1 else take(batch, order[end - n:end]))
+
+    def close(self):
+        for writer in self.open.values():
+            writer.close()
+        self.open = {}
+
+def _assemble_partition(task):
+    ds_dir, parts_dir, dataset, partition, columns, parts, opts = task
+    out_dir = os.path.join(ds_dir, dataset, partition)
+    os.makedirs(out_dir)
+    checksums = assemble(out_dir, os.path.join(parts_dir, partition), dataset,
+                         [{"columns": columns}], opts, parts)
+    return {f"{dataset}/{partition}/{name}": checksum for name, checksum in checksums.items()}
+
+def assemble_partitions(ds_dir, parts_dir, dataset, results, workers, opts):
+    """<dataset>/org=<id>/date=<day>/<files>: each partition assembled from the
+    part chunks every shard wrote for it, in shard order. Returns {relative path: checksum}."""
+    root = os.path.join(ds_dir, dataset)
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    partitions = sorted({p for r in results for p in r["partitions"]})
+    flat = dict(opts, layout="flat")
+    tasks = [(ds_dir, parts_dir, dataset, p, results[0]["columns"],
+              [(r["shard"], chunk) for r in results for chunk in range(r["partitions"].get(p, 0))],
+              flat)
+             for p in partitions]
+    checksums = {}
+    for result in run_shards(_assemble_partition, tasks, workers):
+        checksums.update(result)
+    for top in {p.split("/")[0] for p in partitions}:
+        shutil.rmtree(os.path.join(parts_dir, top))
+    return checksums
+
+
+# ═══════════════════════════════════════════════════════════════
+# LEDGER — per-account running balances (--ledger)
+# ═══════════════════════════════════════════════════════════════
+class Ledger:
+    """Running balances, in cents, of the accounts one transaction shard posts to.
+
+    The "sum" pass starts every account at zero and saves the shard's net
+    postings; the "post" pass starts from the opening balances the parent
+    wrote in their place (see ledger_transactions).
+    """
+
+    def __init__(self, stage, ledger_dir, shard, n_accounts):
+        self.stage = stage
+        self.path = os.path.join(ledger_dir, f"ledger-{shard:05d}.npz")
+        self.cents = np.zeros(n_accounts, np.int64)
+        self.touched = np.zeros(n_accounts, bool)
+        if stage == "post":
+            with np.load(self.path) as f:
+                self.cents[f["accounts"]] = f["cents"]
+
+    def post(self, aidx, amount, status):
+        """balance_after for transactions in stream order; only completed ones move it.
+
+        A grouped cumulative sum: sort by account (stable, so stream order is
+        kept within each account), cumsum, and rebase each account's run on
+        its balance before this batch.
+        """
+        step = np.where(status == "completed", np.round(amount * 100).astype(np.int64), 0)
+        order = np.argsort(aidx, kind="stable")
+        acct, step = aidx[order], step[order]
+        run = np.cumsum(step)
+        first = np.flatnonzero(np.concatenate([[True], acct[1:] != acct[:-1]]))
+        run += np.repeat(self.cents[acct[first]] - run[first] + step[first],
+                         np.diff(np.append(first, len(acct))))
+        last = np.append(first[1:], len(acct)) - 1
+        self.cents[acct[last]] = run[last]
+        self.touched[acct[first]] = True
+        balance = np.empty(len(run), np.int64)
+        balance[order] = run
+        return balance / 100
+
+    def close(self):
+        if self.stage == "sum":
+            accounts = np.flatnonzero(self.touched)
+            np.savez(self.path, accounts=accounts, cents=self.cents[accounts])
+
+def ledger_transactions(seed, parts, workers, accounts, out_dir, opts, keep=None):
+    """generate_dataset for transactions whose balance_after chains per account.
+
+    Shards are time slices, so an account's balance entering shard k is its
+    opening balance plus its net postings in shards 0..k-1. A first pass
+    generates the shards without writing anything and saves those nets; the
+    parent accumulates them in shard order into per-shard opening balances;
+    the second pass regenerates the same shards and writes them. Starts from
+    accounts["current_balance"]; returns (generate_dataset's result, closing
+    balances per account).
+    """
+    ledger_dir = os.path.join(out_dir, ".ledger")
+    os.makedirs(ledger_dir, exist_ok=True)
+    dry = dict(keys_only(opts), ledger_pass=("sum", ledger_dir))
+    generate_dataset("transactions", seed, parts, workers, accounts, out_dir, dry, keep=())
+
+    cents = np.round(accounts["current_balance"] * 100).astype(np.int64)
+    for k, part in enumerate(parts):
+        if part[1]:
+            path = os.path.join(ledger_dir, f"ledger-{k:05d}.npz")
+            with np.load(path) as f:
+                touched, net = f["accounts"], f["cents"]
+            np.savez(path, accounts=touched, cents=cents[touched])
+            cents[touched] += net
+
+    result = generate_dataset("transactions", seed, parts, workers, accounts, out_dir,
+                              dict(opts, ledger_pass=("post", ledger_dir)), keep)
+    shutil.rmtree(ledger_dir)
+    return result, cents / 100
+
+
+# ═══════════════════════════════════════════════════════════════
+# CACHE — skip regeneration when the effective config is unchanged
+# ═══════════════════════════════════════════════════════════════
+# Throughput-only options: they do not change a single output byte (blocks are
+# seeded independently of batching, and compressed blocks are reassembled in order)
+CACHE_IGNORED_OPTS = ("batch_size", "compress_threads")
+
+def config_hash(seed, scale, shards, counts, opts):
+    """SHA-256 over everything that determines the output files.
+
+    The generator source stands in for its constants and code; the Pinot
+    schemas and generator specs define schema-driven columns and tables (and
+    the columnar types).
+    """
+    sha = hashlib.sha256()
+    with open(os.path.abspath(__file__), "rb") as f:
+        sha.update(f.read())
+    config = {
+        "seed": seed, "scale": scale, "shards": shards, "counts": counts,
+        "opts": {k: v for k, v in opts.items() if k not in CACHE_IGNORED_OPTS},
+        "numpy": np.__version__,
+    }
+    if any(fmt in COLUMNAR_FORMATS for fmt in opts["formats"]):
+        import pyarrow
+        config["pyarrow"] = pyarrow.__version__
+    for directory in (SCHEMA_DIR, SPEC_DIR):
+        for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else ():
+            with open(os.path.join(directory, name), "rb") as f:
+                sha.update(name.encode() + b"\0" + f.read())
+    if opts["fast_json"]:
+        config["orjson"] = orjson.__version__
+    sha.update(json.dumps(config, sort_keys=True, default=list).encode())
+    return sha.hexdigest()
+
+def cached_metadata(ds_dir, digest, verify=False):
+    """The existing metadata.json if it was written for this config hash and every
+    file it lists is still intact (by size, or by checksum with verify)."""
+    try:
+        with open(os.path.join(ds_dir, "metadata.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("config_hash") != digest or not meta.get("files"):
+        return None
+    for filename, expected in meta["files"].items():
+        path = os.path.join(ds_dir, filename)
+        if not os.path.exists(path) or os.path.getsize(path) != expected["bytes"]:
+            return None
+        if verify and file_checksum(path)["sha256"] != expected["sha256"]:
+            return None
+    return meta
+
+
+# ═══════════════════════════════════════════════════════════════
+# DELTA — incremental cycles on top of the last run (--delta)
+# ═══════════════════════════════════════════════════════════════
+DELTA_KEY = 5  # seeds delta cycles apart from the DATASET_KEYS streams
+DELTA_NEW_ACCOUNTS_PER_DAY = 0.002  # fraction of existing accounts
+DELTA_LOAN_TRANSITIONS_PER_DAY = 0.01  # fraction of open loans
+# Next-status probabilities for an open loan that changes status
+LOAN_TRANSITIONS = {
+    "current": (("delinquent_30", 0.7), ("paid_off", 0.3)),
+    "delinquent_30": (("current", 0.6), ("delinquent_60", 0.4)),
+    "delinquent_60": (("current", 0.4), ("delinquent_90", 0.6)),
+    "delinquent_90": (("current", 0.2), ("charged_off", 0.8)),
+}
+DELTA_TXN_KEYS = ("account_id", "amount", "status", "timestamp")
+
+def state_path(ds_dir, dataset):
+    return os.path.join(ds_dir, ".state", f"{dataset}.npz")
+
+def save_state(ds_dir, dataset, keys):
+    """Persist a dataset's key columns so --delta can continue from them."""
+    os.makedirs(os.path.dirname(state_path(ds_dir, dataset)), exist_ok=True)
+    np.savez(state_path(ds_dir, dataset), **keys)
+
+def load_state(ds_dir, dataset):
+    with np.load(state_path(ds_dir, dataset)) as data:
+        return {name: data[name] for name in data.files}
+
+def delta_dirs(ds_dir):
+    return sorted(os.path.join(ds_dir, d) for d in os.listdir(ds_dir) if d.startswith("delta-"))
+
+def account_updates(accounts, txn_keys, updated_at):
+    """Net balance change per account touched by completed transactions.
+
+    Applies the changes to `accounts` (the state) and returns them as a batch.
+    """
+    done = txn_keys["status"] == "completed"
+    ids, inverse = np.unique(txn_keys["account_id"][done], return_inverse=True)
+    change = np.round(np.bincount(inverse, weights=txn_keys["amount"][done], minlength=len(ids)), 2)
+    last_activity = np.zeros(len(ids), dtype=np.int64)
+    np.maximum.at(last_activity, inverse, txn_keys["timestamp"][done])
+
+    order = np.argsort(accounts["account_id"])
+    pos = order[np.searchsorted(accounts["account_id"], ids, sorter=order)]
+    balance = np.round(accounts["current_balance"][pos] + change, 2)
+    accounts["current_balance"][pos] = balance
+
+    n = len(ids)
+    return {
+        "account_id": ids.astype(str),
+        "organization_id": np.full(n, ORG_ID),
+        "member_id": accounts["member_id"][pos].astype(str),
+        "branch_id": accounts["branch_id"][pos].astype(str),
+        "balance_change": change,
+        "current_balance": balance,
+        "last_activity_date": last_activity,
+        "updated_at": np.full(n, updated_at),
+    }
+
+def loan_transitions(rng, loans, n, window):
+    """Move n random open loans to their next status (see LOAN_TRANSITIONS).
+
+    Applies the changes to `loans` (the state) and returns them as a batch.
+    """
+    open_idx = np.flatnonzero(np.isin(loans["status"], list(LOAN_TRANSITIONS)))
+    idx = np.sort(rng.choice(open_idx, min(n, len(open_idx)), replace=False))
+    n = len(idx)
+    previous = loans["status"][idx]
+    status = previous.astype("U16")
+    u = rng.random(n)
+    for current, targets in LOAN_TRANSITIONS.items():
+        mask = previous == current
+        cum = np.cumsum([p for _, p in targets])
+        status[mask] = np.array([t for t, _ in targets])[np.searchsorted(cum, u[mask] * cum[-1])]
+
+    closed = np.isin(status, ["paid_off", "charged_off"])
+    balance = np.where(status == "paid_off", 0.0, loans["current_balance"][idx])
+    changed_at = rand_millis(rng, window[0], window[1], n)
+    delinquency = np.array([DELINQUENCY_MAP[s][1] or "" for s in status], dtype="U16")
+
+    loans["status"] = loans["status"].astype("U16")
+    loans["status"][idx] = status
+    loans["current_balance"][idx] = balance
+
+    updates = {
+        "loan_id": loans["loan_id"][idx].astype(str),
+        "organization_id": np.full(n, ORG_ID),
+        "member_id": loans["member_id"][idx].astype(str),
+        "branch_id": loans["branch_id"][idx].astype(str),
+        "previous_status": previous,
+        "status": status,
+        "days_past_due": np.array([DELINQUENCY_MAP[s][0] for s in status], dtype=np.int64),
+        "delinquency_status": nullable(delinquency, delinquency != ""),
+        "current_balance": balance,
+        "next_payment_date": nullable(changed_at + 30 * DAY_MS, ~closed),
+        "updated_at": changed_at,
+    }
+    return take(updates, np.argsort(changed_at, kind="stable"))
+
+def generate_delta(ds_dir, meta, opts, workers, hours):
+    """Write one delta cycle to datasets/delta-NNNN and advance metadata.json.
+
+    The cycle covers (watermark, watermark + hours]: accounts opened in it,
+    transactions in it, the resulting account balance changes and loan status
+    transitions. Cycles are seeded from the base seed and cycle number, so a
+    delta chain is as reproducible as the base run.
+    """
+    cycle = len(meta["deltas"]) + 1
+    seed = [meta["seed"], DELTA_KEY, cycle]
+    rng = np.random.default_rng(np.random.SeedSequence(seed))
+    days = hours / 24
+    window = (meta["watermark"] + SECOND_MS, meta["watermark"] + round(hours * 3600) * SECOND_MS)
+    out = os.path.join(ds_dir, f"delta-{cycle:04d}")
+    if os.path.exists(out):
+        shutil.rmtree(out)
+    os.makedirs(out)
+    opts = dict(opts, profile=resolve_profile(meta.get("load_profile", {}), window, rng),
+                skew=meta.get("skew", {}), ledger=meta.get("ledger", False),
+                layout=meta.get("layout", "flat"))
+
+    members = load_state(ds_dir, "members")
+    accounts = load_state(ds_dir, "accounts")
+    loans = load_state(ds_dir, "loans")
+    print(f"Delta cycle {cycle}: {datetime.fromtimestamp(window[0] / 1000, timezone.utc):%Y-%m-%d %H:%M}"
+          f" → {datetime.fromtimestamp(window[1] / 1000, timezone.utc):%Y-%m-%d %H:%M} UTC")
+
+    files, records = {}, {}
+
+    def report(name, rows, checksums):
+        records[name] = int(rows)
+        report_files(out, checksums)
+        files.update(checksums)
+
+    # New accounts continue the account numbering
+    n_accounts = int(rng.poisson(len(accounts["account_id"]) * DELTA_NEW_ACCOUNTS_PER_DAY * days))
+    if n_accounts:
+        first = len(accounts["account_id"])
+        parts = [(first + start, count) for start, count in shard_ranges(n_accounts, meta["shards"])]
+        rows, _, new_keys, checksums = generate_dataset("accounts", seed, parts, workers,
+                                                        member_index(members), out,
+                                                        dict(opts, opened_window=window))
+        accounts = concat([accounts, new_keys])
+        report("accounts", rows, checksums)
+
+    # Transactions at the base run's rate
+    base_days = (TXN_WINDOW[1] - TXN_WINDOW[0]) / DAY_MS
+    n_txns = int(rng.poisson(meta["counts"]["transactions"] / base_days * days))
+    # Change records are always NDJSON
+    updates_opts = dict(opts, formats=("ndjson",))
+    if n_txns:
+        parts = transaction_slices(seed, n_txns, meta["shards"], window, opts["profile"])
+        if opts["ledger"]:
+            # Chains on from the balances account_updates left in the state
+            (rows, _, txn_keys, checksums), _ = ledger_transactions(
+                seed, parts, workers, account_index(accounts), out, opts, keep=DELTA_TXN_KEYS)
+        else:
+            rows, _, txn_keys, checksums = generate_dataset("transactions", seed, parts, workers,
+                                                            account_index(accounts), out, opts,
+                                                            keep=DELTA_TXN_KEYS)
+        report("transactions", rows, checksums)
+        batch = account_updates(accounts, txn_keys, window[1])
+        report("account_updates", batch_len(batch),
+               write_batch(out, "account_updates", batch, updates_opts))
+
+    n_loans = int(rng.poisson(np.isin(loans["status"], list(LOAN_TRANSITIONS)).sum()
+                              * DELTA_LOAN_TRANSITIONS_PER_DAY * days))
+    batch = loan_transitions(rng, loans, n_loans, window)
+    report("loan_updates", batch_len(batch), write_batch(out, "loan_updates", batch, updates_opts))
+
+    save_state(ds_dir, "accounts", accounts)
+    save_state(ds_dir, "loans", loans)
+    meta["watermark"] = window[1]
+    meta["deltas"].append({"cycle": cycle, "dir": os.path.basename(out), "window": list(window),
+                           "records": records, "files": files})
+    with open(os.path.join(ds_dir, "metadata.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    print()
+    print("═══ Delta Summary ═══")
+    for name in ("accounts", "transactions", "account_updates", "loan_updates"):
+        print(f"  {name + ':':<17} {records.get(name, 0):>8,}")
+    print(f"  Watermark: {meta['watermark']}")
 
 
 # ═══════════════════════════════════════════════════════════════
 # MAIN — Generate all datasets
 # ═══════════════════════════════════════════════════════════════
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description="Generate Pinot Pulse test datasets")
+    parser.add_argument("--scale", type=parse_scale, default=1.0,
+                        help="Multiply all record counts by this factor, or use a "
+                             f"profile ({', '.join(f'{k}={v:g}' for k, v in SCALE_PROFILES.items())})")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Master seed; output is byte-identical for the same seed and --shards")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Split each dataset into this many independently seeded shards")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes used to generate shards (does not change output)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Records generated and written per batch; bounds peak memory "
+                             "(does not change output)")
+    parser.add_argument("--formats", default=",".join(TEXT_FORMATS),
+                        help="Comma-separated output formats: "
+                             f"{', '.join(TEXT_FORMATS + COLUMNAR_FORMATS)} (default: text formats)")
+    parser.add_argument("--row-group-size", type=int, default=DEFAULT_ROW_GROUP_SIZE,
+                        help="Rows per Parquet row group / Arrow record batch")
+    parser.add_argument("--compact-json", action="store_true",
+                        help="Write .json arrays one compact record per line instead of indent=2")
+    parser.add_argument("--fast-json", action="store_true",
+                        help="Encode JSON with orjson (pip install orjson)")
+    parser.add_argument("--compress", choices=["none", *COMPRESSION_SUFFIXES], default="none",
+                        help="Compress csv/json/ndjson outputs (.gz / .zst) in independent blocks")
+    parser.add_argument("--compress-level", type=int, default=None,
+                        help="Compression level (default: gzip 6, zstd 3)")
+    parser.add_argument("--compress-block-size", type=int, default=DEFAULT_COMPRESS_BLOCK_SIZE,
+                        help="Uncompressed bytes per independently compressed block")
+    parser.add_argument("--compress-threads", type=int, default=None,
+                        help="Compression threads per worker (default: CPUs / workers)")
+    parser.add_argument("--force", action="store_true",
+                        help="Regenerate even if metadata.json matches this configuration")
+    parser.add_argument("--verify-cache", action="store_true",
+                        help="Re-hash cached files against their checksums before skipping")
+    parser.add_argument("--profile", type=parse_profile, default="flat",
+                        help="Transaction timestamp load profile: "
+                             f"{', '.join(LOAD_PROFILES)}, or a JSON file with the same keys")
+    parser.add_argument("--skew", type=parse_skew, default={},
+                        help="Zipf exponent for hot-key selection (e.g. 1.1), for all of "
+                             f"{', '.join(SKEW_KEYS)} or as key=exponent pairs (default: uniform)")
+    parser.add_argument("--key-report", action="store_true",
+                        help="Report per-key and per-Kafka-partition transaction counts "
+                             "(always on with --skew)")
+    parser.add_argument("--column-stats", action="store_true",
+                        help="Accumulate per-column count/nulls/min/max/sum, distinct counts and "
+                             "category counts into metadata.json while writing")
+    parser.add_argument("--report-partitions", type=int, default=DEFAULT_REPORT_PARTITIONS,
+                        help="Kafka partition count assumed by the key report (default: "
+                             f"{DEFAULT_REPORT_PARTITIONS})")
+    parser.add_argument("--ledger", action="store_true",
+                        help="Chain balance_after per account in time order and write the "
+                             "closing balances back into accounts (generates transactions twice)")
+    parser.add_argument("--layout", choices=LAYOUTS, default="flat",
+                        help="hive: write transactions and accounts as "
+                             "<dataset>/org=<id>/date=YYYY-MM-DD/ partitions instead of one file "
+                             "(by timestamp / opened_date), so a day can be loaded on its own")
+    parser.add_argument("--segments", action="store_true",
+                        help="Also write members/accounts/loans as Pinot segment inputs under "
+                             "datasets/segments/: one file set per organization and time bucket, "
+                             "sorted on the sorted-index column")
+    parser.add_argument("--segment-bucket", choices=list(SEGMENT_BUCKETS),
+                        default=DEFAULT_SEGMENT_BUCKET,
+                        help=f"Time bucket of a segment partition (default: {DEFAULT_SEGMENT_BUCKET})")
+    parser.add_argument("--segment-size", type=int, default=DEFAULT_SEGMENT_SIZE,
+                        help="Target bytes per segment input file (default: 256 MiB)")
+    parser.add_argument("--tables", default="",
+                        help="Also generate these schema-driven tables (Pinot schema + "
+                             "scripts/pinot-configs/generators/<table>.json), or 'all'")
+    parser.add_argument("--delta", action="store_true",
+                        help="Write only what changed since the last run (new accounts and "
+                             "transactions, balance and loan status changes) to datasets/delta-NNNN")
+    parser.add_argument("--delta-hours", type=float, default=24,
+                        help="Length of the --delta cycle after the last watermark (default: 24)")
+    args = parser.parse_args()
+    formats = tuple(f.strip() for f in args.formats.split(",") if f.strip())
+    unknown = [f for f in formats if f not in TEXT_FORMATS + COLUMNAR_FORMATS]
+    if unknown:
+        parser.error(f"unknown --formats: {', '.join(unknown)}")
+    available = schema_tables()
+    tables = available if args.tables == "all" else [
+        t.strip() for t in args.tables.split(",") if t.strip()]
+    unknown = [t for t in tables if t not in available]
+    if unknown:
+        parser.error(f"unknown --tables: {', '.join(unknown)} "
+                     f"(available: {', '.join(available) or 'none'})")
+    if args.fast_json and orjson is None:
+        print("ERROR: orjson not installed (needed for --fast-json).")
+        print("Run: pip install orjson")
+        sys.exit(1)
+    if args.compress == "zstd" and zstandard is None:
+        print("ERROR: zstandard not installed (needed for --compress zstd).")
+        print("Run: pip install zstandard")
+        sys.exit(1)
+    if any(f in COLUMNAR_FORMATS for f in formats):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("ERROR: pyarrow not installed (needed for Parquet/Arrow output).")
+            print("Run: pip install pyarrow")
+            sys.exit(1)
+    if min(args.shards, args.workers, args.batch_size, args.row_group_size,
+           args.compress_block_size, args.compress_threads or 1,
+           args.report_partitions, args.segment_size) < 1:
+        parser.error("--shards, --workers, --batch-size, --row-group-size, --compress-block-size, "
+                     "--compress-threads, --report-partitions and --segment-size must be at least 1")
     out_dir = os.path.dirname(os.path.abspath(__file__))
     ds_dir = os.path.join(out_dir, "datasets")
     os.makedirs(ds_dir, exist_ok=True)
+    meta_path = os.path.join(ds_dir, "metadata.json")
+
+    if args.delta:
+        # Seed, shards and scale come from the run being extended
+        try:
+            with open(meta_path) as f:
+                base_meta = json.load(f)
+            base_meta["watermark"]
+        except (OSError, ValueError, KeyError):
+            print("ERROR: --delta needs datasets/metadata.json from a full run of this generator.")
+            print("Run: python3 generate_datasets.py --seed <n>")
+            sys.exit(1)
+        args.seed, args.shards, args.scale = base_meta["seed"], base_meta["shards"], base_meta["scale"]
+
+    counts = scaled_counts(args.scale)
+    for table in tables:
+        counts[table] = max(1, round(load_table_spec(table).get("rows", 1000) * args.scale))
+    seed = args.seed if args.seed is not None else int(np.random.SeedSequence().entropy % 2**63)
+    shards, workers = args.shards, min(args.workers, args.shards)
+    compress = None if args.compress == "none" else args.compress
 
     print(f"═══ Pinot Pulse Enterprise — Test Data Generator ═══")
     print(f"Organization: {ORG_NAME}")
     print(f"Org ID: {ORG_ID}")
+    if args.scale != 1:
+        print(f"Scale: {args.scale:g}x")
+    print(f"Seed: {seed}  (shards: {shards}, workers: {workers})")
+    if args.profile["name"] != "flat" and not args.delta:
+        print(f"Load profile: {args.profile['name']}")
+    if args.skew and not args.delta:
+        print(f"Key skew: {', '.join(f'{k}={v:g}' for k, v in args.skew.items())}")
     print()
 
-    # 1. Members
-    print(f"Generating {NUM_MEMBERS} members...")
-    members = generate_members()
-    csv_path = os.path.join(ds_dir, "members.csv")
-    with open(csv_path, "w", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=members[0].keys())
-        w.writeheader()
-        w.writerows(members)
-    print(f"  ✓ {csv_path} ({os.path.getsize(csv_path):,} bytes)")
-
-    # Also write as JSON for flexibility
-    json_path = os.path.join(ds_dir, "members.json")
-    with open(json_path, "w") as f:
-        json.dump(members, f, indent=2)
-
-    # 2. Accounts
-    print(f"Generating {NUM_ACCOUNTS} accounts...")
-    accounts = generate_accounts(members)
-    # NDJSON for BigQuery native load
-    ndjson_path = os.path.join(ds_dir, "accounts.ndjson")
-    with open(ndjson_path, "w") as f:
-        for a in accounts:
-            f.write(json.dumps(a) + "\n")
-    print(f"  ✓ {ndjson_path} ({os.path.getsize(ndjson_path):,} bytes)")
-
-    # Also regular JSON
-    json_path2 = os.path.join(ds_dir, "accounts.json")
-    with open(json_path2, "w") as f:
-        json.dump(accounts, f, indent=2)
-
-    # 3. Loans
-    print(f"Generating {NUM_LOANS} loans...")
-    loans = generate_loans(members)
-    loans_json_path = os.path.join(ds_dir, "loans.json")
-    with open(loans_json_path, "w") as f:
-        json.dump(loans, f, indent=2)
-    print(f"  ✓ {loans_json_path} ({os.path.getsize(loans_json_path):,} bytes)")
-
-    # Also NDJSON for flexibility
-    loans_ndjson_path = os.path.join(ds_dir, "loans.ndjson")
-    with open(loans_ndjson_path, "w") as f:
-        for loan in loans:
-            f.write(json.dumps(loan) + "\n")
-
-    # 4. Transactions
-    print(f"Generating {NUM_TRANSACTIONS} transactions...")
-    transactions = generate_transactions(members, accounts)
-    # JSONL for Kafka (one event per line)
-    jsonl_path = os.path.join(ds_dir, "transactions.jsonl")
-    with open(jsonl_path, "w") as f:
-        for t in transactions:
-            f.write(json.dumps(t) + "\n")
-    print(f"  ✓ {jsonl_path} ({os.path.getsize(jsonl_path):,} bytes)")
+    opts = default_opts(
+        formats=formats, batch_size=args.batch_size, row_group_size=args.row_group_size,
+        compact_json=args.compact_json, fast_json=args.fast_json,
+        compress=compress,
+        compress_level=args.compress_level or DEFAULT_COMPRESS_LEVELS.get(compress),
+        compress_block_size=args.compress_block_size,
+        compress_threads=args.compress_threads or max(1, (os.cpu_count() or 1) // workers),
+        profile=resolve_profile(args.profile, TXN_WINDOW, np.random.default_rng(
+            np.random.SeedSequence(seed, spawn_key=(PROFILE_KEY,)))),
+        skew=args.skew,
+        ledger=args.ledger,
+        segments=({"bucket": args.segment_bucket, "size": args.segment_size}
+                  if args.segments else None),
+        layout=args.layout,
+        column_stats=args.column_stats,
+        key_partitions=(args.report_partitions
+                        if (args.skew or args.key_report) and not args.delta else 0))
+
+    if args.delta:
+        generate_delta(ds_dir, base_meta, opts, workers, args.delta_hours)
+        return
+
+    digest = config_hash(seed, args.scale, shards, counts, opts)
+    if not args.force and cached_metadata(ds_dir, digest, args.verify_cache):
+        print(f"  ✓ Datasets up to date (config {digest[:12]}) — skipping generation")
+        print("    Use --force to regenerate")
+        return
+    # A stale metadata.json must not vouch for half-rewritten files
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    # Delta cycles only make sense on top of the run that produced them
+    for path in delta_dirs(ds_dir):
+        shutil.rmtree(path)
+    if os.path.exists(os.path.join(ds_dir, SEGMENTS_DIR)):
+        shutil.rmtree(os.path.join(ds_dir, SEGMENTS_DIR))
+    # Tables an earlier --tables run wrote that this one does not
+    for table in available:
+        if table not in tables:
+            remove_stale_variants(ds_dir, table, dict(opts, formats=()))
+    files = {}
+
+    def run(dataset, parents=None, run_opts=opts):
+        if dataset == "transactions":
+            parts = transaction_slices(seed, counts[dataset], shards, TXN_WINDOW, opts["profile"])
+        else:
+            parts = shard_ranges(counts[dataset], shards)
+        if dataset == "transactions" and opts["ledger"]:
+            (rows, totals, keys, checksums), closing = ledger_transactions(
+                seed, parts, workers, parents, ds_dir, run_opts)
+            totals["closing_balance"] = closing
+        else:
+            rows, totals, keys, checksums = generate_dataset(dataset, seed, parts, workers,
+                                                             parents, ds_dir, run_opts)
+        report_files(ds_dir, checksums)
+        files.update(checksums)
+        if keys is not None:
+            save_state(ds_dir, dataset, keys)
+        return rows, totals, keys
+
+    # 1. Members → CSV (S3), also JSON for flexibility
+    print(f"Generating {counts['members']:,} members...")
+    n_members, member_stats, member_keys = run("members")
+    member_keys = member_index(member_keys)
+
+    # 2. Accounts → NDJSON for BigQuery native load, also regular JSON
+    print(f"Generating {counts['accounts']:,} accounts...")
+    if opts["ledger"]:
+        # Keys and opening balances only; written once the ledger has run (step 4)
+        _, _, account_keys = run("accounts", member_keys, keys_only(opts))
+    else:
+        n_accounts, account_stats, account_keys = run("accounts", member_keys)
+
+    # 3. Loans → JSON (PostgreSQL), also NDJSON for flexibility
+    print(f"Generating {counts['loans']:,} loans...")
+    n_loans, loan_stats, _ = run("loans", member_keys)
+
+    # 4. Transactions → JSONL for Kafka (one event per line)
+    print(f"Generating {counts['transactions']:,} transactions...")
+    n_txns, txn_stats, _ = run("transactions", account_index(account_keys))
+    if opts["ledger"]:
+        print(f"Writing {counts['accounts']:,} accounts with ledger closing balances...")
+        n_accounts, account_stats, account_keys = run(
+            "accounts", dict(member_keys, ledger_balance=txn_stats.pop("closing_balance")))
+
+    # 5. Schema-driven tables (--tables) → NDJSON
+    table_stats = {}
+    for table in tables:
+        parent = load_table_spec(table).get("parent")
+        parents = {"members": member_keys, "accounts": account_index(account_keys)}.get(parent)
+        if parent and parents is None:
+            print(f"  ✗ {table}: unknown parent '{parent}' (members or accounts)")
+            sys.exit(1)
+        print(f"Generating {counts[table]:,} {table}...")
+        table_stats[table] = run(table, parents)[:2]
+    del member_keys
+    keys_report = (key_report(txn_stats, account_keys, n_members)
+                   if opts["key_partitions"] else None)
+    del account_keys
 
     # Summary stats
     print()
     print("═══ Dataset Summary ═══")
-    print(f"  Members:      {len(members):>6,} records  → members.csv (S3)")
-    print(f"  Accounts:     {len(accounts):>6,} records  → accounts.ndjson (BigQuery)")
-    print(f"  Loans:        {len(loans):>6,} records  → loans.json (PostgreSQL)")
-    print(f"  Transactions: {len(transactions):>6,} records  → transactions.jsonl (Kafka)")
-    active_m = sum(1 for m in members if m["membership_status"] == "active")
-    active_a = sum(1 for a in accounts if a["status"] == "active")
-    current_l = sum(1 for l in loans if l["status"] == "current")
-    delinquent_l = sum(1 for l in loans if l["days_past_due"] > 0)
-    susp_t = sum(1 for t in transactions if t["is_suspicious"])
-    total_dep = sum(m["total_deposits"] for m in members)
-    total_loan = sum(m["total_loans"] for m in members)
-    total_loan_bal = sum(l["current_balance"] for l in loans)
-    print(f"  Active members:      {active_m}")
-    print(f"  Active accounts:     {active_a}")
-    print(f"  Current loans:       {current_l}")
-    print(f"  Delinquent loans:    {delinquent_l}")
-    print(f"  Suspicious txns:     {susp_t}")
-    print(f"  Total deposits:      ${total_dep:,.2f}")
-    print(f"  Total member loans:  ${total_loan:,.2f}")
-    print(f"  Total loan balances: ${total_loan_bal:,.2f}")
+    print(f"  Members:      {n_members:>6,} records  → members.csv (S3)")
+    print(f"  Accounts:     {n_accounts:>6,} records  → accounts.ndjson (BigQuery)")
+    print(f"  Loans:        {n_loans:>6,} records  → loans.json (PostgreSQL)")
+    print(f"  Transactions: {n_txns:>6,} records  → transactions.jsonl (Kafka)")
+    for table, (rows, _) in table_stats.items():
+        print(f"  {table + ':':<13} {rows:>6,} records  → {table}.ndjson")
+    print(f"  Active members:      {member_stats['active']}")
+    print(f"  Active accounts:     {account_stats['active']}")
+    print(f"  Current loans:       {loan_stats['current']}")
+    print(f"  Delinquent loans:    {loan_stats['delinquent']}")
+    print(f"  Suspicious txns:     {txn_stats['suspicious']}")
+    print(f"  Total deposits:      ${member_stats['total_deposits']:,.2f}")
+    print(f"  Total member loans:  ${member_stats['total_loans']:,.2f}")
+    print(f"  Total loan balances: ${loan_stats['total_balance']:,.2f}")
     print()
     print("  S3 target:        s3://pinot-pulse-data/members/members.csv")
     print("  BigQuery target:  pinot_pulse.raw.accounts")
     print("  PostgreSQL:       analytics.loans")
     print("  Kafka topic:      pinot-pulse.transactions")
     print()
+    if keys_report:
+        print_key_report(keys_report)
 
     # Write metadata
+    sfx = COMPRESSION_SUFFIXES.get(compress, "")
+
+    def layout_file(dataset, filename):
+        return f"{dataset}/org=*/date=*/{filename}" if hive_partitioned(dataset, opts) else filename
+
     meta = {
         "organization_id": ORG_ID,
         "organization_name": ORG_NAME,
         "generated_at": datetime.now(timezone.utc).isoformat(),
+        "seed": seed,
+        "shards": shards,
+        "scale": args.scale,
+        "counts": counts,
+        "config_hash": digest,
+        "load_profile": args.profile,
+        "compression": compress,
+        "skew": args.skew,
+        "ledger": args.ledger,
+        "layout": args.layout,
+        "key_report": keys_report,
         "datasets": {
-            "members": {"file": "members.csv", "records": len(members), "target": "s3"},
-            "accounts": {"file": "accounts.ndjson", "records": len(accounts), "target": "bigquery"},
-            "loans": {"file": "loans.json", "records": len(loans), "target": "postgresql"},
-            "transactions": {"file": "transactions.jsonl", "records": len(transactions), "target": "kafka"},
+            "members": {"file": "members.csv" + sfx, "records": n_members, "target": "s3"},
+            "accounts": {"file": layout_file("accounts", "accounts.ndjson" + sfx),
+                         "records": n_accounts, "target": "bigquery"},
+            "loans": {"file": "loans.json" + sfx, "records": n_loans, "target": "postgresql"},
+            "transactions": {"file": layout_file("transactions", "transactions.jsonl" + sfx),
+                             "records": n_txns, "target": "kafka"},
+            **{table: {"file": f"{table}.ndjson" + sfx, "records": rows, "target": "pinot"}
+               for table, (rows, _) in table_stats.items()},
         },
         "branch_ids": BRANCH_IDS,
+        "files": files,
+        # --delta continues after the last generated timestamp
+        "watermark": TXN_WINDOW[1],
+        "deltas": [],
     }
-    meta_path = os.path.join(ds_dir, "metadata.json")
+    if opts["column_stats"]:
+        # count/nulls/min/max/sum, distinct (exact or HyperLogLog) and category counts
+        meta["column_stats"] = {name: stats.get("column_stats") for name, stats in (
+            ("members", member_stats), ("accounts", account_stats),
+            ("loans", loan_stats), ("transactions", txn_stats),
+            *((table, stats) for table, (_, stats) in table_stats.items()))}
     with open(meta_path, "w") as f:
         json.dump(meta, f, indent=2)
     print(f"  Metadata: {meta_path}")
     print("  Done!")
+
+
+if __name__ == "__main__":
+    main()
@@ -105,6 +105,7 @@ check_pkg() {
 }
 
 DEPS_OK=true
+check_pkg numpy numpy                 || DEPS_OK=false
 check_pkg psycopg2 psycopg2-binary   || DEPS_OK=false
 check_pkg boto3 boto3                 || DEPS_OK=false
 check_pkg google.cloud.bigquery google-cloud-bigquery || DEPS_OK=false
@@ -113,7 +114,7 @@ check_pkg requests requests           || DEPS_OK=false
 
 if ! $DEPS_OK; then
     warn "Some dependencies missing. Install with:"
-    echo "    pip install psycopg2-binary boto3 google-cloud-bigquery kafka-python requests"
+    echo "    pip install numpy psycopg2-binary boto3 google-cloud-bigquery kafka-python requests"
     echo ""
 fi
 
@@ -124,8 +125,9 @@ if $DO_GENERATE; then
     echo ""
     log "STEP 1: Generating test datasets..."
     echo "─────────────────────────────────────────────"
-    python3 "$SCRIPT_DIR/generate_datasets.py"
-    ok "Datasets generated (members, accounts, loans, transactions)"
+    # Fixed seed: re-runs with an unchanged config reuse the existing datasets
+    python3 "$SCRIPT_DIR/generate_datasets.py" --seed "${GENERATOR_SEED:-42}" ${GENERATOR_ARGS:-}
+    ok "Datasets ready (members, accounts, loans, transactions)"
     ((PASSED++))
 fi
 
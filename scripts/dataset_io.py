@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Pinot Pulse Enterprise — Dataset File Helpers
+Finds generated dataset files and opens them whether they were written plain
+or compressed (generate_datasets.py --compress gzip|zstd).
+
+Compressed datasets are concatenations of independent gzip members / zstd
+frames; the readers below stream across block boundaries transparently.
+
+With --layout hive, transactions and accounts are written as one file per
+partition (datasets/transactions/org=<id>/date=YYYY-MM-DD/transactions.jsonl);
+find_dataset_files() returns those, in partition order, when the flat file is absent.
+
+Usage (from the other loader scripts):
+  from dataset_io import find_dataset, open_dataset
+  path = find_dataset("datasets/transactions.jsonl")  # or .jsonl.gz / .jsonl.zst
+  with open_dataset(path) as f:
+      for line in f: ...
+  for path in find_dataset_files("datasets/transactions.jsonl", pattern="date=2025-11-2*"): ...
+  for record in read_ndjson(paths): ...             # parsed ahead on a thread, bounded
+"""
+import fnmatch
+import gzip
+import io
+import json
+import os
+import queue
+import sys
+import threading
+
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+DEFAULT_READ_AHEAD = 10_000  # records
+READ_CHUNK = 500  # records per hand-off between the reader thread and the consumer
+
+
+def find_dataset(*paths):
+    """First existing file among paths, trying each as-is then with .gz / .zst; else None."""
+    for path in paths:
+        for candidate in (path,) + tuple(path + s for s in COMPRESSED_SUFFIXES):
+            if os.path.exists(candidate):
+                return candidate
+    return None
+
+
+def find_partitions(*paths, pattern=None):
+    """Hive partition files of the first of paths that has any, in partition order.
+
+    datasets/transactions.jsonl is looked up as datasets/transactions/**/transactions.jsonl
+    (or .gz / .zst). `pattern` keeps only partitions whose path, or one of its
+    key=value parts, matches the glob.
+    """
+    for path in paths:
+        root, name = os.path.splitext(path)[0], os.path.basename(path)
+        found = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            partition = os.path.relpath(dirpath, root).replace(os.sep, "/")
+            if pattern and not (fnmatch.fnmatch(partition, pattern)
+                                or any(fnmatch.fnmatch(p, pattern) for p in partition.split("/"))):
+                continue
+            for candidate in (name,) + tuple(name + s for s in COMPRESSED_SUFFIXES):
+                if candidate in filenames:
+                    found.append(os.path.join(dirpath, candidate))
+                    break
+        if found:
+            return found
+    return []
+
+
+def find_dataset_files(*paths, pattern=None):
+    """[the flat dataset file] if there is one, else its Hive partition files."""
+    path = find_dataset(*paths)
+    return [path] if path else find_partitions(*paths, pattern=pattern)
+
+
+def partition_keys(path):
+    """{"org": ..., "date": ...} from the key=value directories of a partition file."""
+    return dict(p.split("=", 1) for p in os.path.dirname(path).split(os.sep) if "=" in p)
+
+
+def open_dataset(path, mode="r"):
+    """Open a dataset file for reading ("r" text or "rb" bytes), decompressing by suffix."""
+    binary = "b" in mode
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb" if binary else "rt")
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            print("ERROR: zstandard not installed (needed for .zst datasets).")
+            print("Run: pip install zstandard")
+            sys.exit(1)
+        raw = zstandard.ZstdDecompressor().stream_reader(
+            open(path, "rb"), read_across_frames=True, closefd=True)
+        return raw if binary else io.TextIOWrapper(raw)
+    return open(path, "rb" if binary else "r")
+
+
+def read_ndjson(paths, read_ahead=DEFAULT_READ_AHEAD):
+    """Yield the records of NDJSON files in order, parsed on a reader thread.
+
+    The reader stays at most about `read_ahead` records ahead of the consumer,
+    so memory is flat whatever the file size and the first record is available
+    as soon as it is parsed. Reader errors are re-raised in the consumer.
+    """
+    chunks = queue.Queue(maxsize=max(1, read_ahead // READ_CHUNK))
+    stop, done = threading.Event(), object()
+
+    def offer(item):
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def reader():
+        try:
+            chunk = []
+            for path in paths:
+                with open_dataset(path) as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        chunk.append(json.loads(line))
+                        if len(chunk) == READ_CHUNK:
+                            if not offer(chunk):
+                                return
+                            chunk = []
+            if chunk and not offer(chunk):
+                return
+            offer(done)
+        except Exception as e:
+            offer(e)
+
+    threading.Thread(target=reader, name="ndjson-reader", daemon=True).start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield from item
+    finally:
+        # A consumer that stops early releases the reader
+        stop.set()
+
+
+def content_type(path):
+    """MIME type for uploading a dataset file as-is."""
+    if path.endswith(".gz"):
+        return "application/gzip"
+    if path.endswith(".zst"):
+        return "application/zstd"
+    return "text/csv" if path.endswith(".csv") else "application/json"
@@ -7,6 +7,7 @@ Usage:
   python3 load_bigquery.py                              # Uses env vars
   python3 load_bigquery.py --project my-gcp-project     # Override project
   python3 load_bigquery.py --test                       # Connection test only
+  python3 load_bigquery.py --partition date=2024-03-01  # Reload one day of a --layout hive dataset
 
 Required env vars (or pass as args):
   GOOGLE_APPLICATION_CREDENTIALS  (path to service account JSON)
@@ -14,11 +15,14 @@ Required env vars (or pass as args):
   BQ_DATASET (default: pinot_pulse_raw)
 """
 import argparse
+import calendar
 import json
 import os
 import sys
 import time
 
+from dataset_io import find_dataset_files, open_dataset, partition_keys
+
 
 def main():
     parser = argparse.ArgumentParser(description="Load accounts dataset to BigQuery")
@@ -28,6 +32,9 @@ def main():
     parser.add_argument("--location", default="US")
     parser.add_argument("--credentials", default=os.getenv("GOOGLE_APPLICATION_CREDENTIALS", ""))
     parser.add_argument("--file", default="datasets/accounts.ndjson")
+    parser.add_argument("--partition", metavar="GLOB",
+                        help="With --layout hive datasets, reload only partitions matching this "
+                             "glob (their org/opened_date rows are replaced, the rest kept)")
     parser.add_argument("--test", action="store_true", help="Test connection only")
     parser.add_argument("--create-dataset", action="store_true", help="Create dataset if missing")
     args = parser.parse_args()
@@ -132,32 +139,56 @@ def main():
     # ─── Load Data ───
     print(f"\n[4/5] Loading data from NDJSON...")
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(script_dir, "..", args.file)
-    if not os.path.exists(file_path):
-        file_path = os.path.join(script_dir, args.file)
-    if not os.path.exists(file_path):
+    file_paths = find_dataset_files(os.path.join(script_dir, "..", args.file),
+                                    os.path.join(script_dir, args.file), pattern=args.partition)
+    if not file_paths:
         print(f"  ✗ File not found: {args.file}")
         sys.exit(1)
 
-    file_size = os.path.getsize(file_path)
-    print(f"  Source: {file_path} ({file_size:,} bytes)")
-
-    job_config = bigquery.LoadJobConfig(
-        source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
-        schema=schema,
-        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,  # Replace existing
-        max_bad_records=0,
-    )
+    file_size = sum(os.path.getsize(p) for p in file_paths)
+    if len(file_paths) == 1:
+        print(f"  Source: {file_paths[0]} ({file_size:,} bytes)")
+    else:
+        print(f"  Source: {len(file_paths):,} partitions under "
+              f"{os.path.dirname(os.path.dirname(os.path.dirname(file_paths[0])))} "
+              f"({file_size:,} bytes)")
 
     start = time.time()
-    with open(file_path, "rb") as f:
-        load_job = client.load_table_from_file(f, table_ref, job_config=job_config)
-
-    print(f"  Job ID: {load_job.job_id}")
-    print(f"  Waiting for load to complete...", end=" ")
-    load_job.result()  # Blocks until done
-    elapsed = time.time() - start
-    print(f"✓ ({elapsed:.1f}s)")
+    for i, file_path in enumerate(file_paths):
+        if args.partition:
+            # Replace just this partition's rows: accounts of the org opened that day
+            keys = partition_keys(file_path)
+            day = calendar.timegm(time.strptime(keys["date"], "%Y-%m-%d")) * 1000
+            client.query(
+                f"DELETE FROM `{table_ref}` WHERE organization_id = @org "
+                f"AND opened_date >= @start AND opened_date < @end",
+                job_config=bigquery.QueryJobConfig(query_parameters=[
+                    bigquery.ScalarQueryParameter("org", "STRING", keys["org"]),
+                    bigquery.ScalarQueryParameter("start", "INT64", day),
+                    bigquery.ScalarQueryParameter("end", "INT64", day + 86_400_000),
+                ])).result()
+            disposition = bigquery.WriteDisposition.WRITE_APPEND
+        elif i == 0:
+            disposition = bigquery.WriteDisposition.WRITE_TRUNCATE  # Replace existing
+        else:
+            disposition = bigquery.WriteDisposition.WRITE_APPEND
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            schema=schema,
+            write_disposition=disposition,
+            max_bad_records=0,
+        )
+
+        # .gz / .zst datasets are decompressed while streaming the upload
+        with open_dataset(file_path, "rb") as f:
+            load_job = client.load_table_from_file(f, table_ref, job_config=job_config)
+
+        if len(file_paths) > 1:
+            print(f"  [{i + 1}/{len(file_paths)}] {os.path.dirname(file_path)}")
+        print(f"  Job ID: {load_job.job_id}")
+        print(f"  Waiting for load to complete...", end=" ")
+        load_job.result()  # Blocks until done
+        print(f"✓ ({time.time() - start:.1f}s)")
 
     # ─── Verify ───
     print(f"\n[5/5] Verifying loaded data...")
@@ -8,6 +8,10 @@ Usage:
   python3 load_kafka.py --bootstrap localhost:9092              # Override broker
   python3 load_kafka.py --test                                 # Connection test only
   python3 load_kafka.py --rate 100                             # 100 msgs/sec
+  python3 load_kafka.py --rate-schedule ramp:1000:50000:60     # 1k → 50k msgs/sec over 60 s
+  python3 load_kafka.py --workers 4                            # 4 producer processes
+  python3 load_kafka.py --report run.json                      # acks, failures, latency → JSON
+  python3 load_kafka.py --partition date=2025-11-21            # one day of a --layout hive dataset
   python3 load_kafka.py --sasl-user apikey --sasl-pass secret  # Confluent Cloud
 
 Required env vars (or pass as args):
@@ -20,10 +24,669 @@ Required env vars (or pass as args):
 """
 import argparse
 import json
+import math
+import multiprocessing
 import os
+import queue
+import re
 import sys
+import threading
 import time
 
+from dataset_io import DEFAULT_READ_AHEAD, find_dataset_files, open_dataset, read_ndjson
+
+try:
+    from kafka.partitioner.default import murmur2
+except ImportError:  # main() reports the missing kafka-python
+    murmur2 = None
+
+DEFAULT_REPORT = "kafka-delivery-report.json"
+
+
+# ─── Rate schedules ───
+# rate(t) is the target msgs/sec t seconds in; total(t) is its integral, the
+# number of messages that should have been sent by then.
+
+class ConstantRate:
+    def __init__(self, rate):
+        self.peak = rate
+
+    def rate(self, t):
+        return self.peak
+
+    def total(self, t):
+        return self.peak * t
+
+    def __str__(self):
+        return f"{self.peak:g} msgs/sec"
+
+
+class RampRate:
+    """Linear from start to end over `seconds`, then end."""
+
+    def __init__(self, start, end, seconds):
+        self.start, self.end, self.seconds = start, end, seconds
+        self.peak = max(start, end)
+
+    def rate(self, t):
+        if t >= self.seconds:
+            return self.end
+        return self.start + (self.end - self.start) * t / self.seconds
+
+    def total(self, t):
+        ramp = min(t, self.seconds)
+        done = self.start * ramp + (self.end - self.start) * ramp * ramp / (2 * self.seconds)
+        return done + self.end * max(0.0, t - self.seconds)
+
+    def __str__(self):
+        return f"ramp {self.start:g} → {self.end:g} msgs/sec over {self.seconds:g}s"
+
+
+class StepRate:
+    """Each rate for `seconds` in turn, holding the last."""
+
+    def __init__(self, seconds, rates):
+        self.seconds, self.rates = seconds, rates
+        self.before = [0.0]
+        for r in rates[:-1]:
+            self.before.append(self.before[-1] + r * seconds)
+        self.peak = max(rates)
+
+    def _step(self, t):
+        return min(int(t // self.seconds), len(self.rates) - 1)
+
+    def rate(self, t):
+        return self.rates[self._step(t)]
+
+    def total(self, t):
+        k = self._step(t)
+        return self.before[k] + self.rates[k] * (t - k * self.seconds)
+
+    def __str__(self):
+        return f"steps of {self.seconds:g}s: {', '.join(f'{r:g}' for r in self.rates)} msgs/sec"
+
+
+class SineRate:
+    """mean + amplitude · sin(2πt / period)."""
+
+    def __init__(self, mean, amplitude, period):
+        self.mean, self.amplitude, self.period = mean, amplitude, period
+        self.peak = mean + amplitude
+
+    def rate(self, t):
+        return self.mean + self.amplitude * math.sin(2 * math.pi * t / self.period)
+
+    def total(self, t):
+        w = 2 * math.pi / self.period
+        return self.mean * t + self.amplitude / w * (1 - math.cos(w * t))
+
+    def __str__(self):
+        return f"sine {self.mean:g} ± {self.amplitude:g} msgs/sec, period {self.period:g}s"
+
+
+def parse_schedule(spec):
+    """ramp:START:END:SECONDS, step:SECONDS:R1,R2,... or sine:MEAN:AMPLITUDE:PERIOD."""
+    kind, _, rest = spec.partition(":")
+    try:
+        if kind == "ramp":
+            start, end, seconds = (float(v) for v in rest.split(":"))
+            schedule = RampRate(start, end, seconds)
+            ok = seconds > 0 and min(start, end) >= 0 and schedule.peak > 0
+        elif kind == "step":
+            seconds, rates = rest.split(":")
+            schedule = StepRate(float(seconds), [float(r) for r in rates.split(",")])
+            ok = schedule.seconds > 0 and min(schedule.rates) >= 0 and schedule.peak > 0
+        elif kind == "sine":
+            mean, amplitude, period = (float(v) for v in rest.split(":"))
+            schedule = SineRate(mean, amplitude, period)
+            ok = period > 0 and 0 <= amplitude <= mean and mean > 0
+        else:
+            raise argparse.ArgumentTypeError(f"unknown schedule '{kind}' (ramp, step or sine)")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bad schedule '{spec}'")
+    if not ok:
+        raise argparse.ArgumentTypeError(f"schedule '{spec}' needs positive durations and "
+                                         "rates that never go negative")
+    return schedule
+
+
+class TokenBucket:
+    """Paces sends to a rate schedule measured from the first acquire().
+
+    Tokens accrue as the schedule's integral over a monotonic clock, so sleep
+    overshoot and send time are paid back instead of drifting. The bucket holds
+    at most `burst_seconds` of peak-rate tokens, which caps the catch-up after a
+    stall. When empty it sleeps until a quantum (about 5 ms of messages) is due,
+    so at high rates it sleeps per batch rather than per message.
+    """
+    QUANTUM_SECONDS = 0.005
+    MAX_SLEEP = 0.05
+
+    def __init__(self, schedule, burst_seconds=0.1):
+        self.schedule = schedule
+        self.burst = max(1.0, schedule.peak * burst_seconds)
+        self.start = None
+
+    def acquire(self):
+        now = time.monotonic()
+        if self.start is None:
+            self.start, self.last, self.tokens = now, 0.0, 1.0
+        while True:
+            t = now - self.start
+            self.tokens = min(self.burst, self.tokens
+                              + self.schedule.total(t) - self.schedule.total(self.last))
+            self.last = t
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            rate = self.schedule.rate(t)
+            want = max(1.0, rate * self.QUANTUM_SECONDS) - self.tokens
+            time.sleep(min(self.MAX_SLEEP, want / rate) if rate > 0 else self.MAX_SLEEP)
+            now = time.monotonic()
+
+    def elapsed(self):
+        return time.monotonic() - self.start if self.start is not None else 0.0
+
+
+# ─── Delivery tracking ───
+
+class LatencyHistogram:
+    """HDR-style histogram of microsecond latencies: values below 128 µs are
+    exact, larger ones land in log-linear buckets 1/64 of their magnitude wide
+    (~1.6% precision). Buckets are sparse, so histograms merge by adding counts."""
+    SUB_BUCKETS = 64
+
+    def __init__(self, counts=None, max_value=0):
+        self.counts = dict(counts or {})
+        self.max = max_value
+
+    @classmethod
+    def bucket(cls, value):
+        if value < 2 * cls.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - 7
+        return 2 * cls.SUB_BUCKETS + (shift - 1) * cls.SUB_BUCKETS + (value >> shift) - cls.SUB_BUCKETS
+
+    @classmethod
+    def upper(cls, bucket):
+        """Highest value in a bucket."""
+        if bucket < 2 * cls.SUB_BUCKETS:
+            return bucket
+        shift, sub = divmod(bucket - 2 * cls.SUB_BUCKETS, cls.SUB_BUCKETS)
+        return ((cls.SUB_BUCKETS + sub + 1) << (shift + 1)) - 1
+
+    def record(self, value):
+        value = max(0, int(value))
+        b = self.bucket(value)
+        self.counts[b] = self.counts.get(b, 0) + 1
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for b, n in other.counts.items():
+            self.counts[b] = self.counts.get(b, 0) + n
+        self.max = max(self.max, other.max)
+
+    def total(self):
+        return sum(self.counts.values())
+
+    def percentile(self, q):
+        total = self.total()
+        if not total:
+            return 0
+        rank, seen = max(1, math.ceil(q / 100 * total)), 0
+        for b in sorted(self.counts):
+            seen += self.counts[b]
+            if seen >= rank:
+                return min(self.upper(b), self.max)
+        return self.max
+
+    def summary(self):
+        """Percentiles in milliseconds."""
+        out = {f"p{q:g}": round(self.percentile(q) / 1000, 3) for q in (50, 95, 99, 99.9)}
+        out["max"] = round(self.max / 1000, 3)
+        return out
+
+
+def partition_index(key, n_partitions):
+    """Index, among the sorted partitions, that kafka-python's DefaultPartitioner
+    gives a keyed record."""
+    return (murmur2(key.encode("utf-8")) & 0x7fffffff) % n_partitions
+
+
+class DeliveryTracker:
+    """Counts broker acks and failures per partition from send() futures, and
+    records produce-to-ack latency from `sent_at`, the perf_counter() reading
+    taken just before send() (which can block on a full buffer). Callbacks run
+    on the producer's I/O thread.
+
+    A failed send reports no metadata, so its partition is the explicit one
+    passed to track(), else the default partitioner's choice for its key
+    among `partitions`.
+    """
+
+    def __init__(self, partitions=()):
+        self.partitions = list(partitions)
+        self.lock = threading.Lock()
+        self.acked, self.failed, self.reasons = {}, {}, {}
+        self.latency = LatencyHistogram()
+
+    def track(self, future, sent_at, partition=None, key=None):
+        future.add_callback(self._ack, sent_at)
+        future.add_errback(self._fail, partition, key)
+        return future
+
+    def _ack(self, sent_at, metadata):
+        micros = (time.perf_counter() - sent_at) * 1e6
+        with self.lock:
+            self.acked[metadata.partition] = self.acked.get(metadata.partition, 0) + 1
+            self.latency.record(micros)
+
+    def _fail(self, partition, key, exc):
+        if partition is None and key and self.partitions:
+            partition = self.partitions[partition_index(key, len(self.partitions))]
+        reason = type(exc).__name__
+        with self.lock:
+            self.failed[partition] = self.failed.get(partition, 0) + 1
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def state(self):
+        """Picklable counters, for workers to hand back to the parent."""
+        with self.lock:
+            return {"acked": dict(self.acked), "failed": dict(self.failed),
+                    "reasons": dict(self.reasons),
+                    "latency": {"counts": dict(self.latency.counts), "max": self.latency.max}}
+
+    def merge(self, state):
+        with self.lock:
+            for name in ("acked", "failed", "reasons"):
+                mine = getattr(self, name)
+                for k, n in state[name].items():
+                    mine[k] = mine.get(k, 0) + n
+            self.latency.merge(LatencyHistogram(state["latency"]["counts"],
+                                                state["latency"]["max"]))
+
+    def total(self, name):
+        return sum(getattr(self, name).values())
+
+
+def partition_label(partition):
+    return "unassigned" if partition is None else str(partition)
+
+
+def partition_balance(tracker, partitions):
+    """Records per partition (acked or failed, empty partitions included) and
+    how evenly they are spread: max/mean 1.0 is perfectly even."""
+    counts = [tracker.acked.get(p, 0) + tracker.failed.get(p, 0) for p in partitions]
+    if not counts:
+        return None
+    mean = sum(counts) / len(counts)
+    stddev = math.sqrt(sum((c - mean) ** 2 for c in counts) / len(counts))
+    return {
+        "records": {partition_label(p): c for p, c in zip(partitions, counts)},
+        "min": min(counts),
+        "max": max(counts),
+        "mean": round(mean, 1),
+        "empty": counts.count(0),
+        "max_over_mean": round(max(counts) / max(mean, 1), 3),
+        "stddev_over_mean": round(stddev / max(mean, 1), 3),
+    }
+
+
+def pinot_partition_config(key, partitions):
+    """segmentPartitionConfig for a Pinot table partitioned like the topic, or
+    None when the key is not a single column."""
+    if len(key.fields) != 1 or not partitions:
+        return None
+    return {"columnPartitionMap": {key.fields[0]: {"functionName": "Murmur",
+                                                   "numPartitions": len(partitions)}}}
+
+
+def delivery_report(args, tracker, enqueued, send_errors, elapsed, workers=None, rejected=0,
+                    partitions=()):
+    """The --report JSON: what the broker acknowledged, not just what was queued."""
+    acked, failed = tracker.total("acked"), tracker.total("failed")
+    partitions = sorted(set(tracker.acked) | set(tracker.failed),
+                        key=lambda p: (p is None, p if p is not None else 0))
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "topic": args.topic,
+        "bootstrap": args.bootstrap,
+        "file": args.file,
+        "workers": args.workers,
+        "raw": args.raw,
+        "key": str(args.key),
+        "partitioner": "murmur2" if args.key.fields else "round-robin",
+        "rejected": rejected,
+        "enqueued": enqueued,
+        "acked": acked,
+        "failed": failed,
+        "send_errors": send_errors,
+        "unacknowledged": enqueued - acked - failed,
+        "duration_s": round(elapsed, 3),
+        "acked_per_s": round(acked / elapsed, 1) if elapsed > 0 else 0,
+        "latency_ms": tracker.latency.summary(),
+        "partitions": {partition_label(p): {"acked": tracker.acked.get(p, 0),
+                                            "failed": tracker.failed.get(p, 0)}
+                       for p in partitions},
+        "balance": partition_balance(tracker, partitions),
+        "pinot_partition_config": pinot_partition_config(args.key, partitions),
+        "failure_reasons": tracker.reasons,
+        "latency_histogram_us": [[LatencyHistogram.upper(b), n]
+                                 for b, n in sorted(tracker.latency.counts.items())],
+        "worker_reports": workers or [],
+    }
+
+
+# ─── Records ───
+REQUIRED_FIELDS = ("transaction_id", "organization_id", "member_id",
+                   "account_id", "amount", "timestamp")
+KEY_FIELDS = ("transaction_id", "account_id", "member_id", "organization_id")
+KEY_SEPARATOR = "|"  # between the fields of a composite key
+
+
+def iter_lines(paths):
+    for path in paths:
+        with open_dataset(path, "rb") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+
+
+class MessageKey:
+    """--key: what a record is keyed by — one of KEY_FIELDS, several of them
+    joined by KEY_SEPARATOR (a composite key), or nothing. A record missing a
+    key field is sent unkeyed."""
+
+    def __init__(self, fields=()):
+        self.fields = tuple(fields)
+        self.patterns = [re.compile(rb'"%s"\s*:\s*"([^"]*)"' % f.encode()) for f in self.fields]
+
+    def __str__(self):
+        return "+".join(self.fields) or "none"
+
+    def of(self, record):
+        """The key of a parsed record."""
+        values = [record.get(field) for field in self.fields]
+        return KEY_SEPARATOR.join(map(str, values)) if values and all(values) else None
+
+    def scan(self, line):
+        """The key of a raw NDJSON line, found without parsing the record."""
+        values = []
+        for pattern in self.patterns:
+            match = pattern.search(line)
+            if not match:
+                return self.of(json.loads(line))
+            values.append(match.group(1).decode())
+        return KEY_SEPARATOR.join(values) if values and all(values) else None
+
+
+def parse_key(spec):
+    """--key: a field, fields joined with '+' (composite) or 'none'."""
+    if spec == "none":
+        return MessageKey()
+    fields = spec.split("+")
+    unknown = [f for f in fields if f not in KEY_FIELDS]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown key field {', '.join(unknown)} (expected {', '.join(KEY_FIELDS)}, "
+            "several joined with '+', or none)")
+    return MessageKey(fields)
+
+
+class Partitioner:
+    """The partition each message goes to, among the topic's partitions.
+
+    Keyed messages go to murmur2(key) % partitions: what the Kafka clients'
+    default partitioner computes, and Pinot's Murmur partition function, so
+    a table partitioned on the key column can prune segments by Kafka
+    partition. Unkeyed messages are spread round-robin. Without partition
+    metadata, the client decides (None).
+    """
+
+    def __init__(self, partitions):
+        self.partitions = sorted(partitions)
+        self.unkeyed = 0
+
+    def __call__(self, key):
+        if not self.partitions:
+            return None
+        if key is None:
+            idx = self.unkeyed % len(self.partitions)
+            self.unkeyed += 1
+        else:
+            idx = partition_index(key, len(self.partitions))
+        return self.partitions[idx]
+
+
+def check_record(line):
+    """Why a raw line is not a valid transaction, or None."""
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        return f"invalid JSON ({e})"
+    missing = [field for field in REQUIRED_FIELDS if record.get(field) is None]
+    return f"missing {', '.join(missing)}" if missing else None
+
+
+class RawRecords:
+    """(key, line bytes) pairs for --raw: the line is the message value as-is
+    and only the key is scanned out of it. With `validate`, lines failing
+    check_record() are skipped and counted in `rejected`."""
+
+    def __init__(self, lines, key, validate=False):
+        self.lines, self.key, self.validate, self.rejected = lines, key, validate, 0
+
+    def __iter__(self):
+        for line in self.lines:
+            if self.validate:
+                problem = check_record(line)
+                if problem:
+                    self.rejected += 1
+                    if self.rejected <= 5:
+                        print(f"    ✗ Skipping record: {problem}")
+                    continue
+            yield self.key.scan(line), line
+
+
+# ─── Producer ───
+
+def producer_config(args):
+    config = {
+        "bootstrap_servers": args.bootstrap.split(","),
+        "security_protocol": args.security_protocol,
+        # --raw values are already the encoded line
+        "value_serializer": None if args.raw else lambda v: json.dumps(v).encode("utf-8"),
+        "key_serializer": lambda k: k.encode("utf-8") if k else None,
+        "acks": "all",
+        "retries": 3,
+        "batch_size": args.batch_size * 1024,
+        "linger_ms": 10,
+        "compression_type": "gzip",
+        "max_request_size": 10485760,
+    }
+
+    if args.sasl_mechanism:
+        config["sasl_mechanism"] = args.sasl_mechanism
+        config["sasl_plain_username"] = args.sasl_user
+        config["sasl_plain_password"] = args.sasl_pass
+    return config
+
+
+def produce(producer, topic, records, partitioner, pacer, tracker):
+    """Send (key, value) records from this process to the partitions
+    `partitioner` picks, tracking deliveries in `tracker`.
+
+    Returns (enqueued, send errors, paced s, elapsed s).
+    """
+    print(f"\n  Producing to topic '{topic}'...")
+    sent = 0
+    errors = 0
+    start = time.time()
+
+    for i, (key, value) in enumerate(records):
+        if pacer:
+            pacer.acquire()
+        try:
+            partition = partitioner(key)
+            sent_at = time.perf_counter()
+            future = producer.send(topic, key=key, value=value, partition=partition)
+            tracker.track(future, sent_at, partition, key=key)
+            sent += 1
+        except Exception as e:
+            errors += 1
+            if errors <= 5:
+                print(f"    ✗ Error sending record {i}: {e}")
+
+        # Progress
+        if (i + 1) % 1000 == 0:
+            elapsed = time.time() - start
+            rate_actual = (i + 1) / elapsed if elapsed > 0 else 0
+            print(f"    Sent {i+1:>6,} ({rate_actual:.0f} msgs/sec, "
+                  f"{tracker.total('acked'):,} acked)")
+
+    paced = pacer.elapsed() if pacer else 0
+
+    # Flush remaining; acks for everything sent arrive by the end of it
+    print("  Flushing producer buffer...")
+    producer.flush(timeout=30)
+    producer.close()
+    return sent, errors, paced, time.time() - start
+
+
+# ─── Partition-parallel producing (--workers) ───
+# The parent reads raw lines, computes each record's partition with the same
+# Partitioner as a single producer and hands it to the worker process that
+# owns that partition. Workers parse and send, so
+# per-partition order is the file order, as with a single producer.
+# --rate/--rate-schedule pace the routing, not the workers: a worker sends
+# what it is handed as fast as it can, so after a stall (a slow broker) it
+# catches up above the schedule by at most its queued records.
+ROUTE_CHUNK = 500  # lines per hand-off to a worker
+PACED_HAND_OFF = 0.05  # s; when paced, partial chunks are handed off at least this often
+
+
+def produce_worker(args, worker, inbox, results):
+    """One producer process: sends (partition, key, line) chunks until None."""
+    from kafka import KafkaProducer
+
+    producer = KafkaProducer(**producer_config(args))
+    tracker = DeliveryTracker()
+    sent = errors = rejected = 0
+    start = time.time()
+    while True:
+        chunk = inbox.get()
+        if chunk is None:
+            break
+        for partition, key, line in chunk:
+            if args.raw and args.validate:
+                problem = check_record(line)
+                if problem:
+                    rejected += 1
+                    if rejected <= 5:
+                        print(f"    ✗ Worker {worker}: skipping record: {problem}")
+                    continue
+            try:
+                value = line if args.raw else json.loads(line)
+                sent_at = time.perf_counter()
+                future = producer.send(args.topic, key=key, value=value, partition=partition)
+                tracker.track(future, sent_at, partition)
+                sent += 1
+            except Exception as e:
+                errors += 1
+                if errors <= 5:
+                    print(f"    ✗ Worker {worker}: error sending to partition {partition}: {e}")
+    producer.flush(timeout=30)
+    producer.close()
+    results.put({"worker": worker, "sent": sent, "errors": errors, "rejected": rejected,
+                 "seconds": time.time() - start, "delivery": tracker.state()})
+
+
+def produce_parallel(args, file_paths, partitions, pacer):
+    """Route every record to the worker owning its partition. When paced,
+    records are handed off within PACED_HAND_OFF of their slot instead of
+    waiting for a full chunk, so workers send close to the schedule.
+
+    Returns (worker reports, seconds spent pacing the routing); raises
+    RuntimeError if a worker dies.
+    """
+    partitioner = Partitioner(partitions)
+    partitions = partitioner.partitions
+    owner = {p: i % args.workers for i, p in enumerate(partitions)}
+    owners = [[p for p in partitions if owner[p] == w] for w in range(args.workers)]
+    # Bound what is in flight to about --read-ahead records in all
+    depth = max(1, args.read_ahead // (ROUTE_CHUNK * args.workers))
+    inboxes = [multiprocessing.Queue(depth) for _ in range(args.workers)]
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=produce_worker, args=(args, w, inboxes[w], results))
+             for w in range(args.workers)]
+    for proc in procs:
+        proc.start()
+
+    def hand_off(w, item):
+        while True:
+            try:
+                inboxes[w].put(item, timeout=1)
+                return
+            except queue.Full:
+                if not procs[w].is_alive():
+                    raise RuntimeError(f"worker {w} exited with code {procs[w].exitcode}")
+
+    try:
+        chunks = [[] for _ in range(args.workers)]
+        routed = 0
+        start = last = handed = time.time()
+        for line in iter_lines(file_paths):
+            if pacer:
+                pacer.acquire()
+            key = args.key.scan(line)
+            partition = partitioner(key)
+            w = owner[partition]
+            chunks[w].append((partition, key, line))
+            if len(chunks[w]) == ROUTE_CHUNK:
+                hand_off(w, chunks[w])
+                chunks[w] = []
+            routed += 1
+            now = time.time()
+            if pacer and now - handed >= PACED_HAND_OFF:
+                handed = now
+                for w, chunk in enumerate(chunks):
+                    if chunk:
+                        hand_off(w, chunk)
+                        chunks[w] = []
+            if now - last >= 1:
+                last = now
+                print(f"    Routed {routed:>9,} ({routed / (now - start):.0f} msgs/sec)")
+        paced = pacer.elapsed() if pacer else 0
+        for w, chunk in enumerate(chunks):
+            if chunk:
+                hand_off(w, chunk)
+            hand_off(w, None)
+
+        reports = {}
+        while len(reports) < len(procs):
+            try:
+                report = results.get(timeout=1)
+                reports[report["worker"]] = report
+            except queue.Empty:
+                for w, proc in enumerate(procs):
+                    if w not in reports and not proc.is_alive():
+                        raise RuntimeError(f"worker {w} exited with code {proc.exitcode}")
+    except BaseException:
+        # Nothing will drain a dead worker's queue; don't wait on it at exit
+        for inbox in inboxes:
+            inbox.cancel_join_thread()
+        raise
+    finally:
+        for proc in procs:
+            proc.join(timeout=1)
+            if proc.is_alive():
+                proc.terminate()
+    for w, report in reports.items():
+        report["partitions"] = owners[w]
+    return [reports[w] for w in sorted(reports)], paced
+
 
 def main():
     parser = argparse.ArgumentParser(description="Stream transactions to Kafka")
@@ -40,18 +703,60 @@ def main():
     parser.add_argument("--sasl-pass",
                         default=os.getenv("KAFKA_SASL_PASSWORD", ""))
     parser.add_argument("--file", default="datasets/transactions.jsonl")
-    parser.add_argument("--rate", type=int, default=0,
+    parser.add_argument("--partition", metavar="GLOB",
+                        help="With --layout hive datasets, only produce partitions matching "
+                             "this glob (e.g. date=2025-11-21, 'date=2025-11-*')")
+    parser.add_argument("--rate", type=float, default=0,
                         help="Messages per second (0=no limit)")
+    parser.add_argument("--rate-schedule", type=parse_schedule, metavar="SPEC",
+                        help="Varying rate instead of --rate: ramp:START:END:SECONDS, "
+                             "step:SECONDS:R1,R2,... (holds the last) or "
+                             "sine:MEAN:AMPLITUDE:PERIOD")
     parser.add_argument("--batch-size", type=int, default=100,
                         help="Batch size for producer")
+    parser.add_argument("--read-ahead", type=int, default=DEFAULT_READ_AHEAD,
+                        help="Records parsed ahead of the producer "
+                             f"(default: {DEFAULT_READ_AHEAD:,}); memory is bounded by this, "
+                             "not by the file size")
+    parser.add_argument("--raw", action="store_true",
+                        help="Send each line's bytes as the message value instead of "
+                             "parsing and re-encoding it; only the key is scanned out")
+    parser.add_argument("--validate", action="store_true",
+                        help="With --raw, parse each record and skip ones that are not "
+                             "valid JSON or lack a required field")
     parser.add_argument("--test", action="store_true", help="Connection test only")
     parser.add_argument("--create-topic", action="store_true",
                         help="Create topic if missing")
+    parser.add_argument("--key", type=parse_key, default="transaction_id", metavar="FIELDS",
+                        help=f"Message key: {', '.join(KEY_FIELDS)}, several joined with '+' "
+                             "(e.g. organization_id+account_id) or none (round-robin). Keyed "
+                             "messages are partitioned by murmur2, as Pinot's Murmur partition "
+                             "function does (default: transaction_id)")
     parser.add_argument("--partitions", type=int, default=3,
                         help="Number of partitions (for --create-topic)")
     parser.add_argument("--dry-run", action="store_true",
                         help="Parse and validate without sending")
+    parser.add_argument("--report", default=DEFAULT_REPORT,
+                        help="Delivery report JSON: acks/failures per partition and "
+                             f"send→ack latency percentiles (default: {DEFAULT_REPORT})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Producer processes; records are routed to the one owning "
+                             "their partition (default: 1, in-process). --rate and "
+                             "--rate-schedule pace the routing: after a stall a worker sends "
+                             "its queued records (up to about --read-ahead / workers) "
+                             "above the schedule")
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.read_ahead < 1:
+        parser.error("--read-ahead must be at least 1")
+    if args.rate < 0:
+        parser.error("--rate must not be negative")
+    if args.validate and not args.raw:
+        parser.error("--validate only applies to --raw (records are always parsed otherwise)")
+    if args.rate and args.rate_schedule:
+        parser.error("--rate and --rate-schedule are mutually exclusive")
+    schedule = args.rate_schedule or (ConstantRate(args.rate) if args.rate else None)
 
     try:
         from kafka import KafkaProducer, KafkaAdminClient
@@ -68,27 +773,16 @@ def main():
     print(f"  Protocol:  {args.security_protocol}")
     if args.sasl_mechanism:
         print(f"  SASL:      {args.sasl_mechanism}")
-    if args.rate:
-        print(f"  Rate:      {args.rate} msgs/sec")
+    if schedule:
+        print(f"  Rate:      {schedule}")
+    if args.workers > 1:
+        print(f"  Workers:   {args.workers}")
+    print(f"  Key:       {args.key}")
+    if args.raw:
+        print(f"  Values:    raw line bytes{' (validated)' if args.validate else ''}")
 
     # ─── Build producer config ───
-    config = {
-        "bootstrap_servers": args.bootstrap.split(","),
-        "security_protocol": args.security_protocol,
-        "value_serializer": lambda v: json.dumps(v).encode("utf-8"),
-        "key_serializer": lambda k: k.encode("utf-8") if k else None,
-        "acks": "all",
-        "retries": 3,
-        "batch_size": args.batch_size * 1024,
-        "linger_ms": 10,
-        "compression_type": "gzip",
-        "max_request_size": 10485760,
-    }
-
-    if args.sasl_mechanism:
-        config["sasl_mechanism"] = args.sasl_mechanism
-        config["sasl_plain_username"] = args.sasl_user
-        config["sasl_plain_password"] = args.sasl_pass
+    config = producer_config(args)
 
     admin_config = {
         "bootstrap_servers": args.bootstrap.split(","),
@@ -147,87 +841,131 @@ def main():
     # ─── Load & Produce ───
     print(f"\n[3/4] Loading transaction data...")
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(script_dir, "..", args.file)
-    if not os.path.exists(file_path):
-        file_path = os.path.join(script_dir, args.file)
-    if not os.path.exists(file_path):
+    file_paths = find_dataset_files(os.path.join(script_dir, "..", args.file),
+                                    os.path.join(script_dir, args.file), pattern=args.partition)
+    if not file_paths:
         print(f"  ✗ File not found: {args.file}")
         sys.exit(1)
+    if len(file_paths) > 1:
+        print(f"  {len(file_paths):,} partitions: {os.path.dirname(file_paths[0])} … "
+              f"{os.path.dirname(file_paths[-1])}")
 
-    # Read all transactions
-    transactions = []
-    with open(file_path, "r") as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                transactions.append(json.loads(line))
-
-    print(f"  Loaded {len(transactions):,} transactions")
+    # Streamed: records are parsed a bounded distance ahead of the producer,
+    # or with --raw not parsed at all
+    size = sum(os.path.getsize(p) for p in file_paths)
+    if args.raw and not args.dry_run:
+        print(f"  Streaming {size:,} bytes (raw)")
+    else:
+        print(f"  Streaming {size:,} bytes (read-ahead {args.read_ahead:,} records)")
+    transactions = read_ndjson(file_paths, args.read_ahead)
 
     if args.dry_run:
         # Validate without sending
-        print(f"\n  Dry run — validating {len(transactions)} records...")
+        print(f"\n  Dry run — validating records...")
         errors = 0
+        count = 0
         for i, txn in enumerate(transactions):
-            required = ["transaction_id", "organization_id", "member_id",
-                        "account_id", "amount", "timestamp"]
-            for field in required:
+            count += 1
+            for field in REQUIRED_FIELDS:
                 if field not in txn or txn[field] is None:
                     print(f"    ✗ Record {i}: missing required field '{field}'")
                     errors += 1
         if errors == 0:
-            print(f"  ✓ All {len(transactions)} records valid")
+            print(f"  ✓ All {count:,} records valid")
         else:
-            print(f"  ✗ {errors} validation errors found")
+            print(f"  ✗ {errors} validation errors found in {count:,} records")
         return
 
-    # Create producer
-    print(f"\n  Producing to topic '{args.topic}'...")
+    pacer = TokenBucket(schedule) if schedule else None
     producer = KafkaProducer(**config)
-
-    sent = 0
-    errors = 0
-    start = time.time()
-    rate_limiter = 1.0 / args.rate if args.rate > 0 else 0
-
-    for i, txn in enumerate(transactions):
-        key = txn.get("transaction_id", "")
+    try:
+        partitions = sorted(producer.partitions_for(args.topic) or [])
+    except Exception:
+        partitions = []
+    if args.workers > 1:
+        producer.close()
+        if not partitions:
+            print(f"  ✗ No partition metadata for topic '{args.topic}'")
+            sys.exit(1)
+        if args.workers > len(partitions):
+            print(f"  ⚠ Topic has {len(partitions)} partitions — using {len(partitions)} workers")
+            args.workers = len(partitions)
+        print(f"\n  Producing to topic '{args.topic}' "
+              f"({len(partitions)} partitions, {args.workers} workers)...")
+        start = time.time()
         try:
-            producer.send(args.topic, key=key, value=txn)
-            sent += 1
-        except Exception as e:
-            errors += 1
-            if errors <= 5:
-                print(f"    ✗ Error sending record {i}: {e}")
-
-        # Progress
-        if (i + 1) % 1000 == 0:
-            elapsed = time.time() - start
-            rate_actual = (i + 1) / elapsed if elapsed > 0 else 0
-            print(f"    Sent {i+1:>6,} / {len(transactions):,} "
-                  f"({rate_actual:.0f} msgs/sec)")
-
-        # Rate limiting
-        if rate_limiter > 0:
-            time.sleep(rate_limiter)
-
-    # Flush remaining
-    print("  Flushing producer buffer...")
-    producer.flush(timeout=30)
-    producer.close()
-    elapsed = time.time() - start
+            reports, paced = produce_parallel(args, file_paths, partitions, pacer)
+        except RuntimeError as e:
+            print(f"  ✗ {e}")
+            sys.exit(1)
+        elapsed = time.time() - start
+        sent = sum(r["sent"] for r in reports)
+        errors = sum(r["errors"] for r in reports)
+        rejected = sum(r["rejected"] for r in reports)
+        tracker = DeliveryTracker()
+        for r in reports:
+            tracker.merge(r["delivery"])
+    else:
+        reports = None
+        tracker = DeliveryTracker(partitions)
+        if args.raw:
+            records = RawRecords(iter_lines(file_paths), args.key, args.validate)
+        else:
+            records = ((args.key.of(txn), txn) for txn in transactions)
+        sent, errors, paced, elapsed = produce(producer, args.topic, records,
+                                               Partitioner(partitions), pacer, tracker)
+        rejected = getattr(records, "rejected", 0)
+    acked, failed = tracker.total("acked"), tracker.total("failed")
 
     # ─── Summary ───
     print(f"\n[4/4] Production complete")
-    print(f"  ✓ Sent:     {sent:,} messages")
+    for r in reports or []:
+        delivery = r["delivery"]
+        r_acked, r_failed = sum(delivery["acked"].values()), sum(delivery["failed"].values())
+        print(f"  {'✗' if r['errors'] or r_failed else '✓'} Worker {r['worker']} "
+              f"(partitions {','.join(map(str, r['partitions']))}): {r_acked:,} acked, "
+              f"{r_failed + r['errors']:,} failed, "
+              f"{r_acked / max(r['seconds'], 1e-9):.0f} msgs/sec")
+    print(f"  ✓ Acked:    {acked:,} of {sent:,} messages sent")
+    if failed:
+        reasons = ", ".join(f"{name} ×{n:,}" for name, n in sorted(tracker.reasons.items()))
+        print(f"  ✗ Failed:   {failed:,} after send ({reasons})")
     if errors:
-        print(f"  ✗ Errors:   {errors:,}")
+        print(f"  ✗ Errors:   {errors:,} on send")
+    if rejected:
+        print(f"  ✗ Rejected: {rejected:,} invalid records not sent")
+    if sent - acked - failed:
+        print(f"  ⚠ No ack:   {sent - acked - failed:,} still unacknowledged after flush")
     print(f"  Duration:   {elapsed:.1f}s")
-    print(f"  Throughput: {sent/elapsed:.0f} msgs/sec")
+    print(f"  Throughput: {acked/elapsed:.0f} msgs/sec acknowledged")
+    latency = tracker.latency.summary()
+    print(f"  Latency:    p50 {latency['p50']:.1f} ms  p95 {latency['p95']:.1f} ms  "
+          f"p99 {latency['p99']:.1f} ms  max {latency['max']:.1f} ms  (send → ack)")
+    for p in sorted(set(tracker.acked) | set(tracker.failed),
+                    key=lambda p: (p is None, p if p is not None else 0)):
+        lost = f", {tracker.failed[p]:,} failed" if tracker.failed.get(p) else ""
+        print(f"    partition {partition_label(p):>3}: {tracker.acked.get(p, 0):>9,} acked{lost}")
+    balance = partition_balance(tracker, partitions)
+    if balance:
+        print(f"  Balance:    {balance['min']:,}–{balance['max']:,} records per partition, "
+              f"max/mean {balance['max_over_mean']:.2f}, stddev/mean "
+              f"{balance['stddev_over_mean']:.2f} (key {args.key})")
+    pinot = pinot_partition_config(args.key, partitions)
+    if pinot:
+        print(f"  Pinot:      segmentPartitionConfig {json.dumps(pinot)}")
+    if pacer and paced > 0:
+        target = schedule.total(paced)
+        print(f"  Pacing:     {sent + errors:,} sends vs {target:,.0f} scheduled "
+              f"({(sent + errors) / target - 1:+.2%})")
+
+    report = delivery_report(args, tracker, sent, errors, elapsed, reports, rejected, partitions)
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"  Report:     {os.path.abspath(args.report)}")
 
     print(f"\n═══ Kafka Production Complete ═══")
     print(f"  Topic: {args.topic}")
-    print(f"  Messages: {sent:,}")
+    print(f"  Messages: {acked:,}")
     print()
     print("  Pinot Pulse KafkaConsumer will process these events in real-time.")
     print("  Pipeline config: ingestion/kafka/transaction-events.yaml")
@@ -9,6 +9,7 @@ Usage:
   python3 load_postgres.py                          # Uses defaults
   python3 load_postgres.py --host localhost --port 5433
   python3 load_postgres.py --test                   # Connection test only
+  python3 load_postgres.py --delta datasets/delta-0001  # Apply one incremental cycle
 
 Login after loading:
   URL:      http://localhost:3000/auth
@@ -24,6 +25,119 @@ import uuid
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal
 
+from dataset_io import find_dataset, find_dataset_files, open_dataset
+
+
+def insert_account(cur, a):
+    cur.execute("""
+        INSERT INTO analytics.accounts (
+            id, organization_id, member_id, branch_id,
+            account_number, account_type, account_category, status,
+            is_primary, current_balance, available_balance,
+            interest_rate, interest_ytd,
+            opened_date, last_activity_date
+        ) VALUES (
+            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+            to_timestamp(%s::double precision / 1000),
+            to_timestamp(%s::double precision / 1000)
+        ) ON CONFLICT (id) DO NOTHING
+    """, (
+        a["account_id"], a["organization_id"],
+        a["member_id"], a.get("branch_id"),
+        a["account_number"], a["account_type"],
+        a.get("account_category"), a["status"],
+        a.get("is_primary", False),
+        a["current_balance"], a.get("available_balance"),
+        a.get("interest_rate"), a.get("ytd_interest"),
+        a.get("opened_date"), a.get("last_activity_date")
+    ))
+
+
+def insert_transaction(cur, t):
+    cur.execute("""
+        INSERT INTO analytics.transactions (
+            id, organization_id, member_id, account_id, branch_id,
+            transaction_type, channel, status,
+            description, merchant_name, merchant_category,
+            amount, balance_after, risk_score, is_suspicious,
+            transaction_date, timestamp
+        ) VALUES (
+            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+            %s, %s, %s, %s,
+            to_timestamp(%s::double precision / 1000),
+            to_timestamp(%s::double precision / 1000)
+        ) ON CONFLICT (id) DO NOTHING
+    """, (
+        t["transaction_id"], t["organization_id"],
+        t["member_id"], t.get("account_id"), t.get("branch_id"),
+        t["transaction_type"], t.get("channel"), t["status"],
+        t.get("description"), t.get("merchant_name"),
+        t.get("merchant_category"),
+        t["amount"], t.get("balance_after"),
+        t.get("risk_score"), t.get("is_suspicious", False),
+        t["timestamp"], t["timestamp"]
+    ))
+
+
+def iter_ndjson(path):
+    with open_dataset(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def load_delta(conn, cur, delta_dir):
+    """Apply one generate_datasets.py --delta cycle (datasets/delta-NNNN)."""
+    counts = {}
+
+    def apply(name, filename, fn):
+        paths = find_dataset_files(os.path.join(delta_dir, filename))
+        count = 0
+        for path in paths:
+            for record in iter_ndjson(path):
+                fn(record)
+                count += 1
+                if count % 1000 == 0:
+                    conn.commit()
+        conn.commit()
+        counts[name] = count
+        print(f"  ✓ {count} {name}" if paths else f"  ⚠ {filename} not in delta — skipped")
+
+    def update_account(u):
+        # Available balance follows the account type as in generate_accounts:
+        # deposits keep their hold, credit lines keep their share of the
+        # balance, loans have none (the SET expressions see the old row)
+        cur.execute("""
+            UPDATE analytics.accounts
+            SET current_balance = %s,
+                available_balance = CASE account_category
+                    WHEN 'deposit' THEN available_balance + %s
+                    WHEN 'credit' THEN CASE WHEN current_balance = 0 THEN available_balance
+                        ELSE round(available_balance * %s::numeric / current_balance, 2) END
+                    ELSE available_balance END,
+                last_activity_date = to_timestamp(%s::double precision / 1000)
+            WHERE id = %s
+        """, (u["current_balance"], u["balance_change"], u["current_balance"],
+              u["last_activity_date"], u["account_id"]))
+
+    def update_loan(u):
+        cur.execute("""
+            UPDATE analytics.loans
+            SET status = %s, days_past_due = %s, delinquency_status = %s,
+                current_balance = %s,
+                next_payment_date = to_timestamp(%s::double precision / 1000)
+            WHERE id = %s
+        """, (u["status"], u["days_past_due"], u.get("delinquency_status"),
+              u["current_balance"], u.get("next_payment_date"), u["loan_id"]))
+
+    apply("new accounts", "accounts.ndjson", lambda a: insert_account(cur, a))
+    apply("transactions", "transactions.jsonl", lambda t: insert_transaction(cur, t))
+    apply("account balance updates", "account_updates.ndjson", update_account)
+    apply("loan status transitions", "loan_updates.ndjson", update_loan)
+    return counts
+
+
 def main():
     parser = argparse.ArgumentParser(description="Load MCCU tenant data into PostgreSQL")
     parser.add_argument("--host", default=os.getenv("POSTGRES_HOST", "localhost"))
@@ -33,6 +147,8 @@ def main():
                         help="PostgreSQL password (or set POSTGRES_PASSWORD env var)")
     parser.add_argument("--database", default=os.getenv("POSTGRES_DB", "pinot_pulse"))
     parser.add_argument("--test", action="store_true", help="Connection test only")
+    parser.add_argument("--delta", metavar="DIR",
+                        help="Only apply a generate_datasets.py --delta cycle (e.g. datasets/delta-0001)")
     args = parser.parse_args()
 
     if not args.password:
@@ -119,6 +235,25 @@ def main():
         print("  Connection test passed.")
         return
 
+    if args.delta:
+        delta_dir = args.delta
+        if not os.path.isdir(delta_dir):
+            delta_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", args.delta)
+        if not os.path.isdir(delta_dir):
+            print(f"  ✗ Delta directory not found: {args.delta}")
+            sys.exit(1)
+        print(f"\n[2/2] Applying delta {os.path.basename(os.path.normpath(delta_dir))}...")
+        try:
+            load_delta(conn, cur, delta_dir)
+        except Exception as e:
+            conn.rollback()
+            print(f"\n  ✗ Error: {e}")
+            sys.exit(1)
+        finally:
+            conn.close()
+        print("\n═══ PostgreSQL Delta Applied ═══")
+        return
+
     try:
         # ─── Organization ───
         print("\n[2/8] Creating organization...")
@@ -188,11 +323,19 @@ def main():
         # ─── Members ───
         print("\n[6/8] Loading members...")
         script_dir = os.path.dirname(os.path.abspath(__file__))
-        members_file = os.path.join(script_dir, "..", "datasets", "members.json")
-        if not os.path.exists(members_file):
-            members_file = os.path.join(script_dir, "datasets", "members.json")
 
-        with open(members_file, "r") as f:
+        def dataset_file(name):
+            return find_dataset(os.path.join(script_dir, "..", "datasets", name),
+                                os.path.join(script_dir, "datasets", name))
+
+        def dataset_files(name):
+            # One file, or its partitions when written with --layout hive
+            return find_dataset_files(os.path.join(script_dir, "..", "datasets", name),
+                                      os.path.join(script_dir, "datasets", name))
+
+        members_file = dataset_file("members.json")
+
+        with open_dataset(members_file) as f:
             members = json.load(f)
 
         member_count = 0
@@ -233,41 +376,13 @@ def main():
 
         # ─── Accounts ───
         print("\n[7/8] Loading accounts...")
-        accounts_file = os.path.join(script_dir, "..", "datasets", "accounts.ndjson")
-        if not os.path.exists(accounts_file):
-            accounts_file = os.path.join(script_dir, "datasets", "accounts.ndjson")
-
         accounts = []
-        with open(accounts_file, "r") as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    accounts.append(json.loads(line))
+        for accounts_file in dataset_files("accounts.ndjson"):
+            accounts.extend(iter_ndjson(accounts_file))
 
         acct_count = 0
         for a in accounts:
-            cur.execute("""
-                INSERT INTO analytics.accounts (
-                    id, organization_id, member_id, branch_id,
-                    account_number, account_type, account_category, status,
-                    is_primary, current_balance, available_balance,
-                    interest_rate, interest_ytd,
-                    opened_date, last_activity_date
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                    to_timestamp(%s::double precision / 1000),
-                    to_timestamp(%s::double precision / 1000)
-                ) ON CONFLICT (id) DO NOTHING
-            """, (
-                a["account_id"], a["organization_id"],
-                a["member_id"], a.get("branch_id"),
-                a["account_number"], a["account_type"],
-                a.get("account_category"), a["status"],
-                a.get("is_primary", False),
-                a["current_balance"], a.get("available_balance"),
-                a.get("interest_rate"), a.get("ytd_interest"),
-                a.get("opened_date"), a.get("last_activity_date")
-            ))
+            insert_account(cur, a)
             acct_count += 1
             if acct_count % 200 == 0:
                 print(f"    Inserted {acct_count}/{len(accounts)} accounts...")
@@ -277,13 +392,11 @@ def main():
 
         # ─── Loans ───
         print("\n[8/13] Loading loans...")
-        loans_file = os.path.join(script_dir, "..", "datasets", "loans.json")
-        if not os.path.exists(loans_file):
-            loans_file = os.path.join(script_dir, "datasets", "loans.json")
+        loans_file = dataset_file("loans.json")
 
         loan_count = 0
-        if os.path.exists(loans_file):
-            with open(loans_file, "r") as f:
+        if loans_file:
+            with open_dataset(loans_file) as f:
                 loans = json.load(f)
 
             for ln in loans:
@@ -335,40 +448,10 @@ def main():
 
         # ─── Transactions ───
         print("\n[9/13] Loading transactions...")
-        txn_file = os.path.join(script_dir, "..", "datasets", "transactions.jsonl")
-        if not os.path.exists(txn_file):
-            txn_file = os.path.join(script_dir, "datasets", "transactions.jsonl")
-
         txn_count = 0
-        with open(txn_file, "r") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                t = json.loads(line)
-                cur.execute("""
-                    INSERT INTO analytics.transactions (
-                        id, organization_id, member_id, account_id, branch_id,
-                        transaction_type, channel, status,
-                        description, merchant_name, merchant_category,
-                        amount, balance_after, risk_score, is_suspicious,
-                        transaction_date, timestamp
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                        %s, %s, %s, %s,
-                        to_timestamp(%s::double precision / 1000),
-                        to_timestamp(%s::double precision / 1000)
-                    ) ON CONFLICT (id) DO NOTHING
-                """, (
-                    t["transaction_id"], t["organization_id"],
-                    t["member_id"], t.get("account_id"), t.get("branch_id"),
-                    t["transaction_type"], t.get("channel"), t["status"],
-                    t.get("description"), t.get("merchant_name"),
-                    t.get("merchant_category"),
-                    t["amount"], t.get("balance_after"),
-                    t.get("risk_score"), t.get("is_suspicious", False),
-                    t["timestamp"], t["timestamp"]
-                ))
+        for txn_file in dataset_files("transactions.jsonl"):
+            for txn in iter_ndjson(txn_file):
+                insert_transaction(cur, txn)
                 txn_count += 1
                 if txn_count % 1000 == 0:
                     print(f"    Inserted {txn_count} transactions...")
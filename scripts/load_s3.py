@@ -21,6 +21,8 @@ import os
 import sys
 import time
 
+from dataset_io import content_type, find_dataset
+
 def main():
     parser = argparse.ArgumentParser(description="Upload members dataset to S3")
     parser.add_argument("--bucket", default=os.getenv("S3_BUCKET", "pinot-pulse-data"))
@@ -115,15 +117,19 @@ def main():
 
     uploaded = 0
     for local_path, s3_key in files_to_upload:
-        if not os.path.exists(local_path):
+        found = find_dataset(local_path)
+        if not found:
             print(f"  ⚠ Skipping {local_path} (not found)")
             continue
+        # Compressed datasets (.gz / .zst) are uploaded as-is under the same suffix
+        s3_key += found[len(local_path):]
+        local_path = found
         size = os.path.getsize(local_path)
         print(f"  Uploading {s3_key} ({size:,} bytes)...", end=" ")
         start = time.time()
         s3.upload_file(
             local_path, args.bucket, s3_key,
-            ExtraArgs={"ContentType": "text/csv" if s3_key.endswith(".csv") else "application/json"}
+            ExtraArgs={"ContentType": content_type(s3_key)}
         )
         elapsed = time.time() - start
         print(f"✓ ({elapsed:.1f}s)")
@@ -0,0 +1,6 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# generate_datasets.py sits at the top level, the loaders (and dataset_io) in scripts/
+sys.path[:0] = [ROOT, os.path.join(ROOT, "scripts")]
@@ -0,0 +1,512 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import generate_datasets as gen
+from dataset_io import open_dataset, read_ndjson
+from generate_datasets import DAY_MS, SECOND_MS
+
+
+# ─── split_window ───
+
+WINDOW = (gen.NOW_MS - 7 * DAY_MS, gen.NOW_MS)
+
+
+@pytest.mark.parametrize("pieces", [1, 7, 64])
+def test_split_window_slices_are_contiguous_and_add_up(pieces):
+    slices = gen.split_window(np.random.default_rng(1), WINDOW, 100_000, pieces)
+    assert len(slices) == pieces
+    assert slices[0][0][0] == WINDOW[0] and slices[-1][0][1] == WINDOW[1]
+    # Whole seconds apart, with no gap or overlap between slices
+    for ((_, end), _), ((start, _), _) in zip(slices, slices[1:]):
+        assert start == end + SECOND_MS
+    assert sum(count for _, count in slices) == 100_000
+
+
+def test_split_window_never_cuts_below_a_second():
+    slices = gen.split_window(np.random.default_rng(1), (0, 9 * SECOND_MS), 50, 100)
+    assert [window for window, _ in slices] == [(k * SECOND_MS, k * SECOND_MS) for k in range(10)]
+
+
+def test_split_window_counts_follow_slice_lengths():
+    n, pieces = 1_000_000, 10
+    slices = gen.split_window(np.random.default_rng(2), WINDOW, n, pieces)
+    seconds = (WINDOW[1] - WINDOW[0]) // SECOND_MS + 1
+    for (start, end), count in slices:
+        p = ((end - start) // SECOND_MS + 1) / seconds
+        assert abs(count - n * p) < 5 * np.sqrt(n * p * (1 - p))
+
+
+def test_split_window_counts_follow_the_load_profile():
+    # One local day of the diurnal profile, one slice per hour
+    profile = gen.LOAD_PROFILES["diurnal"]
+    start = gen.NOW_MS // DAY_MS * DAY_MS - round(profile["utc_offset_hours"] * 3_600_000)
+    window = (start, start + DAY_MS - SECOND_MS)
+    n = 1_000_000
+    slices = gen.split_window(np.random.default_rng(3), window, n, 24, profile)
+    weights = gen.profile_weights(profile, np.array([s for (s, _), _ in slices]))
+    for (_, count), p in zip(slices, weights / weights.sum()):
+        assert abs(count - n * p) < 5 * np.sqrt(n * p * (1 - p))
+
+
+def test_split_window_is_seeded():
+    a = gen.split_window(np.random.default_rng(9), WINDOW, 5000, 16)
+    b = gen.split_window(np.random.default_rng(9), WINDOW, 5000, 16)
+    assert a == b
+
+
+# ─── Ledger ───
+
+def running_balances(opening, aidx, amount, status):
+    """balance_after, one transaction at a time."""
+    cents = dict(opening)
+    out = []
+    for a, x, s in zip(aidx.tolist(), amount.tolist(), status.tolist()):
+        if s == "completed":
+            cents[a] = cents.get(a, 0) + round(x * 100)
+        out.append(cents.get(a, 0) / 100)
+    return out, cents
+
+
+def random_postings(rng, n, n_accounts):
+    aidx = rng.integers(0, n_accounts, n)
+    amount = np.round(rng.uniform(-500, 500, n), 2)
+    status = rng.choice(np.array(["completed", "pending", "failed"]), n, p=[0.9, 0.07, 0.03])
+    return aidx, amount, status
+
+
+def test_ledger_post_is_a_grouped_running_sum(tmp_path):
+    rng = np.random.default_rng(4)
+    ledger = gen.Ledger("sum", str(tmp_path), 0, 50)
+    cents = {}
+    for n in (1, 1000, 5000):  # balances carry over from batch to batch
+        aidx, amount, status = random_postings(rng, n, 50)
+        expected, cents = running_balances(cents, aidx, amount, status)
+        assert ledger.post(aidx, amount, status).tolist() == expected
+    assert ledger.cents.tolist() == [cents.get(a, 0) for a in range(50)]
+
+
+def test_ledger_post_pass_starts_from_the_saved_balances(tmp_path):
+    rng = np.random.default_rng(5)
+    first = gen.Ledger("sum", str(tmp_path), 3, 20)
+    first.post(*random_postings(rng, 500, 10))  # touches accounts 0-9 only
+    first.close()
+    second = gen.Ledger("post", str(tmp_path), 3, 20)
+    assert second.cents.tolist() == first.cents.tolist()
+    aidx, amount, status = random_postings(rng, 500, 20)
+    expected, _ = running_balances(dict(enumerate(first.cents.tolist())), aidx, amount, status)
+    assert second.post(aidx, amount, status).tolist() == expected
+
+
+def member_parents(n=200, seed=0):
+    members = gen.generate_members(np.random.default_rng(seed), n)
+    members = {name: col.astype("S") if name.endswith("_id") else col
+               for name, col in members.items()}
+    return gen.member_index(members)
+
+
+def test_ledger_accounts_derive_available_balance_and_interest_from_it():
+    parents = member_parents()
+    n = 2000
+    closing = np.round(np.random.default_rng(1).uniform(-5000, 300000, n), 2)
+    opts = gen.default_opts()
+    blocks = gen.iter_blocks("accounts", 5, 0, dict(parents, ledger_balance=closing), (0, n), opts)
+    accounts = gen.concat([batch for _, batch in blocks])
+    bal, avail = accounts["current_balance"], accounts["available_balance"]
+    cat = accounts["account_category"]
+    assert bal.tolist() == closing.tolist()
+    # The per-type hold/credit offset, applied to the ledger balance
+    hold = avail[cat == "deposit"] / bal[cat == "deposit"]
+    assert ((hold > 0.85 - 1e-4) & (hold < 1 + 1e-4)).all()
+    credit = avail[cat == "credit"] / bal[cat == "credit"]
+    assert ((credit > -1e-4) & (credit < 0.3 + 1e-4)).all()
+    assert (avail[cat == "loan"] == 0).all()
+    accrual = accounts["ytd_interest"] / (bal * accounts["interest_rate"] / 100)
+    assert ((accrual > 0.1 - 1e-3) & (accrual < 0.8 + 1e-3)).all()
+
+
+
+# ─── Column stats ───
+
+def distinct_ids(n, seed=0):
+    return gen.uuid4s(np.random.default_rng(seed), n)
+
+
+def test_hash64_does_not_depend_on_column_width():
+    values = np.array(["a", "bc", "def", "credit union"])
+    wide = values.astype("U40")
+    assert gen.hash64(values).tolist() == gen.hash64(wide).tolist()
+    assert len(set(gen.hash64(values).tolist())) == len(values)
+
+
+def test_column_stats_are_exact_for_categories():
+    stats = gen.ColumnStats()
+    values = np.array(["b", "a", "c", "a", "b", "a"])
+    for batch in (values[:2], values[2:]):
+        stats.update(batch)
+    summary = stats.summary()
+    assert summary["distinct"] == 3 and summary["distinct_exact"]
+    assert summary["categories"] == {"a": 3, "b": 2, "c": 1}
+
+
+def test_column_stats_numeric_range_and_nulls():
+    stats = gen.ColumnStats()
+    stats.update(gen.nullable(np.array([3.5, 1.0, 9.25, 2.0]), np.array([True, False, True, True])))
+    summary = stats.summary()
+    assert (summary["count"], summary["nulls"]) == (3, 1)
+    assert (summary["min"], summary["max"], summary["sum"]) == (2.0, 9.25, 14.75)
+
+
+@pytest.mark.parametrize("n", [gen.CATEGORY_LIMIT + 1, 5_000, 200_000])
+def test_hyperloglog_estimate(n):
+    stats = gen.ColumnStats()
+    ids = distinct_ids(n)
+    for start in range(0, n, 50_000):
+        stats.update(np.concatenate([ids[start:start + 50_000]] * 2))  # every id twice
+    summary = stats.summary()
+    assert not summary["distinct_exact"]
+    # ~0.8% standard error at 2^14 registers
+    assert summary["distinct"] == pytest.approx(n, rel=0.03)
+
+
+def test_hyperloglog_merge_matches_one_pass():
+    ids = distinct_ids(100_000, seed=1)
+    whole, shards = gen.ColumnStats(), [gen.ColumnStats() for _ in range(4)]
+    whole.update(ids)
+    for k, shard in enumerate(shards):
+        shard.update(ids[k::4])
+    merged = shards[0]
+    for shard in shards[1:]:
+        merged.merge(shard)
+    assert merged.registers.tolist() == whole.registers.tolist()
+    assert merged.distinct() == whole.distinct()
+
+
+def test_categories_overflow_into_the_sketch_on_merge():
+    a, b = gen.ColumnStats(), gen.ColumnStats()
+    a.update(np.arange(100))
+    b.update(np.arange(50, 150))
+    a.merge(b)
+    assert a.categories is None
+    assert a.distinct() == pytest.approx(150, abs=3)
+
+
+# ─── Kafka partitions (key report) ───
+
+# murmur2 of these keys in Kafka's own tests (Utils.murmur2, as signed Java ints)
+KAFKA_MURMUR2 = {
+    "": 275646681,
+    "21": -973932308,
+    "foobar": -790332482,
+    "a-little-bit-long-string": -985981536,
+    "a-little-bit-longer-string": -1486304829,
+    "lkjh234lh9fiuh90y23oiuhsafujhadof229phr9h19h89h8": -58897971,
+    "abc": 479470107,
+}
+
+
+def test_murmur2_matches_kafka():
+    keys = list(KAFKA_MURMUR2)
+    assert gen.murmur2(keys).tolist() == [h & 0xffffffff for h in KAFKA_MURMUR2.values()]
+    assert gen.kafka_partition(keys, 12).tolist() == [
+        (h & 0x7fffffff) % 12 for h in KAFKA_MURMUR2.values()]
+
+
+def test_murmur2_matches_the_producer_for_generated_ids():
+    murmur2 = pytest.importorskip("kafka.partitioner.default").murmur2
+    ids = gen.uuid4s(np.random.default_rng(6), 1000)
+    assert gen.murmur2(ids).tolist() == [murmur2(i.encode()) for i in ids.tolist()]
+
+
+# ─── Schema-driven tables ───
+
+def test_generated_table_follows_its_pinot_schema_and_parents():
+    blocks = gen.iter_blocks("accounts", 5, 0, member_parents(), (0, 300), gen.default_opts())
+    accounts = gen.concat([batch for _, batch in blocks])
+    cards = gen.generate_table(np.random.default_rng(2), "cards", 600,
+                               parents=gen.account_index(accounts))
+    fields = gen.load_pinot_fields("cards")
+    assert list(cards) == [name for name, _, _ in fields]
+    for name, data_type, _ in fields:
+        values = np.array([v for v in cards[name].tolist() if v is not None])
+        kind = np.dtype(gen.PINOT_NUMPY_TYPES[data_type]).kind
+        assert len(values) and values.dtype.kind == kind, name
+    # Foreign keys are copied from one active parent row
+    parent = {a: (m, b, s) for a, m, b, s in zip(*(accounts[c].tolist() for c in (
+        "account_id", "member_id", "branch_id", "status")))}
+    for account, member, branch in zip(cards["account_id"], cards["member_id"], cards["branch_id"]):
+        assert parent[account] == (member, branch, "active")
+
+
+# ─── Writers ───
+
+def test_compact_json_lines_match_json_dumps():
+    batch = {
+        "id": gen.uuid4s(np.random.default_rng(8), 4),
+        "n": np.array([0, -7, 2**62, 15]),
+        "x": np.array([0.1, 1e16, -2.5, 1e-7]),
+        "nan": np.array([np.nan, np.inf, 1.0, -np.inf]),
+        "flag": np.array([True, False, False, True]),
+        "text": np.array(['plain', 'quote " and \\ slash', "caf\u00e9", "tab\there"]),
+        "maybe": gen.nullable(np.array([1.5, 2.0, 3.0, 4.0]), np.array([True, False, True, False])),
+        "100%": np.array(["a", "b", "c", "d"]),
+    }
+    expected = [json.dumps(record).encode() for record in gen.iter_records(batch)]
+    assert gen.compact_json_lines(batch) == expected
+
+
+def test_uuid4s_are_version_4_rfc_4122_strings():
+    ids = gen.uuid4s(np.random.default_rng(3), 1000)
+    assert ids.dtype == np.dtype("U36") and len(set(ids.tolist())) == 1000
+    for s in ids.tolist():
+        u = uuid.UUID(s)
+        assert str(u) == s  # lowercase, 8-4-4-4-12
+        assert u.version == 4 and u.variant == uuid.RFC_4122
+
+
+def test_uuid4s_match_uuid_over_the_same_bytes():
+    raw = np.random.default_rng(4).bytes(16 * 50)
+    expected = [str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, len(raw), 16)]
+    assert gen.uuid4s(np.random.default_rng(4), 50).tolist() == expected
+
+
+def test_uuid4s_are_seeded():
+    def ids(seed):
+        return gen.uuid4s(np.random.default_rng(seed), 100).tolist()
+    assert ids(5) == ids(5)
+    assert not set(ids(5)) & set(ids(6))
+
+
+def test_ascii_str_matches_astype():
+    ids = gen.uuid4s(np.random.default_rng(9), 100).astype("S")
+    assert gen.ascii_str(ids).tolist() == ids.astype(str).tolist()
+    short = np.array([b"a", b"", b"abc"])
+    assert gen.ascii_str(short[::2]).tolist() == ["a", "abc"]
+
+
+@pytest.fixture(params=["gzip", "zstd"])
+def codec(request):
+    if request.param == "zstd":
+        pytest.importorskip("zstandard")
+    return request.param
+
+
+def test_block_writer_output_reads_back_unchanged(tmp_path, codec):
+    records = [{"i": i, "pad": "x" * (i % 300)} for i in range(5000)]
+    data = b"".join(json.dumps(r).encode() + b"\n" for r in records)
+    path = str(tmp_path / f"records.ndjson{gen.COMPRESSION_SUFFIXES[codec]}")
+    opts = gen.default_opts(compress=codec, compress_level=gen.DEFAULT_COMPRESS_LEVELS[codec],
+                            compress_block_size=4096, compress_threads=4)
+    with ThreadPoolExecutor(4) as pool:
+        out = gen.BlockWriter(path, opts, pool)
+        # Writes that straddle block and line boundaries
+        for off in range(0, len(data), 1000):
+            out.write(data[off:off + 1000])
+        out.close()
+    with open_dataset(path, "rb") as f:
+        assert f.read() == data
+    assert list(read_ndjson([path], read_ahead=1000)) == records
+
+
+# ─── Cache ───
+
+def cache_key(**overrides):
+    return gen.config_hash(7, 0.1, 4, {"members": 1000}, gen.default_opts(**overrides))
+
+
+def test_config_hash_ignores_throughput_options():
+    assert cache_key() == cache_key(batch_size=123, compress_threads=17)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"compress": "gzip"}, {"compact_json": True}, {"row_group_size": 10_000},
+    {"compress_block_size": 1 << 16}, {"layout": "hive"}, {"column_stats": True},
+])
+def test_config_hash_follows_output_options(overrides):
+    assert cache_key() != cache_key(**overrides)
+
+
+# ─── Segments ───
+
+def test_segments_merge_sorted_shard_spills(tmp_path):
+    opts = gen.default_opts(segments={"bucket": "year", "size": 1 << 20})
+    members = []
+    for shard in range(3):
+        batch = gen.generate_members(np.random.default_rng(shard), 500, start=500 * shard)
+        spill = gen.SegmentSpill(str(tmp_path), "members", shard, opts)
+        for off in (0, 250):
+            part = gen.take(batch, slice(off, off + 250))
+            spill.write(part, gen.compact_json_lines(part))
+        spill.close()
+        members.extend(gen.iter_records(batch))
+    checksums = gen.build_segments(str(tmp_path), str(tmp_path), "members", range(3), 1, opts)
+
+    rows = []
+    for path in checksums:
+        with open(tmp_path / path) as f:
+            ids = [json.loads(line)["member_id"] for line in f]
+        assert ids == sorted(ids)
+        rows.extend(ids)
+    assert sorted(rows) == sorted(m["member_id"] for m in members)
+
+
+# ─── End to end ───
+
+@pytest.fixture
+def sandbox(tmp_path):
+    """A tree whose datasets/ lands in tmp_path: the generator writes beside itself."""
+    root = os.path.dirname(os.path.abspath(gen.__file__))
+    for name in ("generate_datasets.py", "scripts"):
+        (tmp_path / name).symlink_to(os.path.join(root, name))
+    return tmp_path
+
+
+def run_generator(sandbox, *args):
+    result = subprocess.run([sys.executable, str(sandbox / "generate_datasets.py"), *args],
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return sandbox / "datasets"
+
+
+def file_hashes(ds_dir):
+    """sha256 of every output file but metadata.json (timings) and .state/."""
+    hashes = {}
+    for dirpath, dirnames, filenames in os.walk(ds_dir):
+        dirnames[:] = [d for d in dirnames if d != ".state"]
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if name != "metadata.json":
+                with open(path, "rb") as f:
+                    hashes[os.path.relpath(path, ds_dir)] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def test_output_does_not_depend_on_workers_or_batch_size(sandbox):
+    pytest.importorskip("pyarrow")
+    # 40k transactions: shards of 13,333 span two RNG blocks and 1-14 batches
+    hashes = {}
+    for workers, batch_size in [(1, 10000), (4, 10000), (1, 1000), (4, 1000)]:
+        ds_dir = run_generator(sandbox, "--seed", "11", "--scale", "8", "--shards", "3",
+                               "--workers", str(workers), "--batch-size", str(batch_size),
+                               "--formats", "csv,json,ndjson,parquet", "--force")
+        hashes[workers, batch_size] = file_hashes(ds_dir)
+    first = hashes[1, 10000]
+    assert "transactions.parquet" in first and "members.csv" in first
+    for run in hashes.values():
+        assert run == first
+
+
+def test_compressed_runs_read_back_like_uncompressed(sandbox, codec):
+    args = ["--seed", "12", "--scale", "4", "--shards", "2", "--workers", "2",
+            "--formats", "ndjson", "--compress-threads", "3", "--compress-block-size", "8192"]
+    plain = list(read_ndjson([str(run_generator(sandbox, *args) / "transactions.jsonl")]))
+    ds_dir = run_generator(sandbox, *args, "--compress", codec)
+    path = str(ds_dir / f"transactions.jsonl{gen.COMPRESSION_SUFFIXES[codec]}")
+    assert list(read_ndjson([path], read_ahead=700)) == plain
+    assert len(plain) == 20000
+
+
+def read_records(path):
+    return list(read_ndjson([str(path)])) if path.exists() else []
+
+
+def test_delta_cycles_continue_from_the_saved_state(sandbox):
+    ds_dir = run_generator(sandbox, "--seed", "14", "--scale", "4", "--shards", "2",
+                           "--formats", "ndjson")
+    base = json.loads((ds_dir / "metadata.json").read_text())
+    balances = {a["account_id"]: a["current_balance"]
+                for a in read_records(ds_dir / "accounts.ndjson")}
+    statuses = {loan["loan_id"]: loan["status"] for loan in read_records(ds_dir / "loans.ndjson")}
+    hour_ms = 3600 * SECOND_MS
+
+    watermark = base["watermark"]
+    for cycle in (1, 2):
+        run_generator(sandbox, "--delta", "--delta-hours", "120")
+        meta = json.loads((ds_dir / "metadata.json").read_text())
+        assert meta["watermark"] == watermark + 120 * hour_ms
+        assert meta["deltas"][-1]["window"] == [watermark + SECOND_MS, meta["watermark"]]
+        delta = ds_dir / f"delta-{cycle:04d}"
+
+        # New accounts get new ids and open inside the window
+        for account in read_records(delta / "accounts.ndjson"):
+            assert account["account_id"] not in balances
+            assert watermark < account["opened_date"] <= meta["watermark"]
+            balances[account["account_id"]] = account["current_balance"]
+        txns = read_records(delta / "transactions.jsonl")
+        assert txns and all(watermark < t["timestamp"] <= meta["watermark"] for t in txns)
+        net = {}
+        for t in txns:
+            assert t["account_id"] in balances
+            if t["status"] == "completed":
+                net[t["account_id"]] = net.get(t["account_id"], 0) + t["amount"]
+
+        # Updates touch only known ids and chain on from the balances and statuses
+        # the previous cycle left in .state
+        updates = read_records(delta / "account_updates.ndjson")
+        assert {u["account_id"] for u in updates} == set(net)
+        for u in updates:
+            assert u["balance_change"] == pytest.approx(net[u["account_id"]], abs=0.01)
+            assert u["current_balance"] == pytest.approx(
+                balances[u["account_id"]] + u["balance_change"], abs=0.01)
+            balances[u["account_id"]] = u["current_balance"]
+        loan_updates = read_records(delta / "loan_updates.ndjson")
+        assert loan_updates
+        for u in loan_updates:
+            assert u["previous_status"] == statuses[u["loan_id"]]
+            assert u["status"] in dict(gen.LOAN_TRANSITIONS[u["previous_status"]])
+            statuses[u["loan_id"]] = u["status"]
+        watermark = meta["watermark"]
+    assert (ds_dir / ".state" / "accounts.npz").exists()
+
+
+def test_columnar_output_matches_the_pinot_schemas(sandbox):
+    pq = pytest.importorskip("pyarrow.parquet")
+    ds_dir = run_generator(sandbox, "--seed", "15", "--scale", "2", "--tables", "cards",
+                           "--formats", "ndjson,parquet")
+    for dataset in ("members", "accounts", "loans", "transactions", "cards"):
+        schema = pq.read_schema(ds_dir / f"{dataset}.parquet")
+        expected = {name: gen.PINOT_ARROW_TYPES[data_type]
+                    for name, data_type, _ in gen.load_pinot_fields(dataset)}
+        assert {field.name: str(field.type) for field in schema} == expected, dataset
+    account_ids = {a["account_id"] for a in read_records(ds_dir / "accounts.ndjson")}
+    cards = read_records(ds_dir / "cards.ndjson")
+    assert len(cards) == 2 * gen.load_table_spec("cards")["rows"]
+    assert {card["account_id"] for card in cards} <= account_ids
+
+
+def test_hive_layout_partitions_every_row_once(sandbox):
+    from dataset_io import find_dataset_files, find_partitions, partition_keys
+
+    args = ["--seed", "16", "--scale", "2", "--shards", "2", "--formats", "ndjson"]
+    ds_dir = run_generator(sandbox, *args)
+    flat = {name: read_records(ds_dir / name) for name in ("transactions.jsonl", "accounts.ndjson")}
+    run_generator(sandbox, *args, "--layout", "hive", "--compress", "gzip")
+
+    for (name, rows), time_column, key in zip(flat.items(), ("timestamp", "opened_date"),
+                                              ("transaction_id", "account_id")):
+        assert not (ds_dir / name).exists()
+        paths = find_dataset_files(str(ds_dir / name))
+        assert len(paths) > gen.MAX_OPEN_PARTITIONS  # partition writers were evicted and reopened
+        seen = []
+        for path in paths:
+            parts = os.path.relpath(path, ds_dir).split(os.sep)
+            assert parts[0] == name.split(".")[0] and parts[-1] == name + ".gz"
+            assert [p.split("=")[0] for p in parts[1:-1]] == ["org", "date"]
+            keys = partition_keys(path)
+            for row in read_ndjson([path]):
+                assert row["organization_id"] == keys["org"]
+                day = np.datetime64(row[time_column], "ms").astype("datetime64[D]")
+                assert str(day) == keys["date"]
+                seen.append(row)
+        assert sorted(seen, key=lambda r: r[key]) == sorted(rows, key=lambda r: r[key])
+
+        month = partition_keys(paths[0])["date"][:7]
+        some = find_partitions(str(ds_dir / name), pattern=f"date={month}-*")
+        assert some == [p for p in paths if partition_keys(p)["date"].startswith(month)]
@@ -0,0 +1,363 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+
+import pytest
+
+import load_kafka
+from load_kafka import (ConstantRate, DeliveryTracker, LatencyHistogram, MessageKey, Partitioner,
+                        RampRate, RawRecords, SineRate, StepRate, TokenBucket, check_record,
+                        parse_key, parse_schedule, partition_index, produce_parallel)
+
+
+# ─── Rate schedules ───
+
+def integrate(schedule, t, steps=100_000):
+    dt = t / steps
+    return sum(schedule.rate((i + 0.5) * dt) for i in range(steps)) * dt
+
+
+@pytest.mark.parametrize("schedule", [
+    ConstantRate(250),
+    RampRate(1000, 5000, 10),
+    RampRate(5000, 0, 4),
+    StepRate(2, [100, 400, 50]),
+    SineRate(1000, 600, 3),
+])
+@pytest.mark.parametrize("t", [0.5, 3.7, 12.0])
+def test_total_is_the_integral_of_rate(schedule, t):
+    assert schedule.total(t) == pytest.approx(integrate(schedule, t), rel=1e-3, abs=1e-6)
+
+
+def test_ramp_holds_its_end_rate():
+    ramp = RampRate(100, 300, 10)
+    assert ramp.rate(0) == 100
+    assert ramp.rate(5) == 200
+    assert ramp.rate(60) == 300
+    assert ramp.peak == 300
+
+
+def test_step_holds_its_last_rate():
+    step = StepRate(5, [10, 20, 30])
+    assert [step.rate(t) for t in (0, 4.9, 5, 14.9, 100)] == [10, 10, 20, 30, 30]
+    assert step.total(15) == 10 * 5 + 20 * 5 + 30 * 5
+
+
+def test_sine_peaks_a_quarter_period_in():
+    sine = SineRate(1000, 500, 8)
+    assert sine.rate(2) == pytest.approx(1500)
+    assert sine.rate(6) == pytest.approx(500)
+    assert sine.total(8) == pytest.approx(8000)
+
+
+def test_parse_schedule():
+    assert isinstance(parse_schedule("ramp:1000:50000:60"), RampRate)
+    assert parse_schedule("step:10:100,200").rates == [100, 200]
+    assert parse_schedule("sine:100:50:30").period == 30
+
+
+@pytest.mark.parametrize("spec", ["ramp:1:2", "step:0:100", "sine:100:200:10", "ramp:0:0:5",
+                                  "square:1:2:3", "step:5:a,b"])
+def test_parse_schedule_rejects(spec):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_schedule(spec)
+
+
+# ─── TokenBucket ───
+
+class FakeClock:
+    """time.monotonic/time.sleep stand-ins. Sleeping advances the clock, and
+    like a real sleep it overshoots a little."""
+    OVERSHOOT = 0.0001
+
+    def __init__(self):
+        self.now, self.sleeps = 1000.0, 0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps += 1
+        self.now += seconds + self.OVERSHOOT
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(load_kafka.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(load_kafka.time, "sleep", clock.sleep)
+    return clock
+
+
+@pytest.mark.parametrize("rate", [50, 1000, 200_000])
+def test_token_bucket_holds_a_constant_rate(clock, rate):
+    bucket = TokenBucket(ConstantRate(rate))
+    n = rate * 2
+    for _ in range(n):
+        bucket.acquire()
+    # The first message goes at once; the other n - 1 are paced
+    assert (n - 1) / bucket.elapsed() == pytest.approx(rate, rel=0.01)
+
+
+def test_token_bucket_sleeps_per_quantum_at_high_rates(clock):
+    bucket = TokenBucket(ConstantRate(100_000))
+    for _ in range(100_000):
+        bucket.acquire()
+    # About one sleep per 5 ms of messages, not one per message
+    assert clock.sleeps <= 1.1 / TokenBucket.QUANTUM_SECONDS
+
+
+def test_token_bucket_follows_a_ramp(clock):
+    ramp = RampRate(1000, 3000, 4)
+    bucket = TokenBucket(ramp)
+    n = int(ramp.total(4))
+    for _ in range(n):
+        bucket.acquire()
+    assert bucket.elapsed() == pytest.approx(4, rel=0.01)
+
+
+def test_token_bucket_caps_the_catch_up_after_a_stall(clock):
+    bucket = TokenBucket(ConstantRate(1000), burst_seconds=0.1)
+    bucket.acquire()
+    clock.now += 10  # a 10 s stall owes 10,000 messages; the bucket holds 100
+    start = clock.now
+    for _ in range(100):
+        bucket.acquire()
+    assert clock.now == start
+    bucket.acquire()
+    assert clock.now > start
+
+
+# ─── LatencyHistogram ───
+
+def exact_percentile(values, q):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(q / 100 * len(ordered))) - 1]
+
+
+def test_histogram_buckets_are_contiguous():
+    # Bucket b holds exactly the values after upper(b - 1), up to upper(b)
+    for value in range(1, 1 << 20):
+        b = LatencyHistogram.bucket(value)
+        assert LatencyHistogram.upper(b - 1) < value <= LatencyHistogram.upper(b)
+
+
+def test_histogram_is_exact_below_128_us():
+    h = LatencyHistogram()
+    for value in range(100):
+        h.record(value)
+    assert [h.percentile(q) for q in (1, 50, 99, 100)] == [0, 49, 98, 99]
+
+
+@pytest.mark.parametrize("q", [50, 95, 99, 99.9])
+def test_histogram_percentiles_within_bucket_precision(q):
+    rng = random.Random(q)
+    values = [int(rng.lognormvariate(8, 1.5)) for _ in range(50_000)]
+    h = LatencyHistogram()
+    for value in values:
+        h.record(value)
+    exact = exact_percentile(values, q)
+    # Reported as the bucket's upper bound: never low, at most 1/64 high
+    assert exact <= h.percentile(q) <= exact * (1 + 1 / LatencyHistogram.SUB_BUCKETS)
+    assert h.percentile(100) == max(values)
+
+
+def test_histogram_merge_matches_one_histogram():
+    rng = random.Random(7)
+    values = [rng.randrange(10_000_000) for _ in range(10_000)]
+    whole, a, b = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for i, value in enumerate(values):
+        whole.record(value)
+        (a if i % 3 else b).record(value)
+    a.merge(LatencyHistogram(b.counts, b.max))
+    assert a.counts == whole.counts and a.max == whole.max
+    assert a.summary() == whole.summary()
+
+
+def test_empty_histogram():
+    assert LatencyHistogram().percentile(99) == 0
+    assert LatencyHistogram().summary()["max"] == 0
+
+
+class FakeFuture:
+    def __init__(self):
+        self.callbacks, self.errbacks = [], []
+
+    def add_callback(self, fn, *args):
+        self.callbacks.append((fn, args))
+
+    def add_errback(self, fn, *args):
+        self.errbacks.append((fn, args))
+
+
+def test_delivery_latency_counts_from_before_send():
+    tracker = DeliveryTracker()
+    future = FakeFuture()
+    # send() blocked on a full buffer for a second before returning the future
+    tracker.track(future, time.perf_counter() - 1.0, partition=3)
+    for fn, args in future.callbacks:
+        fn(*args, argparse.Namespace(partition=3))
+    assert tracker.acked == {3: 1}
+    assert tracker.latency.max >= 1e6
+
+
+# ─── Raw records ───
+
+def transaction(**fields):
+    record = {"transaction_id": "t-1", "organization_id": "org-1", "member_id": "m-1",
+              "account_id": "a-1", "amount": 12.5, "timestamp": 1700000000000}
+    record.update(fields)
+    return json.dumps(record).encode()
+
+
+def test_raw_records_pass_lines_through_unchanged():
+    lines = [transaction(transaction_id=f"t-{i}", amount=i / 3) for i in range(5)]
+    pairs = list(RawRecords(lines, MessageKey(["transaction_id"])))
+    assert pairs == [(f"t-{i}", line) for i, line in enumerate(lines)]
+
+
+def test_raw_records_validate_skips_and_counts_bad_lines(capsys):
+    lines = [transaction(), b"{not json", transaction(amount=None), transaction(account_id="a-2"),
+             b'{"transaction_id": "t-9"}']
+    records = RawRecords(lines, MessageKey(["account_id"]), validate=True)
+    assert [key for key, _ in records] == ["a-1", "a-2"]
+    assert records.rejected == 3
+    assert "missing amount" in capsys.readouterr().out
+
+
+def test_raw_records_without_validate_send_everything():
+    lines = [transaction(), transaction(amount=None)]
+    records = RawRecords(lines, MessageKey(["transaction_id"]))
+    assert len(list(records)) == 2 and records.rejected == 0
+
+
+def test_check_record():
+    assert check_record(transaction()) is None
+    assert check_record(b"[1, 2").startswith("invalid JSON")
+    assert check_record(transaction(member_id=None, timestamp=None)) == "missing member_id, timestamp"
+
+
+# ─── Keys and partitions ───
+
+# murmur2 of these keys in Kafka's own tests (Utils.murmur2, as signed Java ints)
+KAFKA_MURMUR2 = {
+    "21": -973932308,
+    "foobar": -790332482,
+    "a-little-bit-long-string": -985981536,
+    "a-little-bit-longer-string": -1486304829,
+    "lkjh234lh9fiuh90y23oiuhsafujhadof229phr9h19h89h8": -58897971,
+    "abc": 479470107,
+}
+
+
+# partition_index hashes with kafka-python's murmur2
+needs_kafka = pytest.mark.skipif(load_kafka.murmur2 is None, reason="kafka-python not installed")
+
+
+@needs_kafka
+@pytest.mark.parametrize("key,hashed", KAFKA_MURMUR2.items())
+def test_partition_index_matches_kafka(key, hashed):
+    for n in (1, 3, 6, 12, 64):
+        assert partition_index(key, n) == (hashed & 0x7fffffff) % n
+
+
+@needs_kafka
+def test_partitioner_keyed_unkeyed_and_unknown():
+    partitioner = Partitioner([5, 3, 4])  # metadata order; indexes are over the sorted ids
+    assert partitioner("foobar") == [3, 4, 5][(KAFKA_MURMUR2["foobar"] & 0x7fffffff) % 3]
+    assert [partitioner(None) for _ in range(5)] == [3, 4, 5, 3, 4]
+    assert Partitioner([])("foobar") is None
+
+
+@pytest.mark.parametrize("line", [
+    b'{"transaction_id": "t-1", "account_id": "a-1", "member_id": "m-1"}',
+    b'{"account_id":"a-1","transaction_id":"t-1","member_id":"m-1"}',
+    b'{"transaction_id" : "t-1", "member_id": "m-1", "account_id" :"a-1", "note": "x"}',
+])
+def test_message_key_scan_matches_parsed_key(line):
+    for spec in ("transaction_id", "account_id", "member_id+account_id", "none"):
+        key = parse_key(spec)
+        assert key.scan(line) == key.of(json.loads(line))
+    assert parse_key("member_id+account_id").scan(line) == "m-1|a-1"
+
+
+def test_message_key_falls_back_to_json_and_drops_missing_keys():
+    # A non-string id is not matched by the scan pattern; the parsed record still keys it
+    assert MessageKey(["account_id"]).scan(b'{"account_id": 42}') == "42"
+    assert MessageKey(["account_id"]).scan(b'{"member_id": "m-1"}') is None
+    assert MessageKey(["member_id", "account_id"]).of({"member_id": "m-1", "account_id": ""}) is None
+    assert MessageKey().of({"account_id": "a-1"}) is None
+
+
+def test_parse_key_rejects_unknown_fields():
+    assert str(parse_key("account_id+member_id")) == "account_id+member_id"
+    assert str(parse_key("none")) == "none"
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_key("account_id+amount")
+
+
+# ─── Partition-parallel producing (--workers) ───
+
+class RecordingProducer:
+    """Stands in for KafkaProducer in forked workers: appends every send to
+    <out_dir>/<pid> as [partition, key, value]."""
+    out_dir = None
+
+    def __init__(self, **config):
+        self.key_serializer = config["key_serializer"]
+        self.f = open(os.path.join(self.out_dir, str(os.getpid())), "a")
+
+    def send(self, topic, key=None, value=None, partition=None):
+        self.f.write(json.dumps([partition, key, value.decode()]) + "\n")
+        return FakeFuture()
+
+    def flush(self, timeout=None):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+@needs_kafka
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="workers must inherit the stand-in producer")
+@pytest.mark.parametrize("workers,rate", [(2, 0), (3, 0), (3, 30000)])
+def test_workers_deliver_every_record_once_to_its_partition(tmp_path, monkeypatch, workers, rate):
+    import kafka
+
+    sent_dir = tmp_path / "sent"
+    sent_dir.mkdir()
+    monkeypatch.setattr(RecordingProducer, "out_dir", str(sent_dir))
+    monkeypatch.setattr(kafka, "KafkaProducer", RecordingProducer)
+    lines = [transaction(transaction_id=f"t-{i}", account_id=f"a-{i % 37}").decode()
+             for i in range(3000)]
+    path = tmp_path / "transactions.jsonl"
+    path.write_text("\n".join(lines) + "\n")
+    args = argparse.Namespace(workers=workers, read_ahead=2000, key=parse_key("account_id"),
+                              raw=True, validate=False, topic="t", bootstrap="localhost:9092",
+                              security_protocol="PLAINTEXT", batch_size=16, sasl_mechanism=None)
+    partitions = list(range(6))
+
+    pacer = TokenBucket(ConstantRate(rate)) if rate else None
+
+    reports, _ = produce_parallel(args, [str(path)], partitions, pacer)
+
+    assert sum(report["sent"] for report in reports) == len(lines)
+    sent, owners = [], {}
+    for f in sent_dir.iterdir():
+        for partition, key, value in map(json.loads, f.read_text().splitlines()):
+            owners.setdefault(partition, set()).add(f.name)
+            assert partition == Partitioner(partitions)(key) == partitions[partition_index(key, 6)]
+            assert key == json.loads(value)["account_id"]
+            sent.append(value)
+    assert sorted(sent) == sorted(lines)
+    # One worker per partition, so each partition keeps the file order
+    assert all(len(pids) == 1 for pids in owners.values())
+    position = {line: i for i, line in enumerate(lines)}
+    for f in sent_dir.iterdir():
+        order = [position[json.loads(row)[2]] for row in f.read_text().splitlines()]
+        assert order == sorted(order)